@@ -0,0 +1,85 @@
+import sys
+
+import myJsAst
+import myJsLexer
+import myJsOptimizer
+import myJsParser
+from myJsAst import BinOp, Boolean, Call, Function, Identifier, If, Lambda, Negative, Not, Number, Return, String, Var
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+typedparser = myJsParser.build(typed=True)
+
+PROGRAM = '''var x = 1 + y * 2;
+function f(a, b) {
+    if (a < b && !false) {return -a;} else {g(a, "s"); x = true;}
+    if (x) {}
+    return f(a - 1, b);
+}
+function(c) {return c == 2.5;}
+f(1, 2);
+'''
+
+
+def test_typed():
+    tree = typedparser.parse(PROGRAM, lexer=myJsLexer.build())
+    assert tree[0] == Var('x', BinOp(Number(1), '+', BinOp(Identifier('y'), '*', Number(2))))
+    f = tree[1]
+    assert (type(f), f.name, f.params) == (Function, 'f', ['a', 'b'])
+    assert f.body[0] == If(BinOp(BinOp(Identifier('a'), '<', Identifier('b')), '&&', Not(Boolean(False))),
+                           [Return(Negative(Identifier('a')))],
+                           [Call('g', [Identifier('a'), String('s')]), myJsAst.Assign('x', Boolean(True))])
+    assert f.body[1].otherwise is None and f.body[1].then == []
+    assert type(tree[2]) is Lambda and tree[3] == Call('f', [Number(1), Number(2)])
+
+    # positions of the first token, or of the operator of a BinOp
+    assert (f.lineno, f.lexpos) == (2, PROGRAM.index('function'))
+    assert (f.body[0].lineno, f.body[0].test.lineno, f.body[0].test.lexpos) == (3, 3, PROGRAM.index('&&'))
+    assert (tree[3].lineno, tree[3].lexpos) == (8, PROGRAM.rindex('f(1'))
+
+    # a lexer used again starts at line 1
+    lexer = myJsLexer.build()
+    for _ in range(2):
+        assert typedparser.parse(PROGRAM, lexer=lexer)[1].lineno == 2
+
+
+def test_convert():
+    tree = typedparser.parse(PROGRAM, lexer=jslexer)
+    ast = jsparser.parse(PROGRAM, lexer=jslexer)
+    assert myJsAst.to_tuple(tree) == ast
+    assert myJsAst.from_tuple(ast) == tree
+    assert myJsAst.to_tuple(myJsAst.from_tuple(ast)) == ast
+    assert myJsParser.build(typed=True, cache=False).parse(PROGRAM, lexer=jslexer) == tree
+    bare = myJsParser.build(typed=True, positions=False).parse(PROGRAM, lexer=jslexer)
+    assert bare == tree and (bare[1].lineno, bare[1].lexpos) == (0, 0)
+
+
+def test_names():
+    # every production function replaces one of myJsParser
+    names = [name for name in dir(myJsAst) if name.startswith('p_')]
+    assert names and all(hasattr(myJsParser, name) for name in names)
+    tree = typedparser.parse('abc = abc + abc;', lexer=jslexer)
+    assert tree[0].name is tree[0].value.left.name is tree[0].value.right.name
+
+
+def test_smaller():
+    # a node is no bigger than the tuple it replaces, even with its position
+    assert sys.getsizeof(Number(1, myJsAst.position(1000, 100000))) <= sys.getsizeof(('number', 1))
+    assert sys.getsizeof(BinOp(None, '+', None)) <= sys.getsizeof(('binop', None, '+', None))
+    tree = typedparser.parse('x = 1; f(x);', lexer=jslexer)
+    assert myJsAst.count_nodes(tree) == 4
+    ast = jsparser.parse(PROGRAM, lexer=jslexer)
+    assert (myJsOptimizer.count_nodes(ast), myJsAst.count_nodes(myJsAst.from_tuple(ast))) == (49, 38)
+
+
+def test():
+    test_typed()
+    test_convert()
+    test_names()
+    test_smaller()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,137 @@
+import contextlib
+import io
+import marshal
+import os
+import shutil
+import tempfile
+
+import myJsBatch
+import myJsBinary
+import myJsBytecode
+import myJsLexer
+import myJsParser
+import myJsVM
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+FILES = {
+    'a.js': 'var x = 1;\nfunction f(n) {return n * 2;}\nreturn f(x);',
+    'lib/b.js': '/* comment */ return "b" + 1;',
+    'lib/c.js': 'x = ;\ny = 1;\nz = ;',
+    'lib/notes.txt': 'not a script',
+}
+
+
+def make_tree():
+    directory = tempfile.mkdtemp()
+    for name, source in FILES.items():
+        path = os.path.join(directory, name)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(source)
+    return directory
+
+
+def run(argv):
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        status = myJsBatch.main(argv)
+    return status, out.getvalue().splitlines()
+
+
+def test_find():
+    directory = make_tree()
+    try:
+        assert [relative for _, relative in myJsBatch.find_files([directory])] == ['a.js', 'lib/b.js', 'lib/c.js']
+        path = os.path.join(directory, 'lib', 'b.js')
+        assert myJsBatch.find_files([path]) == [(path, 'b.js')]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_results():
+    directory = make_tree()
+    try:
+        for jobs, ordered in ((1, True), (2, True), (2, False)):
+            results = list(myJsBatch.parse_files([directory], jobs, ordered))
+            assert len(results) == 3
+            if ordered:
+                assert [r.relative for r in results] == ['a.js', 'lib/b.js', 'lib/c.js']
+            failed = [r for r in results if r.errors]
+            assert [r.relative for r in failed] == ['lib/c.js']
+            assert [e.split(', expected')[0] for e in failed[0].errors] == [
+                'line 1, column 5: unexpected SEMICOLON', 'line 3, column 5: unexpected SEMICOLON']
+        for max_errors, fail_fast in ((1, False), (20, True)):
+            results = list(myJsBatch.parse_files([directory], 1, max_errors=max_errors, fail_fast=fail_fast))
+            assert [len(r.errors) for r in results] == [0, 0, 1]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_main():
+    directory = make_tree()
+    output = tempfile.mkdtemp()
+    try:
+        status, lines = run(['-j', '2', '-o', output, '--bytecode', directory])
+        assert status == 1
+        assert [line.split()[0] for line in lines[:3]] == ['ok', 'ok', 'FAIL']
+        assert lines[3].startswith('    line 1, column 5: unexpected SEMICOLON, expected ')
+        assert lines[-1].startswith('files: 3, failed: 1,')
+        with open(os.path.join(output, 'a.ast'), 'rb') as f:
+            assert marshal.load(f) == jsparser.parse(FILES['a.js'], lexer=jslexer)
+        with open(os.path.join(output, 'lib', 'b.jsbc'), 'rb') as f:
+            assert myJsVM.run_code(myJsBytecode.load(f)) == 'b1'
+        assert not os.path.exists(os.path.join(output, 'lib', 'c.ast'))
+
+        status, lines = run(['-q', '-j', '1', os.path.join(directory, 'a.js')])
+        assert status == 0 and len(lines) == 1
+
+        status, lines = run(['-q', '-j', '1', '-o', output, '--binary', directory])
+        with open(os.path.join(output, 'lib', 'b.jsast'), 'rb') as f:
+            assert myJsBinary.load(f) == jsparser.parse(FILES['lib/b.js'], lexer=jslexer)
+
+        # a file whose output cannot be written fails, and the others go on
+        shutil.rmtree(os.path.join(output, 'lib'))
+        with open(os.path.join(output, 'lib'), 'w') as f:
+            f.write('in the way')
+        status, lines = run(['-q', '-j', '1', '-o', output, directory])
+        assert status == 1 and lines[0].startswith('FAIL') and lines[0].endswith('b.js')
+        assert lines[1].startswith('    FileExistsError: ') or lines[1].startswith('    NotADirectoryError: ')
+        assert lines[-1].startswith('files: 3, failed: 2,')
+    finally:
+        shutil.rmtree(directory)
+        shutil.rmtree(output)
+
+
+def test_clashes():
+    # two files given by themselves with the same name would have one output
+    directory = make_tree()
+    output = tempfile.mkdtemp()
+    try:
+        os.makedirs(os.path.join(directory, 'other'))
+        shutil.copy(os.path.join(directory, 'a.js'), os.path.join(directory, 'other', 'a.js'))
+        first, second = os.path.join(directory, 'a.js'), os.path.join(directory, 'other', 'a.js')
+        for jobs in ('1', '2'):
+            status, lines = run(['-j', jobs, '-o', output, first, second, os.path.join(directory, 'lib', 'b.js')])
+            assert status == 1 and [line.split()[0] for line in lines[:-1:2]] == ['FAIL', 'FAIL', 'ok']
+            assert lines[1] == '    output a is also the output of %s' % second
+            assert lines[3] == '    output a is also the output of %s' % first
+            assert sorted(os.listdir(output)) == ['b.ast']
+    finally:
+        shutil.rmtree(directory)
+        shutil.rmtree(output)
+
+
+def test():
+    test_find()
+    test_results()
+    test_main()
+    test_clashes()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,117 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+import myJsBench
+import myJsLexer
+import myJsParser
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+
+def test_workloads():
+    for name, generate in myJsBench.WORKLOADS.items():
+        source = generate(50)
+        assert generate(50) == source, name
+        ast = jsparser.parse(source, lexer=jslexer)
+        assert ast and ('error',) not in [stmt[1] for stmt in ast if stmt[0] == 'stmt'], name
+    assert len(jsparser.parse(myJsBench.heavy_comments(50), lexer=jslexer)) == 50
+    assert len(jsparser.parse(myJsBench.long_strings(50), lexer=jslexer)[0][1][2][1]) == 200
+    exp = jsparser.parse(myJsBench.deep_nesting(3), lexer=jslexer)[0][1][2]
+    assert exp == ('binop', ('binop', ('binop', ('number', 1), '+', ('number', 1)), '+', ('number', 1)),
+                   '+', ('number', 1))
+
+
+def test_measure():
+    result = myJsBench.measure(myJsBench.heavy_comments(20), jslexer, jsparser, repeat=1)
+    assert list(result) == ['tokens', 'tokens_per_second', 'parse_seconds', 'peak_bytes']
+    assert result['tokens'] == 80 and result['tokens_per_second'] > 0
+    assert result['parse_seconds'] > 0 and result['peak_bytes'] > 0
+
+
+def test_regressed():
+    assert myJsBench.regressed('parse_seconds', 1.0, 1.3, 0.25)
+    assert not myJsBench.regressed('parse_seconds', 1.0, 1.2, 0.25)
+    assert not myJsBench.regressed('parse_seconds', 1.0, 0.1, 0.25)
+    assert myJsBench.regressed('peak_bytes', 1000, 1300, 0.25)
+    assert myJsBench.regressed('tokens_per_second', 1000, 700, 0.25)
+    assert not myJsBench.regressed('tokens_per_second', 1000, 900, 0.25)
+    assert not myJsBench.regressed('tokens_per_second', 1000, 5000, 0.25)
+    assert myJsBench.regressed('tokens', 100, 101, 0.25)
+    assert not myJsBench.regressed('tokens', 100, 100, 0.25)
+
+
+def results(**metrics):
+    return {'environment': myJsBench.environment(), 'size': 10, 'metrics': metrics}
+
+
+def test_compare():
+    baseline = results(**{'a:1.parse_seconds': 1.0, 'a:1.tokens': 5, 'a:1.peak_bytes': 100, 'old.seconds': 1.0})
+    now = results(**{'a:1.parse_seconds': 2.0, 'a:1.tokens': 5, 'a:1.peak_bytes': 90, 'new.seconds': 9.0})
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        assert myJsBench.compare(baseline, now, 0.25) == ['a:1.parse_seconds']
+        assert myJsBench.compare(baseline, now, 1.5) == []
+    lines = out.getvalue().splitlines()
+    assert 'REGRESSION' in lines[1] and '+100.0%' in lines[1]
+    assert 'old' not in out.getvalue() and 'new' not in out.getvalue()
+    assert lines[4] == 'compare: 1 regressions beyond 25%'
+    assert 'measured on' not in out.getvalue()
+
+    baseline['environment']['python'] = '0.0'
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        myJsBench.compare(baseline, now)
+    assert out.getvalue().startswith('compare: the baseline was measured on python 0.0')
+
+
+def test_scaling():
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        assert myJsBench.bench_scaling((10, 100, 200), bound=1000.0) == []
+        assert myJsBench.bench_scaling((10, 100, 200), bound=0.0) == ['statements', 'arguments']
+    lines = out.getvalue().splitlines()
+    assert lines[4].startswith('scaling: statements 10 to 200, ') and 'NOT FLAT' not in lines[4]
+    assert lines[-1].endswith(', NOT FLAT (bound 0x)')
+
+
+def test_main():
+    fd, path = tempfile.mkstemp(suffix='.json')
+    os.close(fd)
+    suite, scaling = myJsBench.BENCHMARKS['suite'], myJsBench.BENCHMARKS['scaling']
+    out = io.StringIO()
+    try:
+        myJsBench.BENCHMARKS['suite'] = lambda size=10000: results(**{'a:%d.parse_seconds' % size: 1.0})
+        with contextlib.redirect_stdout(out):
+            assert myJsBench.main(['suite:7', '--json', path]) == 0
+            with open(path, encoding='utf-8') as f:
+                assert json.load(f)['metrics'] == {'a:7.parse_seconds': 1.0}
+            assert myJsBench.main(['suite:7', '--baseline', path]) == 0
+            myJsBench.BENCHMARKS['suite'] = lambda size=10000: results(**{'a:%d.parse_seconds' % size: 2.0})
+            assert myJsBench.main(['suite:7', '--baseline', path]) == 1
+            assert myJsBench.main(['suite:7', '--baseline', path, '--tolerance', '1.5']) == 0
+            assert myJsBench.main(['scaling', '--json', path]) == 2
+            assert myJsBench.main(['nothing']) == 2
+            myJsBench.BENCHMARKS['scaling'] = lambda: ['statements']
+            assert myJsBench.main(['scaling']) == 1
+    finally:
+        myJsBench.BENCHMARKS['suite'], myJsBench.BENCHMARKS['scaling'] = suite, scaling
+        os.remove(path)
+
+
+def test():
+    test_workloads()
+    test_measure()
+    test_regressed()
+    test_compare()
+    test_scaling()
+    test_main()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
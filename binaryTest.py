@@ -0,0 +1,129 @@
+import io
+import os
+import tempfile
+
+import myJsBinary
+import myJsCache
+import myJsLexer
+import myJsParser
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+SOURCE = '''var name = "café \\"quoted\\"";
+function f(a, b) {
+    if (a < b) {return -a;} else {return b * 2.5;}
+}
+x = !(f(1, 2) == 3) && true || false;
+function (n) {return n;}
+y = x + 1 + 2 + 3;
+'''
+
+
+def parse(source):
+    return jsparser.parse(source, lexer=jslexer)
+
+
+def test_round_trip():
+    ast = parse(SOURCE)
+    data = myJsBinary.dumps(ast)
+    assert data[:4] == myJsBinary.MAGIC and data[4] == myJsBinary.VERSION
+    assert myJsBinary.loads(data) == ast
+    assert myJsBinary.loads(myJsBinary.dumps([])) == []
+    f = io.BytesIO()
+    myJsBinary.dump(ast, f)
+    f.seek(0)
+    assert myJsBinary.load(f) == ast
+
+    # names are stored once and read back interned
+    assert data.count(b'name') == 1 and data.count(b'caf\xc3\xa9') == 1
+    assert len(data) < len(repr(ast)) / 3
+
+
+def test_values():
+    values = [(), ('x',), ('number', 1, 2), ('call',), [[], [1.5, -3, 0, 2 ** 70, -2 ** 70]], 'é', -1, 127, 128,
+              ('stmt', ('error',)), myJsCache.FrozenList([('true', 'true')])]
+    loaded = myJsBinary.loads(myJsBinary.dumps(values))
+    assert loaded == values and type(loaded[-1]) is list
+    for bad in (None, True, {}, ('stmt', None)):
+        try:
+            myJsBinary.dumps([bad])
+            assert False, bad
+        except TypeError:
+            pass
+    for data in (b'', b'JSBC\x01', myJsBinary.MAGIC + b'\x02\x00'):
+        try:
+            myJsBinary.loads(data)
+            assert False, data
+        except ValueError:
+            pass
+
+
+def test_deep():
+    # more levels than the recursion limit
+    source = 'x = %s1%s;' % ('(' * 5000, ' + 1)' * 5000)
+    data = myJsBinary.dumps(parse(source))
+    assert myJsBinary.dumps(myJsBinary.loads(data)) == data
+    exp = myJsBinary.view(data)[0][1][2]
+    for _ in range(4999):
+        exp = exp[1]
+    assert exp.load() == ('binop', ('number', 1), '+', ('number', 1))
+
+
+def test_view():
+    ast = parse(SOURCE)
+    view = myJsBinary.view(myJsBinary.dumps(ast))
+    assert len(view) == len(ast) and view.load() == ast
+    assert [stmt.kind for stmt in view] == [stmt[0] for stmt in ast]
+    assert [item.load() for item in view] == ast
+    function = view[1]
+    assert repr(function) == '<NodeView function>' and len(function) == 4
+    assert function[0] == 'function' and function[1] == 'f' and function[-2].load() == ['a', 'b']
+    assert function[3].size > 0 and function[3].load() == ast[1][3]
+    assert view[0][1][2][1] == 'café \\"quoted\\"'
+    assert list(view[2][1])[:2] == ['assign', 'x']
+    assert view[2][1][2].load() == ast[2][1][2]
+    for index in (len(ast), -len(ast) - 1):
+        try:
+            view[index]
+            assert False, index
+        except IndexError:
+            pass
+    try:
+        function[4]
+        assert False
+    except IndexError:
+        pass
+
+    other = myJsBinary.view(myJsBinary.dumps([(1, 'a'), (), ('error',)]))
+    assert other[0][1] == 'a' and other[0].kind is None and len(other[1]) == 0
+    assert other[2].kind == 'error' and list(other[2]) == ['error']
+    assert other.load() == [(1, 'a'), (), ('error',)]
+
+
+def test_open_view():
+    ast = parse(SOURCE * 20)
+    fd, path = tempfile.mkstemp(suffix='.jsast')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            myJsBinary.dump(ast, f)
+        view = myJsBinary.open_view(path)
+        assert len(view) == len(ast) and view[-3].load() == ast[-3]
+        assert sum(1 for stmt in view if stmt.kind == 'function') == 20
+        del view
+    finally:
+        os.remove(path)
+
+
+def test():
+    test_round_trip()
+    test_values()
+    test_deep()
+    test_view()
+    test_open_view()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,174 @@
+import io
+import math
+
+import myJsBytecode
+import myJsInterpreter
+import myJsLexer
+import myJsOptimizer
+import myJsParser
+import myJsVM
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+
+def test_compile(input_string):
+    return myJsBytecode.compile_program(jsparser.parse(input_string, lexer=jslexer))
+
+
+def functions(code):
+    return [c for c in code.consts if isinstance(c, myJsBytecode.Code)]
+
+
+def opnames(code):
+    return [myJsBytecode.OPCODES[op] for op in code.ops]
+
+
+def test_compiler():
+    assert opnames(test_compile('1 + x;')) == ['LOAD_CONST', 'LOAD_GLOBAL', 'ADD', 'STORE_LOCAL',
+                                                'LOAD_LOCAL', 'RETURN']
+    assert opnames(test_compile('var x = 1;')) == ['DECLARE_GLOBAL', 'LOAD_CONST', 'STORE_GLOBAL',
+                                                    'LOAD_LOCAL', 'RETURN']
+    assert opnames(test_compile('a && b;'))[:3] == ['LOAD_GLOBAL', 'JUMP_IF_FALSE_OR_POP', 'LOAD_GLOBAL']
+    assert opnames(test_compile('if (x) {1;} else {2;}'))[:2] == ['LOAD_GLOBAL', 'JUMP_IF_FALSE']
+
+    code = test_compile('function f(a, b) {var c = a; function g() {return a + c;} return g();}')
+    f, = functions(code)
+    assert (f.name, f.params, f.nlocals) == ('f', ('a', 'b'), 4)
+    assert opnames(f)[:2] == ['LOAD_LOCAL', 'STORE_LOCAL']
+    g, = functions(f)
+    assert [myJsBytecode.unpack_outer(arg) for op, arg in zip(g.ops, g.args)
+            if op == myJsBytecode.LOAD_OUTER] == [(1, 1), (1, 3)]
+
+    # constants are shared within one code object
+    assert test_compile('1; 1; "a"; "a";').consts == [1, 'a']
+
+    # but 0.0 and -0.0 are two
+    ast, _ = myJsOptimizer.optimize(jsparser.parse('var a = 0.0; var b = -0; 1 / b;', lexer=jslexer))
+    code = myJsBytecode.compile_program(ast)
+    assert [math.copysign(1, c) for c in code.consts if type(c) is float] == [1, -1]
+    assert myJsVM.run_code(code) == myJsInterpreter.run(ast) == -math.inf
+
+
+def test_tail_call():
+    f, = functions(test_compile('function f(x) {if (x) {return g(x, 1);} return 1 + g(x);}'))
+    ops = opnames(f)
+    assert ops.count('TAIL_CALL') == 1 and ops.count('CALL') == 1
+    assert ops[ops.index('TAIL_CALL') - 3:ops.index('TAIL_CALL')] == ['LOAD_GLOBAL', 'LOAD_LOCAL', 'LOAD_CONST']
+    assert ops[ops.index('CALL') + 1:ops.index('CALL') + 3] == ['ADD', 'RETURN']
+
+
+def test_deep_recursion():
+    # far deeper than Python's recursion limit
+    source = '''function count(n) {if (n == 0) {return 0;} return 1 + count(n - 1);}
+                  function loop(n, acc) {if (n == 0) {return acc;} return loop(n - 1, acc + 1);}
+                  function even(n) {if (n == 0) {return true;} return odd(n - 1);}
+                  function odd(n) {if (n == 0) {return false;} return even(n - 1);}
+                  return pack(count(20000), loop(100000, 0), even(20001), odd(20001));'''
+    assert myJsVM.run_code(test_compile(source), {'pack': lambda *values: values}) == (20000, 100000, False, True)
+
+    # tail calls to a builtin and with an argument missing, and closures
+    # over the frames of tail calls
+    source = '''function adder(n) {function add(x) {return x + n;} return add;}
+                  function apply(f, x) {return f(x);}
+                  function last(n) {if (n == 0) {return str();} return last(n - 1);}
+                  function pad(a, b) {return b;}
+                  function first(a) {return pad(a);}
+                  return apply(adder(10), 5) + last(5000) + first(1);'''
+    assert myJsVM.run_code(test_compile(source), {'str': lambda: 'x'}) == '15xundefined'
+
+    # a JavaScript function called back from a builtin
+    source = '''function down(n) {if (n == 0) {return 0;} return 1 + twice(down, n - 1) / 2;}
+                  return down(100);'''
+    assert myJsVM.run_code(test_compile(source), {'twice': lambda f, n: f(n) * 2}) == 100
+
+
+def test_task():
+    code = test_compile('''function fib(n) {if (n < 2) {return n;} return fib(n - 1) + fib(n - 2);}
+                           return fib(12);''')
+    task = myJsVM.spawn(code)
+    assert task.run() and task.result == 144
+    steps = task.steps
+
+    # stopped after 10 steps, at the next call or return, and the same steps in all
+    task = myJsVM.spawn(code)
+    runs = 1
+    while not task.run(10):
+        assert not task.done
+        runs += 1
+    assert task.result == 144 and task.steps == steps and steps // 30 < runs <= steps // 10 + 1
+    assert task.run() and task.result == 144
+
+    def exceeded(task):
+        try:
+            task.run()
+        except myJsVM.BudgetExceeded as error:
+            assert task.done and task.result is None
+            return str(error)
+        assert False, task.result
+
+    assert exceeded(myJsVM.spawn(code, max_steps=1000)) == 'more than 1000 steps'
+    assert myJsVM.spawn(code, max_steps=steps).run()
+    task = myJsVM.spawn(test_compile('function f(n) {return f(n + 1);} return f(0);'), max_steps=50000)
+    try:
+        while not task.run(100):
+            pass
+        assert False
+    except myJsVM.BudgetExceeded:
+        assert 50000 <= task.steps < 50100
+    assert exceeded(task) == 'more than 50000 steps'
+
+    deep = test_compile('function f(n) {return 1 + f(n);} return f(0);')
+    assert exceeded(myJsVM.spawn(deep, max_depth=1000)) == 'more than 1000 calls deep'
+    grow = test_compile('function grow(s, n) {if (n == 0) {return s;} return grow(s + s, n - 1);}'
+                        'return grow("ab", 30);')
+    assert exceeded(myJsVM.spawn(grow, max_string=1 << 20)) == 'string of more than 1048576 characters'
+    task = myJsVM.spawn(test_compile('return missing;'))
+    try:
+        task.run()
+        assert False
+    except myJsVM.JsRuntimeError:
+        assert repr(task) == '<Task error, 0 steps>'
+
+
+def test_disassemble():
+    text = myJsBytecode.disassemble(test_compile('function f(x) {return -x;} f(2);'))
+    assert 'code <program>() nlocals=1' in text
+    assert 'code f(x) nlocals=1' in text
+    assert 'NEGATIVE' in text
+    assert 'LOAD_GLOBAL' in text and ' f' in text
+
+
+def test_jsbc():
+    source = '''function fib(n) {if (n < 2) {return n;} return fib(n - 1) + fib(n - 2);}
+                var s = "fib " + 1.5;
+                return s + fib(12);'''
+    code = test_compile(source)
+    f = io.BytesIO()
+    myJsBytecode.dump(code, f)
+    data = f.getvalue()
+    assert data.startswith(myJsBytecode.MAGIC)
+    loaded = myJsBytecode.load(io.BytesIO(data))
+    assert myJsBytecode.disassemble(loaded) == myJsBytecode.disassemble(code)
+    assert myJsVM.run_code(loaded) == myJsVM.run_code(code) == 'fib 1.5144'
+    try:
+        myJsBytecode.loads(b'nope' + data[4:])
+    except ValueError:
+        pass
+    else:
+        assert False, 'bad magic accepted'
+
+
+def test():
+    test_compiler()
+    test_tail_call()
+    test_deep_recursion()
+    test_task()
+    test_disassemble()
+    test_jsbc()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,115 @@
+import copy
+import pickle
+import shutil
+import tempfile
+
+import myJsCache
+import myJsLexer
+import myJsParser
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+SOURCES = ['var x = 1;', 'function f(a, b) {return a + b;} f(1, 2);', 'if (x) {y = "s";} else {z(1, 2);}']
+
+
+def test_hits():
+    cache = myJsCache.ParseCache()
+    for source in SOURCES:
+        assert cache.parse(source) == jsparser.parse(source, lexer=jslexer)
+    ast = cache.parse(SOURCES[1])
+    assert ast is cache.parse(SOURCES[1])
+    assert (cache.stats.hits, cache.stats.misses) == (2, 3)
+    assert len(cache) == 3 and SOURCES[0] in cache and 'x;' not in cache
+
+
+def test_frozen():
+    ast = myJsCache.ParseCache().parse(SOURCES[1])
+    body = ast[0][3]
+    for change in (lambda: ast.append(1), lambda: body.pop(), lambda: ast.__setitem__(0, None),
+                   lambda: ast[0][2].sort(), lambda: ast.__delitem__(0)):
+        try:
+            change()
+        except TypeError:
+            pass
+        else:
+            assert False, 'cached tree changed'
+    assert isinstance(body, list) and body == [('stmt', ('return', ('binop', ('identifier', 'a'), '+',
+                                                                        ('identifier', 'b'))))]
+    assert pickle.loads(pickle.dumps(ast)) == ast and copy.deepcopy(ast) == ast
+
+
+def test_eviction():
+    cache = myJsCache.ParseCache(max_entries=2)
+    for source in SOURCES:
+        cache.parse(source)
+    assert len(cache) == 2 and SOURCES[0] not in cache and cache.stats.evictions == 1
+    cache.parse(SOURCES[1])            # now the most recently used
+    cache.parse(SOURCES[0])
+    assert SOURCES[1] in cache and SOURCES[2] not in cache
+
+    cache = myJsCache.ParseCache(max_bytes=100)
+    for source in SOURCES:
+        cache.parse(source)
+    assert cache.bytes <= 100 or len(cache) == 1
+    assert cache.stats.evictions >= 1
+
+
+def test_disk():
+    directory = tempfile.mkdtemp()
+    try:
+        cache = myJsCache.ParseCache(directory=directory)
+        expected = [cache.parse(source) for source in SOURCES]
+        assert cache.stats.disk_writes == 3
+        cache = myJsCache.ParseCache(directory=directory)
+        assert [cache.parse(source) for source in SOURCES] == expected
+        assert (cache.stats.disk_hits, cache.stats.misses) == (3, 0)
+        assert isinstance(cache.parse(SOURCES[1])[0][3], myJsCache.FrozenList)
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_unclosed():
+    # a comment left open by one source does not swallow the next
+    cache = myJsCache.ParseCache()
+    cache.parse('x = 1; /* never closed')
+    expected = jsparser.parse('y = 2;', lexer=myJsLexer.build())
+    assert cache.parse('y = 2;') == expected and cache.parse('y = 2;') == expected
+
+
+def test_bad_disk():
+    directory = tempfile.mkdtemp()
+    try:
+        cache = myJsCache.ParseCache(directory=directory)
+        key = myJsCache.source_key(SOURCES[0], cache.version)
+        with open(cache._path(key), 'wb') as f:
+            f.write(b'\xff not marshal')
+        assert cache.parse(SOURCES[0]) == jsparser.parse(SOURCES[0], lexer=myJsLexer.build())
+        assert (cache.stats.disk_hits, cache.stats.misses, cache.stats.disk_writes) == (0, 1, 1)
+        shutil.rmtree(directory)
+        assert cache.parse(SOURCES[1]) and cache.stats.misses == 2 and cache.stats.disk_writes == 1
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def test_key():
+    version = myJsCache.grammar_version()
+    assert myJsCache.source_key('x;', version) == myJsCache.source_key('x;', version)
+    assert myJsCache.source_key('x;', version) != myJsCache.source_key('y;', version)
+    assert myJsCache.source_key('x;', version) != myJsCache.source_key('x;', version + 'changed')
+
+
+def test():
+    test_hits()
+    test_frozen()
+    test_eviction()
+    test_disk()
+    test_unclosed()
+    test_bad_disk()
+    test_key()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,66 @@
+import contextlib
+import io
+
+import myJsAst
+import myJsErrors
+import myJsParser
+
+
+collector = myJsErrors.ErrorCollector()
+
+
+def test_diagnostics():
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        ast, diagnostics = collector.parse('var x = 1;\nx = ;\n  y = x @@;\nfunction f() {)}\nx;')
+    assert out.getvalue() == ''
+    assert ast == [('stmt', ('var', 'x', ('number', 1))), ('stmt', ('error',)),
+                   ('stmt', ('assign', 'y', ('identifier', 'x'))), ('function', 'f', [], [('stmt', ('error',))]),
+                   ('stmt', ('exp', ('identifier', 'x')))]
+    assert [(d.line, d.column, d.message, d.token, d.value) for d in diagnostics] == [
+        (2, 5, 'unexpected SEMICOLON', 'SEMICOLON', ';'),
+        (3, 9, "illegal characters '@@'", None, '@@'),
+        (4, 15, 'unexpected RPAREN', 'RPAREN', ')')]
+    assert 'IDENTIFIER' in diagnostics[0].expected and 'SEMICOLON' not in diagnostics[0].expected
+    assert str(diagnostics[0]).startswith('line 2, column 5: unexpected SEMICOLON, expected FALSE, IDENTIFIER, ')
+
+    ast, diagnostics = collector.parse('x = 1;\nf(x')
+    assert ast is None
+    assert [(d.line, d.column, d.message) for d in diagnostics] == [(2, 4, 'unexpected end of input')]
+    assert {'COMMA', 'RPAREN', 'PLUS'} <= set(diagnostics[0].expected)
+
+    assert collector.parse('x = 1;') == ([('stmt', ('assign', 'x', ('number', 1)))], [])
+
+
+def test_limits():
+    source = ''.join('x%d = ;\n' % i for i in range(10))
+    assert len(collector.parse(source)[1]) == 10
+    ast, diagnostics = myJsErrors.ErrorCollector(max_errors=3).parse(source)
+    assert ast is None and [d.line for d in diagnostics] == [1, 2, 3]
+
+    try:
+        myJsErrors.ErrorCollector(fail_fast=True).parse('x = 1;\n' + source)
+    except myJsErrors.JsSyntaxError as e:
+        assert e.diagnostic.line == 2 and str(e) == str(e.diagnostic)
+    else:
+        assert False
+
+
+def test_typed():
+    typed = myJsErrors.ErrorCollector(parser=myJsParser.build(typed=True))
+    tree, diagnostics = typed.parse('x = ;\nif (x) {)}')
+    assert len(diagnostics) == 2
+    assert tree == [myJsAst.Error(), myJsAst.If(myJsAst.Identifier('x'), [myJsAst.Error()], None)]
+    assert tree[0].lineno == 1 and tree[1].then[0].lineno == 2
+    assert myJsAst.from_tuple(myJsAst.to_tuple(tree)) == tree
+
+
+def test():
+    test_diagnostics()
+    test_limits()
+    test_typed()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,82 @@
+import ast
+import contextlib
+import io
+import os
+import random
+
+import myJsFastLexer
+import myJsLexer
+import myJsParser
+
+
+jslexer = myJsLexer.build()
+fastlexer = myJsFastLexer.build()
+jsparser = myJsParser.build()
+
+FRAGMENTS = ['if', 'else', 'iffy', 'var', 'x1', '_', 'function', 'return', 'true', 'false', '0', '12', '3.',
+             '4.5', '"', '"str"', '"a\\"b"', '\\', '/*', '*/', '*', '/', '//', '=', '==', '!', '!=', '<', '<=',
+             '>', '>=', '&', '&&', '|', '||', '+', '-', ',', ';', '{', '}', '(', ')', ' ', '\t', '\r', '\n',
+             '\n\n', '.', '#', "'", 'é']
+
+
+def tokens(lexer, input_string):
+    # every token with its position, and what the error functions printed
+    lexer = lexer.clone()
+    lexer.lineno = 1
+    lexer.input(input_string)
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        result = [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in iter(lexer.token, None)]
+    return result, lexer.lineno, lexer.current_state(), out.getvalue()
+
+
+def test_same(input_string):
+    expected = tokens(jslexer, input_string)
+    assert tokens(fastlexer, input_string) == expected, input_string
+    return expected
+
+
+def test_lexer_inputs():
+    # every string in the lexer tests, and the test file itself
+    with open(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'lexerTest.py')) as f:
+        source = f.read()
+    strings = [node.value for node in ast.walk(ast.parse(source))
+               if isinstance(node, ast.Constant) and isinstance(node.value, str)]
+    assert len(strings) > 10
+    for input_string in strings:
+        test_same(input_string)
+    test_same(source)
+
+
+def test_comments_and_lines():
+    result, lineno, state, _ = test_same('a /* b\n c */ d // e\n "f\ng" h\n/* open\n')
+    assert [tok[:3] for tok in result] == [('IDENTIFIER', 'a', 1), ('IDENTIFIER', 'd', 2),
+                                           ('STRING', 'f\ng', 3), ('IDENTIFIER', 'h', 4)]
+    assert (lineno, state) == (6, 'comment')
+
+
+def test_fuzz(n=2000, seed=12345):
+    rand = random.Random(seed)
+    for _ in range(n):
+        test_same(''.join(rand.choice(FRAGMENTS) for _ in range(rand.randint(0, 30))))
+
+
+def test_parse():
+    source = '''function f(a, b) {
+                    /* comment */ var c = a + b * 2; // comment
+                    if (c >= 10 && !false) {return "big";} else {return c;}
+                }
+                f(1, 2.5);'''
+    assert jsparser.parse(source, lexer=fastlexer.clone()) == jsparser.parse(source, lexer=jslexer.clone())
+
+
+def test():
+    test_lexer_inputs()
+    test_comments_and_lines()
+    test_fuzz()
+    test_parse()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,82 @@
+import contextlib
+import io
+import random
+
+import myJsIncremental
+import myJsLexer
+import myJsParser
+import myJsPool
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+SOURCE = '''var x = 1;
+function f(a) {
+    if (a) {return 1;}
+    return 2;
+}
+/* a comment */ if (x) {y;}
+x = f(x) + 1;
+'''
+
+
+def parse(source):
+    myJsPool.reset(jslexer)
+    return jsparser.parse(source, lexer=jslexer)
+
+
+def test_edit():
+    doc = myJsIncremental.Document(SOURCE)
+    assert doc.ast == parse(SOURCE) and doc.reparsed == 4
+    function, last = doc.ast[1], doc.ast[3]
+    start = SOURCE.index('return 2')
+    doc.edit(start + 7, start + 8, '3')
+    assert doc.ast == parse(doc.source) and doc.ast[1][3][1] == ('stmt', ('return', ('number', 3)))
+    assert doc.reparsed == 2 and doc.ast[3] is last and doc.ast[1] is not function
+
+    end = doc.source.index('{y;}') + 4
+    doc.edit(end, end, ' else {z;}')                      # joins the if before it
+    assert doc.ast == parse(doc.source) and doc.ast[2][1][0] == 'if-then-else'
+    doc.edit(0, 0, '/* ')
+    doc.edit(3, 3, '*/')                                  # the whole source, then nothing, commented out
+    assert doc.ast == parse(doc.source) and len(doc.ast) == 4
+    doc.edit(0, len(doc.source), '')
+    assert doc.ast == [] and doc.starts == []
+    try:
+        doc.edit(1, 1, 'x')
+    except ValueError:
+        pass
+    else:
+        assert False
+
+
+def test_random():
+    # every edit and its undo against a full parse, when it parses
+    rnd = random.Random(7)
+    texts = ['x', '1', ';', ' ', '\n', '{', '}', '/*', '*/', '"', ' else {z;}', 'var k = 1;', 'if (k) {']
+    doc = myJsIncremental.Document(SOURCE * 10)
+    base = doc.ast
+    for _ in range(500):
+        start = rnd.randrange(len(doc.source) + 1)
+        end = min(len(doc.source), start + rnd.choice((0, 1, 3)))
+        text = rnd.choice(texts)
+        old = doc.source[start:end]
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            ast = doc.edit(start, end, text)
+            full = parse(doc.source)
+        if not out.getvalue():
+            assert ast == full
+        with contextlib.redirect_stdout(out):
+            assert doc.edit(start, start + len(text), old) == base
+
+
+def test():
+    test_edit()
+    test_random()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
@@ -0,0 +1,170 @@
+import math
+
+import myJsLexer
+import myJsParser
+from myJsInterpreter import ENGINES, run
+from myJsRuntime import JsRuntimeError, is_function
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+engine = 'tree'         # every test runs once per engine, see test()
+
+
+def test_interpret(input_string, env=None):
+    ast = jsparser.parse(input_string, lexer=jslexer)
+    return run(ast, env, engine)
+
+
+def raises(input_string, env=None):
+    try:
+        test_interpret(input_string, env)
+    except JsRuntimeError:
+        return True
+    return False
+
+
+def test_expression():
+    assert test_interpret('1 + 2 * 3;') == 7
+    assert test_interpret('(1 + 2) * 3;') == 9
+    assert test_interpret('7 / 2;') == 3.5
+    assert test_interpret('6 / 3;') == 2
+    assert test_interpret('1 / 0;') == math.inf
+    assert test_interpret('-1 / 0;') == -math.inf
+    assert math.isnan(test_interpret('0 / 0;'))
+    assert test_interpret('-(2 + 3);') == -5
+    assert math.copysign(1, test_interpret('-0;')) == -1 and test_interpret('1 / -0;') == -math.inf
+    assert math.copysign(1, test_interpret('-(0 - 0.0);')) == -1
+    assert math.copysign(1, test_interpret('0 * -1;')) == -1 and math.copysign(1, test_interpret('0 / -1;')) == -1
+    assert math.copysign(1, test_interpret('var z = 0; z * -1;')) == -1 and test_interpret('0 * 5;') == 0
+    # strings convert to numbers as in JavaScript, not as in Python
+    assert test_interpret('"0x10" - 0;') == 16 and test_interpret('" 12 " * 1;') == 12
+    assert test_interpret('"-1.5e1" - 0;') == -15 and test_interpret('"Infinity" * 1;') == math.inf
+    assert all(math.isnan(test_interpret('"%s" - 0;' % text)) for text in ('1_000', 'inf', 'nan', '0x', '1e'))
+    assert test_interpret('"a" + 1;') == 'a1'
+    assert test_interpret('1 + "a";') == '1a'
+    assert test_interpret('"x" + true;') == 'xtrue'
+    assert test_interpret('"b" < "a";') is False
+    assert test_interpret('1 == 1;') is True
+    assert test_interpret('1 != 2;') is True
+    assert test_interpret('"1" == 1;') is True
+    assert test_interpret('!0;') is True
+    assert test_interpret('!"";') is True
+    assert test_interpret('0 || "yes";') == 'yes'
+    assert test_interpret('1 && 2;') == 2
+    assert test_interpret('0 && undefined_name;') == 0        # short-circuit
+    assert test_interpret('true || undefined_name;') is True
+
+
+def test_stmt():
+    assert test_interpret('var x = 1; x = x + 1; return x;') == 2
+    assert test_interpret('if (1 < 2) {return "then";} return "after";') == 'then'
+    assert test_interpret('if (1 > 2) {return "then";} else {return "else";}') == 'else'
+    assert test_interpret('if (false) {return 1;}') is None
+    assert test_interpret('1; 2; 3;') == 3
+    assert test_interpret('return 1; 2;') == 1
+    assert test_interpret('x = 5; return x;') == 5                 # assignment creates a global
+    assert raises('return y;')
+    assert raises('y();')
+    assert raises('var y = 1; y();')
+    try:
+        run([('stmt', ('error',))], None, engine)       # what the parser leaves of a syntax error
+        assert False
+    except ValueError:
+        pass
+
+
+def test_function():
+    factorial = '''function factorial(n) {
+                       if (n <= 1) {return 1;}
+                       return n * factorial(n - 1);
+                   }
+                   return factorial(10);'''
+    assert test_interpret(factorial) == 3628800
+    fibonacci = '''function fib(n) {
+                       if (n < 2) {return n;}
+                       return fib(n - 1) + fib(n - 2);
+                   }
+                   return fib(15);'''
+    assert test_interpret(fibonacci) == 610
+    assert test_interpret('function f() {1;} return f();') is None
+    assert test_interpret('function f(x, y) {return y;} return f(1);') is None
+    assert test_interpret('function f(x) {return x;} return f(1, 2);') == 1
+    assert is_function(test_interpret('function(x) {return x;}'))
+
+
+def test_scope():
+    # closures see the variables of the function they were defined in
+    closure = '''function outer(x) {
+                     function inner(y) {return x + y;}
+                     return inner(10);
+                 }
+                 return outer(1);'''
+    assert test_interpret(closure) == 11
+    # var is function scoped and hoisted, so it hides the global before it runs
+    hoisting = '''var x = "global";
+                  function f() {
+                      var before = x;
+                      if (true) {var x = "local";}
+                      return before;
+                  }
+                  return f();'''
+    assert test_interpret(hoisting) is None
+    # assignment updates the nearest declaration
+    counter = '''var count = 0;
+                 function bump() {count = count + 1;}
+                 bump(); bump();
+                 return count;'''
+    assert test_interpret(counter) == 2
+    assert test_interpret('function f(x) {x = 2; return x;} var x = 1; f(5); return x;') == 1
+    nested = '''function a(x) {
+                    function b() {
+                        function c() {x = x + 1; return x;}
+                        c();
+                        return x;
+                    }
+                    return b();
+                }
+                return a(1);'''
+    assert test_interpret(nested) == 2
+
+
+def test_depth():
+    # calls a few thousand deep; myJsClosure maps them onto Python calls
+    # within Python's own recursion limit
+    if engine == 'closure':
+        return
+    factorial = '''function factorial(n) {if (n <= 1) {return 1;} return n * factorial(n - 1);}
+                   return factorial(%d) > 0;'''
+    count = 'function count(n) {if (n == 0) {return 0;} return 1 + count(n - 1);} return count(%d);'
+    assert test_interpret(factorial % 3000) is True
+    assert test_interpret(count % 3000) == 3000
+    if engine == 'tree':
+        assert raises(count % 1000000)
+
+
+def test_builtins():
+    printed = []
+    env = {'print': lambda *args: printed.append(args), 'max': max}
+    assert test_interpret('print("a", 1); return max(3, 9, 4);', env) == 9
+    assert printed == [('a', 1)]
+    assert env['print']                                              # globals stay in the dict
+    # a builtin can call the functions of the program
+    apply = {'apply': lambda f, x: f(x)}
+    assert test_interpret('function square(x) {return x * x;} return apply(square, 5);', apply) == 25
+
+
+def test():
+    global engine
+    for engine in sorted(ENGINES):
+        test_expression()
+        test_stmt()
+        test_function()
+        test_scope()
+        test_depth()
+        test_builtins()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
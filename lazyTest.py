@@ -0,0 +1,121 @@
+import contextlib
+import io
+import pickle
+
+import myJsAst
+import myJsInterpreter
+import myJsLazy
+import myJsLexer
+import myJsParser
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+lazyparser = myJsLazy.LazyParser()
+
+PROGRAM = '''function used(n) {
+    if (n < 2) {return n;}
+    function inner(m) {return m + 1;}
+    return inner(used(n - 1));
+}
+function unused(x) {"no"; return 1 2;}
+if (true) {function nested() {return 1;}}
+return used(5);
+'''
+
+
+def test_lazy():
+    ast = lazyparser.parse(PROGRAM)
+    used, unused = ast[0][3], ast[1][3]
+    assert type(used) is myJsLazy.LazyBody and used.unparsed and unused.unparsed
+    assert ast[0][:3] == ('function', 'used', ['n'])
+    assert repr(unused).startswith('<LazyBody ')
+
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        assert myJsInterpreter.run(ast) == 5
+    assert not used.unparsed and unused.unparsed and out.getvalue() == ''
+    assert used[0][1][0] == 'if-then' and len(used) == 3
+
+    # the if-block's function and the bad body parse with the rest of the
+    # program or not at all
+    assert type(ast[2][1][2][0][3]) is list
+    with contextlib.redirect_stdout(out):
+        eager = jsparser.parse(PROGRAM, lexer=jslexer)
+        forced = myJsLazy.force(lazyparser.parse(PROGRAM))
+    assert forced == eager and type(forced[1][3]) is list
+    assert out.getvalue().splitlines() == ['Syntax error at token NUMBER', 'Syntax error at token NUMBER']
+
+
+def test_engines():
+    source = 'function f(a) {var b = a * 2; return b + 1;}\nfunction g() {return 0;}\nreturn f(20);'
+    for engine in sorted(myJsInterpreter.ENGINES):
+        assert myJsInterpreter.run(lazyparser.parse(source), engine=engine) == 41
+    ast = lazyparser.parse(source)
+    assert pickle.loads(pickle.dumps(ast)) == jsparser.parse(source, lexer=jslexer)
+
+
+def test_typed():
+    typed = myJsLazy.LazyParser(parser=myJsParser.build(typed=True))
+    tree = typed.parse(PROGRAM.replace('1 2', '1'))
+    assert tree[1].body.unparsed
+    expected = myJsParser.build(typed=True).parse(PROGRAM.replace('1 2', '1'), lexer=jslexer)
+    assert tree == expected
+    assert tree[0].body[0].lineno == 2 and tree[0].body[0].lexpos == PROGRAM.index('if (n')
+
+
+def test_braces():
+    source = 'function f(s) {var t = "}{\\"}"; /* } */ // }\n if (s) {t = s;} return t;}\nreturn f(0);'
+    ast = lazyparser.parse(source)
+    assert ast[0][3].unparsed and myJsInterpreter.run(ast) == '}{\\"}'
+    assert myJsLazy.force(ast) == jsparser.parse(source, lexer=jslexer)
+    assert ast[0][3].end == source.rindex('}', 0, source.index('\nreturn'))
+
+
+def test_errors():
+    # a body is parsed with its braces, as in the whole program
+    source = 'function f() { return 1 }'
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        assert myJsLazy.force(lazyparser.parse(source)) == jsparser.parse(source, lexer=jslexer)
+    assert out.getvalue() == 'Syntax error at token RBRACE\n' * 2
+
+
+def test_list():
+    # changing a body or making a list of it parses it first
+    source = 'function f() {return 1;}'
+    body = [('stmt', ('return', ('number', 1.0)))]
+    assert body == jsparser.parse(source, lexer=jslexer)[0][3]
+    lazy = lambda: lazyparser.parse(source)[0][3]
+    assert lazy() + [1] == body + [1] and [1] + lazy() == [1] + body
+    assert lazy().copy() == body and type(lazy().copy()) is list
+    appended = lazy()
+    appended.append(2)
+    assert list(appended) == body + [2] and not appended.unparsed
+    inserted = lazy()
+    inserted.insert(0, 3)
+    assert inserted == [3] + body
+
+
+def test_unclosed():
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        assert lazyparser.parse('function f() {return 1;') is None
+        assert lazyparser.parse('function f() {/* } */') is None
+        assert lazyparser.parse('function f() {return 1; /* }') is None
+    assert out.getvalue() == 'Syntax error at end of input\n' * 3
+
+
+def test():
+    test_lazy()
+    test_engines()
+    test_typed()
+    test_braces()
+    test_errors()
+    test_list()
+    test_unclosed()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
@@ -1,8 +1,7 @@
 import myJsLexer
-import ply.lex as lex
 
 
-jslexer = lex.lex(module=myJsLexer)
+jslexer = myJsLexer.build()
 
 
 def test_lexer(input_string):
@@ -66,10 +65,15 @@ def test_comment():
 
     input4 = '''"hello" /* how are you*/ 123 /* are you ok*/'''
     output4 = [('STRING', 'hello'), ('NUMBER', 123)]
+
+    input5 = '''/** a * b / c
+                 ** over lines */ x /*/ 1 **/ y'''
+    output5 = [('IDENTIFIER', 'x'), ('IDENTIFIER', 'y')]
     assert test_lexer(input1) == output1
     assert test_lexer(input2) == output2
     assert test_lexer(input3) == output3
     assert test_lexer(input4) == output4
+    assert test_lexer(input5) == output5
 
 
 def test():
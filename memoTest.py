@@ -0,0 +1,106 @@
+import myJsClosure
+import myJsLexer
+import myJsMemo
+import myJsParser
+from myJsRuntime import JsRuntimeError
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+FIB = '''function fib(n) {if (n < 2) {return n;} return fib(n - 1) + fib(n - 2);}
+return fib(%d);'''
+
+
+def parse(source):
+    return jsparser.parse(source, lexer=jslexer)
+
+
+def test_fib():
+    memo = myJsMemo.Memo()
+    program = memo.compile(parse(FIB % 60))
+    assert program() == 1548008755920
+    stats = memo.stats()['fib']
+    assert (stats['misses'], stats['hits'], stats['entries']) == (61, 58, 61)
+    assert program() == 1548008755920
+    stats = memo.stats()['fib']
+    assert stats['hits'] == 59 and stats['hit_rate'] == 59 / 120.0
+    memo.clear()
+    assert program() == 1548008755920 and memo.stats()['fib']['misses'] == 122
+
+
+def test_limits():
+    # the least recently used results go first
+    memo = myJsMemo.Memo(max_entries=4, limits={'fib': 2})
+    source = '''function fib(n) {if (n < 2) {return n;} return fib(n - 1) + fib(n - 2);}
+                function square(x) {return x * x;}
+                return pack(fib(15), square(1), square(2), square(3), square(1), square(4), square(5), square(1));'''
+    program = memo.compile(parse(source), {'pack': lambda *values: list(values)})
+    assert program() == [610, 1, 4, 9, 1, 16, 25, 1]
+    stats = memo.stats()
+    fib = stats['fib']
+    assert fib['max_entries'] == 2 and fib['entries'] == 2 and fib['evictions'] == fib['misses'] - 2
+    assert fib['hits'] + fib['misses'] < 1973       # the calls without a cache
+    square = stats['square']
+    assert (square['hits'], square['misses'], square['evictions'], square['entries']) == (2, 5, 1, 4)
+
+
+def test_keys():
+    memo = myJsMemo.Memo()
+    source = '''function show(a, b) {return a + b;}
+                function inverse(x) {return 1 / x;}
+                return pack(show(1, 2), show("1", 2), show(1.5, 2), show(1, 2), show(true, 2),
+                            inverse(0.0), inverse(-0.0), inverse(0.0));'''
+    env = {'pack': lambda *values: list(values)}
+    program = memo.compile(parse(source), env)
+    assert program() == myJsClosure.run(parse(source), dict(env))
+    stats = memo.stats()
+    assert (stats['show']['hits'], stats['show']['misses'], stats['show']['skipped']) == (1, 3, 1)
+    assert (stats['inverse']['hits'], stats['inverse']['misses']) == (1, 2)
+    assert myJsMemo._key([1, '1', 1.0, -0.0]) == (1, '1', (float, '0x1.0000000000000p+0'), (float, '-0x0.0p+0'))
+    assert myJsMemo._key([1, True]) is None and myJsMemo._key([None]) is None
+
+
+def test_impure():
+    # only the pure functions are memoized, and errors keep nothing
+    memo = myJsMemo.Memo(builtins=('check',))
+    source = '''var calls = 0;
+                function counted(n) {calls = calls + 1; return n;}
+                function pure(n) {return check(n) * 2;}
+                function reads(n) {return n + calls;}
+                counted(1); counted(1); reads(1); pure(2); pure(2);
+                return calls + reads(1);'''
+
+    def check(n):
+        if n < 0:
+            raise JsRuntimeError('negative')
+        return n
+    program = memo.compile(parse(source), {'check': check})
+    assert program() == 5 and list(memo.stats()) == ['pure']
+    assert memo.stats()['pure']['hits'] == 1
+    program = memo.compile(parse('function pure(n) {return check(n) * 2;}\npure(-1);'), {'check': check})
+    for _ in range(2):
+        try:
+            program()
+            assert False
+        except JsRuntimeError:
+            pass
+    assert memo.stats()['pure']['misses'] == 3 and memo.stats()['pure']['entries'] == 0
+
+
+def test_run():
+    assert myJsMemo.run(parse(FIB % 30)) == 832040
+    assert myJsMemo.run(parse('function f(x) {return x;}\nf(1);\nf(2);')) == 2
+
+
+def test():
+    test_fib()
+    test_limits()
+    test_keys()
+    test_impure()
+    test_run()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
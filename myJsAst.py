@@ -0,0 +1,347 @@
+# Typed parse trees: node classes for what myJsParser builds as tuples.
+#
+#       myJsParser.build(typed=True)        a parser that builds these nodes
+#       to_tuple(tree) -> ast               the tuple format of myJsParser
+#       from_tuple(ast) -> tree             and back
+#
+# Every node has __slots__ for its fields and one more for its position:
+# the lineno and lexpos of the token it starts at (or of its operator, for
+# BinOp), packed into one int by position() and read through the lineno and
+# lexpos properties. Its tag is its class. The
+# ('stmt', ...) and ('exp', ...) wrappers are dropped: a statement list
+# holds Function, Lambda, If, Assign, Var and Return nodes and, for an
+# expression statement, the expression itself.
+#
+#       ("function", name, params, body)        Function(name, params, body)
+#       ("lambda", params, body)                Lambda(params, body)
+#       ("if-then", test, then)                 If(test, then, None)
+#       ("if-then-else", test, then, else)      If(test, then, otherwise)
+#       ("assign", name, exp)                   Assign(name, value)
+#       ("var", name, exp)                      Var(name, value)
+#       ("return", exp)                         Return(value)
+#       ("identifier", name)                    Identifier(name)
+#       ("number", value)                       Number(value)
+#       ("string", value)                       String(value)
+#       ("true", "true"), ("false", "false")    Boolean(value)
+#       ("not", exp)                            Not(operand)
+#       ("negative", exp)                       Negative(operand)
+#       ("binop", left, op, right)              BinOp(left, op, right)
+#       ("call", name, args)                    Call(name, args)
+#       ("error",)                              Error()
+#
+# Names are interned, so every use of a name shares one string.
+#
+# A position is an int object of its own for all but the first few
+# characters of a program, which makes a node cost about as much as the
+# tuple it replaces. build(typed=True, positions=False) leaves every
+# position 0 for the smallest trees. lexpos has 32 bits, so a source of 4
+# GiB or more cannot be parsed with positions. Every parse with positions
+# of an input starts the lexer at line 1, so a lexer can be used again.
+#
+# The typed parser uses the LALR tables of myJsParser with the production
+# functions of this module bound in place of the ones that build tuples;
+# the functions here have the names of the ones they replace.
+
+import copy
+import sys
+
+from ply import lex, yacc
+
+
+intern = sys.intern
+
+
+class Node(object):
+    __slots__ = ('position',)
+    fields = ()
+
+    @property
+    def lineno(self):
+        return self.position >> 32
+
+    @property
+    def lexpos(self):
+        return self.position & 0xffffffff
+
+    def __eq__(self, other):
+        # positions are not compared, so that converted trees compare equal
+        return type(self) is type(other) and all(getattr(self, f) == getattr(other, f) for f in self.fields)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return '%s(%s)' % (type(self).__name__, ', '.join(repr(getattr(self, f)) for f in self.fields))
+
+
+def position(lineno, lexpos):
+    return lineno << 32 | lexpos
+
+
+def _node(name, fields):
+    # A Node subclass with a slot for each field. Its __init__ takes the
+    # fields and then position=0; it is written out as source, as namedtuple
+    # does, because the parser calls it for every node.
+    fields = tuple(fields.split())
+    source = 'def __init__(self, %sposition=0):\n' % ''.join(field + ', ' for field in fields)
+    for field in fields + ('position',):
+        source += '    self.%s = %s\n' % (field, field)
+    namespace = {}
+    exec(source, namespace)
+    return type(name, (Node,), {'__slots__': fields, 'fields': fields, '__init__': namespace['__init__']})
+
+
+Function = _node('Function', 'name params body')
+Lambda = _node('Lambda', 'params body')
+If = _node('If', 'test then otherwise')
+Assign = _node('Assign', 'name value')
+Var = _node('Var', 'name value')
+Return = _node('Return', 'value')
+Identifier = _node('Identifier', 'name')
+Number = _node('Number', 'value')
+String = _node('String', 'value')
+Boolean = _node('Boolean', 'value')
+Not = _node('Not', 'operand')
+Negative = _node('Negative', 'operand')
+BinOp = _node('BinOp', 'left op right')
+Call = _node('Call', 'name args')
+Error = _node('Error', '')          # what the parser skipped after a syntax error
+
+
+def count_nodes(tree):
+    if isinstance(tree, list):
+        return sum(count_nodes(item) for item in tree)
+    if isinstance(tree, Node):
+        return 1 + sum(count_nodes(getattr(tree, f)) for f in tree.fields)
+    return 0
+
+
+# Converters
+
+def to_tuple(tree):
+    return [_statement_tuple(node) for node in tree]
+
+
+def _statement_tuple(node):
+    kind = type(node)
+    if kind is Function:
+        return ('function', node.name, list(node.params), to_tuple(node.body))
+    if kind is Lambda:
+        return ('lambda', list(node.params), to_tuple(node.body))
+    if kind is If:
+        if node.otherwise is None:
+            return ('stmt', ('if-then', _exp_tuple(node.test), to_tuple(node.then)))
+        return ('stmt', ('if-then-else', _exp_tuple(node.test), to_tuple(node.then), to_tuple(node.otherwise)))
+    if kind is Assign:
+        return ('stmt', ('assign', node.name, _exp_tuple(node.value)))
+    if kind is Var:
+        return ('stmt', ('var', node.name, _exp_tuple(node.value)))
+    if kind is Return:
+        return ('stmt', ('return', _exp_tuple(node.value)))
+    if kind is Error:
+        return ('stmt', ('error',))
+    return ('stmt', ('exp', _exp_tuple(node)))
+
+
+def _exp_tuple(node):
+    kind = type(node)
+    if kind is Identifier:
+        return ('identifier', node.name)
+    if kind is Number:
+        return ('number', node.value)
+    if kind is String:
+        return ('string', node.value)
+    if kind is Boolean:
+        return ('true', 'true') if node.value else ('false', 'false')
+    if kind is BinOp:
+        return ('binop', _exp_tuple(node.left), node.op, _exp_tuple(node.right))
+    if kind is Call:
+        return ('call', node.name, [_exp_tuple(arg) for arg in node.args])
+    if kind is Not:
+        return ('not', _exp_tuple(node.operand))
+    if kind is Negative:
+        return ('negative', _exp_tuple(node.operand))
+    raise ValueError('not an expression node: %r' % (node,))
+
+
+def from_tuple(ast):
+    return [_statement_node(stmt) for stmt in ast]
+
+
+def _statement_node(stmt):
+    kind = stmt[0]
+    if kind == 'function':
+        return Function(intern(stmt[1]), [intern(name) for name in stmt[2]], from_tuple(stmt[3]))
+    if kind == 'lambda':
+        return Lambda([intern(name) for name in stmt[1]], from_tuple(stmt[2]))
+    stmt = stmt[1]
+    kind = stmt[0]
+    if kind == 'if-then':
+        return If(_exp_node(stmt[1]), from_tuple(stmt[2]), None)
+    if kind == 'if-then-else':
+        return If(_exp_node(stmt[1]), from_tuple(stmt[2]), from_tuple(stmt[3]))
+    if kind == 'assign':
+        return Assign(intern(stmt[1]), _exp_node(stmt[2]))
+    if kind == 'var':
+        return Var(intern(stmt[1]), _exp_node(stmt[2]))
+    if kind == 'return':
+        return Return(_exp_node(stmt[1]))
+    if kind == 'exp':
+        return _exp_node(stmt[1])
+    if kind == 'error':
+        return Error()
+    raise ValueError('unknown statement %r' % (kind,))
+
+
+def _exp_node(exp):
+    kind = exp[0]
+    if kind == 'identifier':
+        return Identifier(intern(exp[1]))
+    if kind == 'number':
+        return Number(exp[1])
+    if kind == 'string':
+        return String(exp[1])
+    if kind == 'true' or kind == 'false':
+        return Boolean(kind == 'true')
+    if kind == 'binop':
+        return BinOp(_exp_node(exp[1]), exp[2], _exp_node(exp[3]))
+    if kind == 'call':
+        return Call(intern(exp[1]), [_exp_node(arg) for arg in exp[2]])
+    if kind == 'not':
+        return Not(_exp_node(exp[1]))
+    if kind == 'negative':
+        return Negative(_exp_node(exp[1]))
+    raise ValueError('unknown expression %r' % (kind,))
+
+
+# Production functions for the typed parser. Positions come from the first
+# token of the production; p.lineno and p.lexpos are 0 for non-terminals.
+
+def _at(p, n):
+    if p.parser.positions:
+        return p.lineno(n) << 32 | p.lexpos(n)
+    return 0
+
+
+def p_topStmt(p):
+    p[0] = p[1]
+
+
+def p_topStmt_func(p):
+    p[0] = Function(intern(p[2]), p[4], p[6], _at(p, 1))
+
+
+def p_topStmt_lambda(p):
+    p[0] = Lambda(p[3], p[5], _at(p, 1))
+
+
+def p_params_one(p):
+    p[0] = [intern(p[1])]
+
+
+def p_params_multi(p):
+    p[1].append(intern(p[3]))
+    p[0] = p[1]
+
+
+def p_stmt_if(p):
+    p[0] = If(p[3], p[5], None, _at(p, 1))
+
+
+def p_stmt_ifelse(p):
+    p[0] = If(p[3], p[5], p[7], _at(p, 1))
+
+
+def p_stmt_IDENTIFIER(p):
+    p[0] = Assign(intern(p[1]), p[3], _at(p, 1))
+
+
+def p_stmt_RETURN(p):
+    p[0] = Return(p[2], _at(p, 1))
+
+
+def p_stmt_VAR(p):
+    p[0] = Var(intern(p[2]), p[4], _at(p, 1))
+
+
+def p_stmt_exp(p):
+    p[0] = p[1]
+
+
+def p_stmt_error(p):
+    p[0] = Error(_at(p, 2))
+
+
+def p_compoundstmt_error(p):
+    p[0] = [Error(_at(p, 1))]
+
+
+def p_exp_identifier(p):
+    p[0] = Identifier(intern(p[1]), _at(p, 1))
+
+
+def p_exp_minus(p):
+    operand = p[2]
+    if isinstance(operand, str):        # exp : MINUS IDENTIFIER
+        operand = Identifier(intern(operand), _at(p, 2))
+    p[0] = Negative(operand, _at(p, 1))
+
+
+def p_exp_number(p):
+    p[0] = Number(p[1], _at(p, 1))
+
+
+def p_exp_string(p):
+    p[0] = String(p[1], _at(p, 1))
+
+
+def p_exp_true(p):
+    p[0] = Boolean(True, _at(p, 1))
+
+
+def p_exp_false(p):
+    p[0] = Boolean(False, _at(p, 1))
+
+
+def p_exp_not(p):
+    p[0] = Not(p[2], _at(p, 1))
+
+
+def p_exp_operation(p):
+    p[0] = BinOp(p[1], intern(p[2]), p[3], _at(p, 2))
+
+
+def p_exp_call(p):
+    p[0] = Call(intern(p[1]), p[3], _at(p, 1))
+
+
+class _PositionsParser(yacc.LRParser):
+    # a parser whose positions start at line 1 for every input it is given
+
+    def parse(self, input=None, lexer=None, *args, **kwargs):
+        if input is not None:
+            if len(input) > 0xffffffff:
+                raise ValueError('a source of %d characters is too long for the positions of myJsAst' % len(input))
+            (lexer or lex.lexer).lineno = 1
+        return yacc.LRParser.parse(self, input, lexer, *args, **kwargs)
+
+
+def typed(parser, positions=True):
+    # A copy of a myJsParser parser with the production functions of this
+    # module in place of those of myJsParser that build tuples.
+    namespace = globals()
+    productions = []
+    for production in parser.productions:
+        func = production.func
+        if func is not None and func in namespace:
+            production = copy.copy(production)
+            production.callable = namespace[func]
+        productions.append(production)
+    parser = copy.copy(parser)
+    parser.productions = productions
+    parser.positions = positions
+    if positions:
+        parser.__class__ = _PositionsParser
+    return parser
@@ -0,0 +1,191 @@
+# Parsing many script files at once, on several processes.
+#
+#       python myJsBatch.py [options] path...
+#
+# Every path is a .js file or a directory searched for .js files. The files
+# are lexed and parsed by a pool of worker processes, each of which builds
+# its lexer and parser once when it starts. One line is printed per file as
+# its result comes back, in the order of the files or, with --as-completed,
+# as soon as it is ready, followed by the totals:
+#
+#       ok      1.92 ms     2.1 kB  lib/util.js
+#       FAIL    0.35 ms     0.1 kB  lib/broken.js
+#           line 3, column 9: unexpected RBRACE, expected SEMICOLON
+#       files: 2, failed: 1, 2.2 kB in 0.41 s: 4.9 files/s, 5.4 kB/s
+#
+# The errors of a file are collected by myJsErrors, at most --max-errors of
+# them; with --fail-fast a file is given up at its first error.
+#
+# With --output DIR the tree of every file that parses is written to DIR as
+# a marshal file, at the path of the file relative to the directory it was
+# found in (or under its base name) with .ast in place of .js; --binary
+# writes it in the format of myJsBinary instead, as .jsast, and --bytecode
+# writes the compiled .jsbc of myJsBytecode next to it. A file whose output
+# cannot be written fails with the error, and so do files whose output
+# would be at the same path, like a/x.js and b/x.js given by themselves:
+# none of them is written. The exit status is 1 if any file
+# failed.
+#
+#       parse_files(paths, jobs, ordered, output, bytecode, max_errors, fail_fast, binary)
+#           -> iterator of Result
+#
+# is the same as a library call.
+
+import argparse
+import marshal
+import os
+import sys
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import myJsBinary
+import myJsBytecode
+import myJsErrors
+
+
+# relative is the path the output is written at; errors is a list of
+# messages, the str() of myJsErrors diagnostics, empty when the file parsed;
+# size is in bytes
+Result = namedtuple('Result', 'path relative errors seconds size')
+
+
+def find_files(paths):
+    # [(path, relative path)] for the files and the .js files under the
+    # directories, in sorted order
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            for directory, dirnames, filenames in os.walk(path):
+                dirnames.sort()
+                for name in sorted(filenames):
+                    if name.endswith('.js'):
+                        full = os.path.join(directory, name)
+                        found.append((full, os.path.relpath(full, path)))
+        else:
+            found.append((path, os.path.basename(path)))
+    return found
+
+
+def output_clashes(files):
+    # path -> error for the files of find_files whose output would be
+    # written at the same path as another's, none of which is written
+    paths = OrderedDict()
+    for path, relative in files:
+        paths.setdefault(os.path.normcase(os.path.splitext(relative)[0]), []).append(path)
+    clashes = {}
+    for target, same in paths.items():
+        if len(same) > 1:
+            for path in same:
+                clashes[path] = 'output %s is also the output of %s' % (
+                    target, ', '.join(other for other in same if other != path))
+    return clashes
+
+
+# Workers
+
+_worker = {}
+
+
+def init_worker(max_errors=20, fail_fast=False):
+    # build the lexer and parser once per process
+    _worker['collector'] = myJsErrors.ErrorCollector(max_errors, fail_fast)
+
+
+def write_output(ast, target, bytecode=False, binary=False):
+    directory = os.path.dirname(target)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if binary:
+        with open(target + '.jsast', 'wb') as f:
+            myJsBinary.dump(ast, f)
+    else:
+        with open(target + '.ast', 'wb') as f:
+            marshal.dump(ast, f)
+    if bytecode:
+        with open(target + '.jsbc', 'wb') as f:
+            myJsBytecode.dump(myJsBytecode.compile_program(ast), f)
+
+
+def parse_file(path, relative, output=None, bytecode=False, binary=False):
+    if not _worker:
+        init_worker()
+    start = time.perf_counter()
+    size = 0
+    try:
+        with open(path, 'rb') as f:
+            data = f.read()
+        size = len(data)
+        ast, diagnostics = _worker['collector'].parse(data.decode('utf-8'))
+        errors = [str(diagnostic) for diagnostic in diagnostics]
+        if ast is None and not errors:
+            errors = ['no parse tree']
+    except myJsErrors.JsSyntaxError as e:
+        errors = [str(e)]
+    except Exception as e:
+        errors = ['%s: %s' % (type(e).__name__, e)]
+    if not errors and output is not None:
+        try:
+            write_output(ast, os.path.join(output, os.path.splitext(relative)[0]), bytecode, binary)
+        except OSError as e:
+            errors = ['%s: %s' % (type(e).__name__, e)]
+    return Result(path, relative, errors, time.perf_counter() - start, size)
+
+
+def parse_files(paths, jobs=None, ordered=True, output=None, bytecode=False, max_errors=20, fail_fast=False,
+                binary=False):
+    files = find_files(paths)
+    clashes = output_clashes(files) if output is not None else {}
+    if jobs == 1:
+        init_worker(max_errors, fail_fast)
+        for path, relative in files:
+            clash = clashes.get(path)
+            result = parse_file(path, relative, None if clash else output, bytecode, binary)
+            yield result._replace(errors=result.errors + [clash]) if clash else result
+        return
+    with ProcessPoolExecutor(jobs, initializer=init_worker, initargs=(max_errors, fail_fast)) as executor:
+        futures = OrderedDict((executor.submit(parse_file, path, relative, None if path in clashes else output,
+                                               bytecode, binary), clashes.get(path))
+                              for path, relative in files)
+        for future in (futures if ordered else as_completed(futures)):
+            result = future.result()
+            clash = futures[future]
+            yield result._replace(errors=result.errors + [clash]) if clash else result
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='myJsBatch.py', description='Parse JavaScript files in parallel.')
+    parser.add_argument('paths', nargs='+', help='.js files and directories to search for them')
+    parser.add_argument('-j', '--jobs', type=int, default=None, help='worker processes (default: one per CPU)')
+    parser.add_argument('-o', '--output', help='write the parse trees under this directory')
+    parser.add_argument('--binary', action='store_true', help='write the parse trees as .jsast files of myJsBinary')
+    parser.add_argument('--bytecode', action='store_true', help='also write compiled .jsbc files')
+    parser.add_argument('--as-completed', action='store_true', help='report files as they finish')
+    parser.add_argument('--max-errors', type=int, default=20, metavar='N', help='errors reported per file (default: 20)')
+    parser.add_argument('--fail-fast', action='store_true', help='give up on a file at its first error')
+    parser.add_argument('-q', '--quiet', action='store_true', help='only report failures and totals')
+    args = parser.parse_args(argv)
+    if (args.bytecode or args.binary) and not args.output:
+        parser.error('--binary and --bytecode need --output')
+
+    start = time.perf_counter()
+    files = failed = size = 0
+    for result in parse_files(args.paths, args.jobs, not args.as_completed, args.output, args.bytecode,
+                              args.max_errors, args.fail_fast, args.binary):
+        files += 1
+        size += result.size
+        if result.errors:
+            failed += 1
+            print('FAIL %8.2f ms %7.1f kB  %s' % (result.seconds * 1e3, result.size / 1e3, result.path))
+            for error in result.errors:
+                print('    ' + error)
+        elif not args.quiet:
+            print('ok   %8.2f ms %7.1f kB  %s' % (result.seconds * 1e3, result.size / 1e3, result.path))
+    seconds = time.perf_counter() - start
+    print('files: %d, failed: %d, %.1f kB in %.2f s: %.1f files/s, %.1f kB/s'
+          % (files, failed, size / 1e3, seconds, files / seconds, size / 1e3 / seconds))
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
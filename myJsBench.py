@@ -0,0 +1,756 @@
+# Benchmarks for the JavaScript lexer and parser.
+#
+#       python myJsBench.py                 run every benchmark
+#       python myJsBench.py scaling         run only the named benchmarks
+#       python myJsBench.py stream:500      pass a size to a benchmark
+#
+#       python myJsBench.py suite --json results.json --baseline baseline.json
+#
+# Each benchmark prints one line per measurement so that runs can be
+# compared by eye or with diff.
+#
+# The scaling benchmark also compares the time per statement of its largest
+# program with that of its smallest: more than twice as much is a failure
+# and the exit status is 1.
+#
+# The suite benchmark measures the lexer and parser on the synthetic
+# programs of WORKLOADS at two sizes, the size given and a tenth of it:
+# tokens, tokens per second of the lexer alone, parse time and the peak of
+# memory allocated while parsing. It adds the startup times of a fresh
+# interpreter and the run times of PROGRAMS on every engine. The programs
+# are generated the same way on every run, so two runs differ only by the
+# code and the machine. --json writes the results, with the Python version
+# and platform they were measured on, and --baseline compares them with
+# those of an earlier run: a time, or the peak memory, more than tolerance
+# (25% by default) worse than the baseline, or a different number of
+# tokens, is a regression and the exit status is 1.
+
+import argparse
+import asyncio
+import json
+import marshal
+import os
+import pickle
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections import OrderedDict
+
+import ply
+
+import myJsAst
+import myJsBinary
+import myJsBytecode
+import myJsCache
+import myJsClosure
+import myJsFastLexer
+import myJsIncremental
+import myJsLazy
+import myJsMemo
+import myJsInterpreter
+import myJsLexer
+import myJsOptimizer
+import myJsParser
+import myJsRunProfile
+import myJsRuntime
+import myJsScheduler
+import myJsTokens
+import myJsVector
+from myJsPool import reset
+
+
+# Synthetic programs
+
+def many_statements(n):
+    # n top-level statements cycling through var, assign and exp statements
+    shapes = ('var x%d = %d;', 'x%d = x%d + 1;', 'f(x%d, %d);')
+    return '\n'.join(shapes[i % 3] % (i, i) for i in range(n))
+
+
+def many_arguments(n):
+    # one call with n arguments and one function with n parameters
+    params = ', '.join('p%d' % i for i in range(n))
+    args = ', '.join(str(i) for i in range(n))
+    return 'function f(%s) {return 0;}\nf(%s);' % (params, args)
+
+
+def deep_nesting(n):
+    # one expression nested n parentheses deep
+    return 'x = %s1%s;' % ('(' * n, ' + 1)' * n)
+
+
+def long_strings(n):
+    # n statements each with a string literal of 200 characters
+    text = ('a long string literal, ' * 9)[:200]
+    return '\n'.join('var s%d = "%s";' % (i, text) for i in range(n))
+
+
+def heavy_comments(n):
+    # n statements each after a /* */ comment over two lines and before a //
+    # comment
+    return '\n'.join('/* comment %d, a few words\n   over two lines */ x%d = %d; // and one to the end of the line'
+                     % (i, i, i) for i in range(n))
+
+
+# name -> program of n statements, levels of nesting, strings, comments or
+# parameters and arguments
+WORKLOADS = OrderedDict([
+    ('statements', many_statements),
+    ('nesting', deep_nesting),
+    ('strings', long_strings),
+    ('comments', heavy_comments),
+    ('parameters', many_arguments),
+])
+
+
+# Programs for the execution engines, each returns a known value. Recursion
+# stays shallow because the tree and closure engines map JavaScript calls
+# onto Python calls.
+PROGRAMS = {
+    'fibonacci': ('''function fib(n) {
+                         if (n < 2) {return n;}
+                         return fib(n - 1) + fib(n - 2);
+                     }
+                     return fib(20);''', 6765),
+    'factorial': ('''function factorial(n) {
+                         if (n <= 1) {return 1;}
+                         return n * factorial(n - 1);
+                     }
+                     function repeat(k, acc) {
+                         if (k == 0) {return acc;}
+                         return repeat(k - 1, acc + factorial(20) / factorial(18));
+                     }
+                     return repeat(100, 0);''', 100 * 380),
+    'arithmetic': ('''function poly(x) {
+                          return ((x * 3 + 2) * x - 7) / 2 + (x - 1) * (x + 1) - x * x;
+                      }
+                      function sum(n, acc) {
+                          if (n <= 0) {return acc;}
+                          return sum(n - 1, acc + poly(n) + poly(n + 1) + poly(-n));
+                      }
+                      function loop(k, acc) {
+                          if (k == 0) {return acc;}
+                          return loop(k - 1, acc + sum(60, 0));
+                      }
+                      return loop(60, 0);''', None),
+}
+
+
+# Helpers
+
+def best_of(func, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def make_parser():
+    return myJsLexer.build(), myJsParser.build()
+
+
+# Benchmarks
+
+def bench_scaling(sizes=(1000, 10000, 100000, 1000000), bound=2.0):
+    # Parse time per statement must stay flat as the program grows: the
+    # time per statement, or per argument, of the largest program may be at
+    # most bound times that of the smallest. Returns the measurements that
+    # are not flat.
+    jslexer, jsparser = make_parser()
+    failures = []
+    for label, unit, generate, counts in (('statements', 'stmt', many_statements, sizes),
+                                          ('arguments', 'arg', many_arguments, sizes[:-1])):
+        print('scaling: %-10s  seconds  us/%s' % (label, unit))
+        per_item = []
+        for n in counts:
+            source = generate(n)
+            repeat = 3 if n <= 100000 else 1
+            seconds = best_of(lambda: jsparser.parse(source, lexer=jslexer), repeat)
+            per_item.append(seconds / n)
+            print('scaling: %10d %8.3f %8.2f' % (n, seconds, seconds / n * 1e6))
+        ratio = per_item[-1] / per_item[0]
+        flat = ratio <= bound
+        print('scaling: %s %d to %d, %.2fx the time per %s%s' % (label, counts[0], counts[-1], ratio, unit,
+                                                                   '' if flat else ', NOT FLAT (bound %gx)' % bound))
+        if not flat:
+            failures.append(label)
+    return failures
+
+
+STARTUP = '''
+import time
+start = time.perf_counter()
+import myJsLexer, myJsParser
+myJsLexer.build(%(args)s)
+myJsParser.build(%(args)s)
+print(time.perf_counter() - start)
+'''
+
+
+def startup_times(repeat=5):
+    # label -> best seconds of a fresh interpreter building lexer and parser
+    # from the rules and loading the generated tables. The first cached run
+    # writes the tables.
+    directory = tempfile.mkdtemp()
+    here = os.path.dirname(os.path.abspath(__file__))
+    times = OrderedDict()
+    try:
+        for label, args in (('cold build', 'cache=False'), ('cached load', 'outputdir=%r' % directory)):
+            script = STARTUP % {'args': args}
+            subprocess.check_output([sys.executable, '-c', script], cwd=here)
+            times[label] = min(float(subprocess.check_output([sys.executable, '-c', script], cwd=here))
+                               for _ in range(repeat))
+    finally:
+        shutil.rmtree(directory)
+    return times
+
+
+def bench_startup(repeat=5):
+    # Fresh interpreters: building lexer and parser from the rules against
+    # loading the generated tables.
+    for label, seconds in startup_times(repeat).items():
+        print('startup: %-12s %8.2f ms' % (label, seconds * 1e3))
+
+
+def engine_times(engines, repeat=3):
+    # (program, engine) -> best seconds to run each of PROGRAMS
+    jslexer, jsparser = make_parser()
+    times = OrderedDict()
+    for name in sorted(PROGRAMS):
+        source, expected = PROGRAMS[name]
+        ast = jsparser.parse(source, lexer=jslexer)
+        results = set()
+        for engine in engines:
+            times[name, engine] = best_of(lambda: results.add(myJsInterpreter.run(ast, {}, engine)), repeat)
+        assert len(results) == 1 and (expected is None or results == {expected}), results
+    return times
+
+
+def bench_engines(engines=None, repeat=3):
+    # Run time of every program on every execution engine.
+    engines = engines or sorted(myJsInterpreter.ENGINES)
+    times = engine_times(engines, repeat)
+    print('engines: %-12s %s' % ('program', ' '.join('%10s' % name for name in engines)))
+    for name in sorted(PROGRAMS):
+        print('engines: %-12s %s' % (name, ' '.join('%9.3fs' % times[name, engine] for engine in engines)))
+
+
+def bench_memo(n=25):
+    # Naive recursive fibonacci of n on the closure engine, without and with
+    # myJsMemo, with caches of a few sizes: seconds, and the calls of fib
+    # that were looked up and found.
+    jslexer, jsparser = make_parser()
+    ast = jsparser.parse(PROGRAMS['fibonacci'][0].replace('fib(20)', 'fib(%d)' % n), lexer=jslexer)
+    results = set()
+    seconds = best_of(lambda: results.add(myJsClosure.run(ast, {})), 1)
+    print('memo: fib(%d) %-14s %10s %10s %10s %10s' % (n, 'cache', 'seconds', 'speedup', 'lookups', 'hit rate'))
+    print('memo: fib(%d) %-14s %9.4fs %10s' % (n, 'none', seconds, '1x'))
+    for max_entries in (1024, 8, 2):
+        def run():
+            memo = myJsMemo.Memo(max_entries)
+            results.add(memo.compile(ast)())
+            return memo.stats()['fib']
+        memo_seconds = best_of(run)
+        stats = run()
+        print('memo: fib(%d) %-14s %9.4fs %9.0fx %10d %9.1f%%' % (
+            n, '%d entries' % max_entries, memo_seconds, seconds / memo_seconds,
+            stats['hits'] + stats['misses'], stats['hit_rate'] * 100))
+    assert len(results) == 1, results
+
+
+def bench_sites(repeat=3):
+    # Run time of PROGRAMS on the closure engine as it is, with the call
+    # sites myJsRunProfile found monomorphic cached, and under the profiler.
+    jslexer, jsparser = make_parser()
+    print('sites: %-12s %10s %10s %8s %10s %8s' % ('program', 'closure', 'cached', 'sites', 'profiled', 'slower'))
+    for name in sorted(PROGRAMS):
+        source, expected = PROGRAMS[name]
+        ast = jsparser.parse(source, lexer=jslexer)
+        profiler = myJsRunProfile.RunProfiler(ast)
+        results = set()
+        profiled = best_of(lambda: results.add(profiler.run()), repeat)
+        cached = profiler.monomorphic()
+        plain = myJsClosure.compile_program(ast, {})
+        fast = myJsClosure.compile_program(ast, {}, cached)
+        plain_seconds = best_of(lambda: results.add(plain()), repeat)
+        cached_seconds = best_of(lambda: results.add(fast()), repeat)
+        assert len(results) == 1 and (expected is None or results == {expected}), results
+        print('sites: %-12s %9.3fs %9.3fs %4d/%-3d %9.3fs %7.1fx' % (
+            name, plain_seconds, cached_seconds, len(cached), len(profiler.sites), profiled,
+            profiled / plain_seconds))
+
+
+RECURSION = {
+    'count': '''function count(n) {if (n == 0) {return 0;} return 1 + count(n - 1);}
+                 return count(%d);''',
+    'tail': '''function loop(n, acc) {if (n == 0) {return acc;} return loop(n - 1, acc + 1);}
+                return loop(%d, 0);''',
+    'mutual': '''function even(n) {if (n == 0) {return true;} return odd(n - 1);}
+                  function odd(n) {if (n == 0) {return false;} return even(n - 1);}
+                  return even(%d);''',
+}
+
+
+def bench_recursion(depth=100000):
+    # Recursion depth times on every engine, with the peak memory of the
+    # run; the tree and closure engines recurse in Python and give up at its
+    # recursion limit, raised by the tree engine, and myJsVM keeps its own
+    # stack and runs tail calls in place.
+    jslexer, jsparser = make_parser()
+    print('recursion: %-8s %8s %-8s %10s %10s' % ('program', 'depth', 'engine', 'seconds', 'peak MB'))
+    for name in ('count', 'tail', 'mutual'):
+        ast = jsparser.parse(RECURSION[name] % depth, lexer=jslexer)
+        for engine in sorted(myJsInterpreter.ENGINES):
+            try:
+                seconds = best_of(lambda: myJsInterpreter.run(ast, {}, engine), 1)
+            except (RecursionError, myJsRuntime.JsRuntimeError) as e:
+                print('recursion: %-8s %8d %-8s %21s' % (name, depth, engine, type(e).__name__))
+                continue
+            tracemalloc.start()
+            myJsInterpreter.run(ast, {}, engine)
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print('recursion: %-8s %8d %-8s %10.3f %10.1f' % (name, depth, engine, seconds, peak / (1 << 20)))
+
+
+def bench_lexers(n=100000):
+    # Tokens per second of the PLY lexer and the hand-written one.
+    source = many_statements(n) + '\n/* a comment */ var s = "a string"; // and another\n' * (n // 10)
+    print('lexers: %-14s %10s %10s' % ('lexer', 'tokens', 'tokens/s'))
+    for name, lexer in (('myJsLexer', myJsLexer.build()), ('myJsFastLexer', myJsFastLexer.build())):
+        counts = []
+
+        def lex():
+            lexer.input(source)
+            counts.append(sum(1 for _ in iter(lexer.token, None)))
+        seconds = best_of(lex)
+        print('lexers: %-14s %10d %10.0f' % (name, counts[-1], counts[-1] / seconds))
+
+
+def bench_tokens(n=100000):
+    # Memory held by the tokens of a program as LexTokens and as a
+    # TokenBuffer, and parse time from the source and from the buffer.
+    jslexer, jsparser = make_parser()
+    source = many_statements(n)
+
+    def lex_all():
+        lexer = myJsFastLexer.build()
+        lexer.input(source)
+        return list(iter(lexer.token, None))
+    for label, tokenize in (('LexTokens', lex_all), ('TokenBuffer', lambda: myJsTokens.tokenize_all(source))):
+        tracemalloc.start()
+        tokens = tokenize()
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print('tokens: %-12s %8d tokens %8.1f MB %6.1f bytes/token'
+              % (label, len(tokens), size / (1 << 20), size / len(tokens)))
+    buffer = myJsTokens.tokenize_all(source)
+    parse_seconds = best_of(lambda: jsparser.parse(source, lexer=jslexer))
+    buffer_seconds = best_of(lambda: myJsTokens.parse(buffer, jsparser))
+    print('tokens: parse source %8.3f s' % parse_seconds)
+    print('tokens: parse buffer %8.3f s' % buffer_seconds)
+
+
+def bench_ast(n=100000):
+    # Memory held by the parse tree of a large program as tuples and as the
+    # typed nodes of myJsAst, with and without positions, and the parse time
+    # of each.
+    jslexer = myJsLexer.build()
+    source = ('\n'.join(source for source, _ in PROGRAMS.values()) + '\n') * (n // 30)
+    source += many_statements(n)
+    print('ast: %-8s %12s %10s %10s' % ('tree', 'nodes', 'MB', 'seconds'))
+    for label, typed, positions in (('tuples', False, False), ('typed', True, True),
+                                    ('bare', True, False)):
+        jsparser = myJsParser.build(typed=typed, positions=positions)
+        tracemalloc.start()
+        tree = jsparser.parse(source, lexer=jslexer)
+        size = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        nodes = myJsAst.count_nodes(tree) if typed else myJsOptimizer.count_nodes(tree)
+        del tree
+        seconds = best_of(lambda: jsparser.parse(source, lexer=jslexer))
+        print('ast: %-8s %12d %10.1f %10.3f' % (label, nodes, size / (1 << 20), seconds))
+
+
+def bench_cache(repeat=1000):
+    # Parsing the same program again against getting it from myJsCache, in
+    # memory and from the disk tier.
+    jslexer, jsparser = make_parser()
+    source = '\n'.join(source for source, _ in PROGRAMS.values())
+    directory = tempfile.mkdtemp()
+    try:
+        cache = myJsCache.ParseCache(directory=directory)
+        cache.parse(source)
+        parse_seconds = best_of(lambda: jsparser.parse(source, lexer=jslexer))
+        hit_seconds = best_of(lambda: [cache.parse(source) for _ in range(repeat)]) / repeat
+        cold = myJsCache.ParseCache(directory=directory)
+        disk_seconds = best_of(lambda: (cold.clear(), cold.parse(source)))
+    finally:
+        shutil.rmtree(directory)
+    print('cache: parse      %10.1f us' % (parse_seconds * 1e6))
+    print('cache: disk hit   %10.1f us' % (disk_seconds * 1e6))
+    print('cache: memory hit %10.1f us' % (hit_seconds * 1e6))
+    print('cache: %r' % cache.stats)
+
+
+def bench_binary(n=20000):
+    # Loading the tree of a program from myJsBinary, pickle and marshal
+    # against parsing it, and reading parts of it in place from a
+    # memory-mapped .jsast file.
+    jslexer, jsparser = make_parser()
+    source = ('\n'.join(source for source, _ in PROGRAMS.values()) + '\n') * (n // 30) + many_statements(n)
+    ast = jsparser.parse(source, lexer=jslexer)
+    data = myJsBinary.dumps(ast)
+    pickled = pickle.dumps(ast, pickle.HIGHEST_PROTOCOL)
+    marshalled = marshal.dumps(ast)
+    print('binary: %d statements, %d kB of source' % (len(ast), len(source) // 1000))
+    print('binary: %-14s %8s %10s' % ('load', 'kB', 'ms'))
+    for label, size, load in (('parse', len(source), lambda: jsparser.parse(source, lexer=jslexer)),
+                              ('myJsBinary', len(data), lambda: myJsBinary.loads(data)),
+                              ('pickle', len(pickled), lambda: pickle.loads(pickled)),
+                              ('marshal', len(marshalled), lambda: marshal.loads(marshalled))):
+        print('binary: %-14s %8d %10.2f' % (label, size // 1000, best_of(load) * 1e3))
+    fd, path = tempfile.mkstemp(suffix='.jsast')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        functions = []
+        open_seconds = best_of(lambda: myJsBinary.open_view(path))
+        walk_seconds = best_of(lambda: functions.append(
+            [stmt[1] for stmt in myJsBinary.open_view(path) if stmt.kind == 'function']))
+        last_seconds = best_of(lambda: myJsBinary.open_view(path)[-1].load())
+    finally:
+        os.remove(path)
+    print('binary: view open                %10.2f ms' % (open_seconds * 1e3))
+    print('binary: view function names (%d) %10.2f ms' % (len(functions[-1]), walk_seconds * 1e3))
+    print('binary: view last statement      %10.2f ms' % (last_seconds * 1e3))
+
+
+def bench_bytecode(n=20000):
+    # Loading a .jsbc file against lexing, parsing and compiling the source.
+    jslexer, jsparser = make_parser()
+    source = many_statements(n)
+    data = myJsBytecode.dumps(myJsBytecode.compile_program(jsparser.parse(source, lexer=jslexer)))
+    compile_seconds = best_of(lambda: myJsBytecode.compile_program(jsparser.parse(source, lexer=jslexer)))
+    load_seconds = best_of(lambda: myJsBytecode.loads(data))
+    print('bytecode: %d statements, %d bytes of .jsbc' % (n, len(data)))
+    print('bytecode: parse and compile %8.2f ms' % (compile_seconds * 1e3))
+    print('bytecode: load .jsbc        %8.2f ms' % (load_seconds * 1e3))
+
+
+def bench_incremental(lines=10000, edits=1000):
+    # Latency of single-character edits to a long source with myJsIncremental
+    # against parsing all of it again. Each edit changes one digit, so the
+    # source stays a valid program.
+    jslexer, jsparser = make_parser()
+    functions = ''.join('function g%d(n) {\n    if (n < %d) {return n;}\n    return g%d(n - 1);\n}\n' % (i, i, i)
+                        for i in range(lines // 8))
+    source = functions + many_statements(lines - functions.count('\n'))
+    doc = myJsIncremental.Document(source, jslexer, jsparser)
+    digits = [i for i, c in enumerate(source) if c.isdigit()]
+    rnd = random.Random(0)
+    times = []
+    for _ in range(edits):
+        i = rnd.choice(digits)
+        digit = str((int(doc.source[i]) + 1) % 10)
+        start = time.perf_counter()
+        doc.edit(i, i + 1, digit)
+        times.append(time.perf_counter() - start)
+    assert doc.ast == jsparser.parse(doc.source, lexer=jslexer)
+    full_seconds = best_of(lambda: jsparser.parse(doc.source, lexer=jslexer))
+    times.sort()
+    print('incremental: %d lines, %d top-level statements' % (doc.source.count('\n') + 1, len(doc.ast)))
+    print('incremental: full parse %10.2f ms' % (full_seconds * 1e3))
+    print('incremental: edit p50   %10.2f ms' % (times[len(times) // 2] * 1e3))
+    print('incremental: edit p99   %10.2f ms' % (times[len(times) * 99 // 100] * 1e3))
+
+
+def bench_lazy(functions=2000, called=10):
+    # Parsing a script of many functions of which few are called, eagerly
+    # and with myJsLazy, and running it on the tree evaluator.
+    jslexer, jsparser = make_parser()
+    body = ('    var a = n * %d + 1;\n    var b = (a - 2) * (a + 3) / 4;\n'
+            '    if (a < b) {a = a + b;} else {b = a - 1;}\n    return a + b;\n')
+    source = ''.join('function f%d(n) {\n%s}\n' % (i, body % i) for i in range(functions))
+    source += ''.join('f%d(%d);\n' % (i * functions // called, i) for i in range(called))
+    lazyparser = myJsLazy.LazyParser(jslexer, jsparser)
+    assert myJsLazy.force(lazyparser.parse(source)) == jsparser.parse(source, lexer=jslexer)
+    eager_seconds = best_of(lambda: jsparser.parse(source, lexer=jslexer))
+    lazy_seconds = best_of(lambda: lazyparser.parse(source))
+    run_seconds = best_of(lambda: myJsInterpreter.run(lazyparser.parse(source)))
+    print('lazy: %d functions, %d called, %d lines' % (functions, called, source.count('\n')))
+    print('lazy: eager parse        %8.1f ms' % (eager_seconds * 1e3))
+    print('lazy: lazy parse         %8.1f ms' % (lazy_seconds * 1e3))
+    print('lazy: lazy parse and run %8.1f ms' % (run_seconds * 1e3))
+
+
+STREAM = '''
+import resource, sys, time
+import myJsLexer, myJsStream
+start = time.perf_counter()
+if sys.argv[2] == 'stream':
+    count = sum(1 for _ in myJsStream.tokenize_file(sys.argv[1], myJsLexer.build()))
+else:
+    lexer = myJsLexer.build()
+    with open(sys.argv[1], encoding='utf-8') as f:
+        lexer.input(f.read())
+    count = sum(1 for _ in iter(lexer.token, None))
+print(count, time.perf_counter() - start, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+'''
+
+
+def bench_stream(megabytes=16):
+    # Peak memory of tokenizing a generated file with myJsStream against
+    # reading it into one string, each in a fresh interpreter.
+    here = os.path.dirname(os.path.abspath(__file__))
+    fd, path = tempfile.mkstemp(suffix='.js')
+    try:
+        block = (many_statements(3000) + '\nvar s = "a string\nover lines"; /* a comment\nover lines */\n').encode('utf-8')
+        with os.fdopen(fd, 'wb') as f:
+            for _ in range(megabytes * (1 << 20) // len(block) + 1):
+                f.write(block)
+        size = os.path.getsize(path)
+        print('stream: %.1f MB of source' % (size / (1 << 20)))
+        counts = set()
+        for mode in ('stream', 'whole'):
+            output = subprocess.check_output([sys.executable, '-c', STREAM, path, mode], cwd=here)
+            count, seconds, maxrss = output.decode().split()
+            counts.add(int(count))
+            print('stream: %-6s %10s tokens %8.2f s %8.1f MB peak' % (mode, count, float(seconds),
+                                                                     int(maxrss) / 1024))
+        assert len(counts) == 1, counts
+    finally:
+        os.remove(path)
+
+
+def measure(source, jslexer, jsparser, repeat=3):
+    # tokens, tokens per second of the lexer alone, best seconds to parse and
+    # the peak of memory allocated by one parse
+    counts = []
+
+    def lex():
+        reset(jslexer)
+        jslexer.input(source)
+        counts.append(sum(1 for _ in iter(jslexer.token, None)))
+
+    def parse():
+        reset(jslexer)
+        return jsparser.parse(source, lexer=jslexer)
+    lex_seconds = best_of(lex, repeat)
+    parse_seconds = best_of(parse, repeat)
+    tracemalloc.start()
+    parse()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return OrderedDict([('tokens', counts[-1]), ('tokens_per_second', counts[-1] / lex_seconds),
+                        ('parse_seconds', parse_seconds), ('peak_bytes', peak)])
+
+
+def environment():
+    return OrderedDict([('python', platform.python_version()), ('implementation', platform.python_implementation()),
+                        ('platform', platform.platform()), ('ply', ply.__version__)])
+
+
+def run_suite(size=10000, repeat=5):
+    # the results of the suite as {'environment': ..., 'size': size, 'metrics': ...}
+    # with the metrics flat, "workload:n.metric" -> value
+    jslexer, jsparser = make_parser()
+    metrics = OrderedDict()
+    for n in (size // 10, size):
+        for name, generate in WORKLOADS.items():
+            for metric, value in measure(generate(n), jslexer, jsparser, repeat).items():
+                metrics['%s:%d.%s' % (name, n, metric)] = value
+    for label, seconds in startup_times().items():
+        metrics['startup:%s.seconds' % label.split()[0]] = seconds
+    for (name, engine), seconds in engine_times(sorted(myJsInterpreter.ENGINES), repeat).items():
+        metrics['%s:%s.seconds' % (name, engine)] = seconds
+    return OrderedDict([('environment', environment()), ('size', size), ('metrics', metrics)])
+
+
+def regressed(metric, base, value, tolerance):
+    # whether value is worse than base by more than tolerance; counts must
+    # be equal, or the programs measured are not the same
+    if metric.endswith('_per_second'):
+        return value * (1 + tolerance) < base
+    if metric.endswith('seconds') or metric.endswith('_bytes'):
+        return value > base * (1 + tolerance)
+    return value != base
+
+
+def compare(baseline, results, tolerance=0.25):
+    # the names of the metrics of results that regressed from baseline,
+    # printing a line for each metric the two have in common
+    if baseline['environment'] != results['environment']:
+        print('compare: the baseline was measured on %s' % ', '.join(
+            '%s %s' % item for item in baseline['environment'].items()))
+    regressions = []
+    print('compare: %-36s %14s %14s %8s' % ('metric', 'baseline', 'now', 'change'))
+    for metric, value in results['metrics'].items():
+        base = baseline['metrics'].get(metric)
+        if base is None:
+            continue
+        change = '%+7.1f%%' % ((value - base) * 100.0 / base) if base else ''
+        flag = ''
+        if regressed(metric.rpartition('.')[2], base, value, tolerance):
+            regressions.append(metric)
+            flag = '  REGRESSION'
+        print('compare: %-36s %14.6g %14.6g %8s%s' % (metric, base, value, change, flag))
+    print('compare: %d regressions beyond %d%%' % (len(regressions), round(tolerance * 100)))
+    return regressions
+
+
+def bench_vector(n=1000000):
+    # One rule evaluated over n records with myJsVector against one call of
+    # myJsInterpreter per record, for a rule of numbers only and one with a
+    # string comparison that myJsVector does row by row.
+    if myJsVector.numpy is None:
+        print('vector: NumPy is not installed')
+        return
+    numpy = myJsVector.numpy
+    jslexer, jsparser = make_parser()
+    generator = numpy.random.default_rng(0)
+    columns = {
+        'price': generator.uniform(0, 100, n).round(2),
+        'qty': generator.integers(0, 20, n),
+        'discount': generator.uniform(0, 1, n),
+        'member': generator.random(n) < 0.3,
+        'region': generator.choice(['north', 'south', 'east'], n).tolist(),
+    }
+    rules = (('numbers', 'price * qty * (1 - discount) > 250 && !(qty < 2) || member && price >= 90'),
+             ('strings', 'price * qty > 500 && region == "north"'))
+    print('vector: %d rows %-8s %10s %10s %8s' % (n, 'rule', 'vector', 'rows', 'speedup'))
+    for label, source in rules:
+        exp = jsparser.parse(source + ';', lexer=jslexer)[0][1][1]
+        rule = myJsVector.compile_expression(exp)
+        results = []
+        vector_seconds = best_of(lambda: results.append(rule(columns)))
+        row_seconds = best_of(lambda: results.append(myJsVector.evaluate_rows(exp, columns)), 1)
+        assert results[0].tolist() == results[-1]
+        print('vector: %d rows %-8s %9.3fs %9.3fs %7.0fx' % (n, label, vector_seconds, row_seconds,
+                                                             row_seconds / vector_seconds))
+
+
+SCRIPTS = (
+    ('fib', 'function fib(n) {if (n < 2) {return n;} return fib(n - 1) + fib(n - 2);} return fib(n);'),
+    ('count', 'function count(n) {if (n == 0) {return 0;} return 1 + count(n - 1);} return count(n * 50);'),
+    ('text', 'function repeat(s, n) {if (n == 0) {return s;} return repeat(s + "ab", n - 1);} return repeat("", n * 20);'),
+    # runaways, ended by the limits of bench_scheduler
+    ('forever', 'function f(n) {return f(n + 1);} return f(n);'),
+    ('deep', 'function f(n) {return 1 + f(n);} return f(n);'),
+    ('grow', 'function grow(s) {return grow(s + s);} return grow("ab");'),
+)
+
+
+def bench_scheduler(scripts=10000, turns=(100, 1000, 10000)):
+    # scripts programs run at once by myJsScheduler, for every turn size:
+    # the SCRIPTS in turn with n from 4 to 10, one in 40 of them a runaway,
+    # under limits of 10000 steps, 1000 calls and 1MB strings. Wall time,
+    # scripts and steps per second, and the latency of the scripts from
+    # the start.
+    jslexer, jsparser = make_parser()
+    codes = dict((name, myJsBytecode.compile_program(jsparser.parse(source, lexer=jslexer)))
+                 for name, source in SCRIPTS)
+    work = []
+    for i in range(scripts):
+        if i % 40 == 39:
+            name = ('forever', 'deep', 'grow')[i // 40 % 3]
+        else:
+            name = ('fib', 'count', 'text')[i % 3]
+        work.append((codes[name], {'n': 4 + i % 7}))
+    print('scheduler: %d scripts %6s %9s %10s %10s %7s %10s %10s' % (
+        scripts, 'turn', 'seconds', 'scripts/s', 'steps/s', 'failed', 'p50 ms', 'p99 ms'))
+    for turn in turns:
+        scheduler = myJsScheduler.Scheduler(turn, max_steps=10000, max_depth=1000, max_string=1 << 20)
+
+        async def main():
+            return await asyncio.gather(*[scheduler.run(code, env) for code, env in work], return_exceptions=True)
+        start = time.perf_counter()
+        asyncio.run(main())
+        seconds = time.perf_counter() - start
+        stats = scheduler.stats()
+        print('scheduler: %d scripts %6d %8.2fs %10.0f %10.0f %7d %10.1f %10.1f' % (
+            scripts, turn, seconds, scripts / seconds, stats['steps'] / seconds, stats['failed'],
+            stats['p50_seconds'] * 1000, stats['p99_seconds'] * 1000))
+
+
+def bench_suite(size=10000):
+    # Tokens per second, parse time and peak memory of every workload at two
+    # sizes, startup times and engine run times, one line per metric.
+    results = run_suite(size)
+    for metric, value in results['metrics'].items():
+        print('suite: %-36s %14.6g' % (metric, value))
+    return results
+
+
+BENCHMARKS = {
+    'ast': bench_ast,
+    'binary': bench_binary,
+    'bytecode': bench_bytecode,
+    'cache': bench_cache,
+    'engines': bench_engines,
+    'incremental': bench_incremental,
+    'lazy': bench_lazy,
+    'lexers': bench_lexers,
+    'memo': bench_memo,
+    'recursion': bench_recursion,
+    'scaling': bench_scaling,
+    'scheduler': bench_scheduler,
+    'sites': bench_sites,
+    'startup': bench_startup,
+    'stream': bench_stream,
+    'suite': bench_suite,
+    'tokens': bench_tokens,
+    'vector': bench_vector,
+}
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='myJsBench.py', description='Benchmarks for the JavaScript lexer and parser.')
+    parser.add_argument('benchmarks', nargs='*', metavar='name[:size]', help='the benchmarks to run, all if none')
+    parser.add_argument('--json', metavar='FILE', help='write the results of the suite benchmark to FILE')
+    parser.add_argument('--baseline', metavar='FILE',
+                        help='compare the results of the suite benchmark with those in FILE')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='how much worse than the baseline is a regression (default 0.25)')
+    args = parser.parse_args(argv)
+    runs = []
+    for arg in args.benchmarks or sorted(BENCHMARKS):
+        name, _, size = arg.partition(':')
+        if name not in BENCHMARKS:
+            print('unknown benchmark %r, choose from %s' % (name, ', '.join(sorted(BENCHMARKS))))
+            return 2
+        runs.append((name, [int(size)] if size else []))
+    if (args.json or args.baseline) and 'suite' not in [name for name, _ in runs]:
+        print('--json and --baseline are for the suite benchmark')
+        return 2
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+    status = 0
+    for name, sizes in runs:
+        results = BENCHMARKS[name](*sizes)
+        if name == 'scaling' and results:
+            status = 1
+        if name != 'suite':
+            continue
+        if args.json:
+            with open(args.json, 'w', encoding='utf-8') as f:
+                json.dump(results, f, indent=2)
+                f.write('\n')
+        if baseline is not None and compare(baseline, results, args.tolerance):
+            return 1
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
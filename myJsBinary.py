@@ -0,0 +1,400 @@
+# A compact binary format for the parse trees of myJsParser.
+#
+#       dumps(ast) -> bytes / loads(data) -> ast
+#       dump(ast, f) / load(f)              the .jsast file format
+#       view(buffer) -> ListView            the tree read in place
+#       open_view(path) -> ListView         the tree of a file, memory-mapped
+#
+# A .jsast file is MAGIC, a version byte, the string table and the tree.
+# The string table holds every distinct string of the tree (names, string
+# literals, operators) once, in the order they first appear: its length,
+# then each string as its length in bytes and its UTF-8 bytes. The tree is
+# written parent first; every value starts with a tag byte:
+#
+#       LIST        the number of items and the size of the items in bytes,
+#                   4 bytes little-endian, then the items
+#       STRING      the index of the string in the table
+#       INT         the number, zigzag encoded: 0, -1, 1, -2... as 0, 1, 2, 3...
+#       FLOAT       8 bytes, a little-endian IEEE double
+#       TUPLE       the number of items, then the items
+#       KIND + k    a tuple that starts with KINDS[k] and has ARITY[k]
+#                   more items, which follow
+#
+# Numbers, counts and indexes are varints: 7 bits to a byte, low bits
+# first, the high bit set on every byte but the last. Every tuple that
+# myJsParser builds is a KIND tuple, one byte for its type; TUPLE is for
+# any other tuple, so ("number", 1) takes three bytes.
+#
+# loads() and dumps() use no recursion, so any tree the parser builds can
+# be written and read back, however deep, and loads(dumps(ast)) == ast.
+#
+# view() reads nothing but the string table: it returns a ListView of the
+# top-level statements over the buffer (bytes, a bytearray, a memoryview or
+# an mmap), and a ListView or NodeView decodes an item only when it is
+# looked at. A NodeView is a tuple read in place, with its kind, len(),
+# indexing and iteration; view[i] skips the items before it, once, and
+# the size of a list lets a whole body be skipped without reading it.
+# Strings are decoded once, when first used. load() of a view gives the
+# value it stands for. open_view() maps a file into memory, so that only
+# the pages of the parts looked at are read from disk, and the map stays
+# open while a view of it is alive.
+
+import gc
+import mmap
+import struct
+import sys
+
+
+MAGIC = b'JSAS'
+VERSION = 1
+
+LIST = 0
+STRING = 1
+INT = 2
+FLOAT = 3
+TUPLE = 4
+KIND = 16
+
+# the tuples myJsParser builds: their first item and the number of items after it
+KINDS = ('stmt', 'function', 'lambda', 'if-then', 'if-then-else', 'assign', 'var', 'return', 'exp', 'error',
+         'identifier', 'number', 'string', 'true', 'false', 'not', 'negative', 'binop', 'call')
+ARITY = (1, 3, 2, 2, 3, 2, 2, 1, 1, 0,
+         1, 1, 1, 1, 1, 1, 1, 3, 2)
+_CODES = dict((kind, KIND + k) for k, kind in enumerate(KINDS))
+
+_double = struct.Struct('<d')
+_size = struct.Struct('<I')
+
+
+def _varint(out, n):
+    while n >= 0x80:
+        out.append(n & 0x7f | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_varint(data, pos):
+    # the varint at pos and the position after it
+    shift = result = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+# Writing
+
+class _Patch(int):
+    # the position of the size of a list in the output, told apart from the
+    # numbers of the tree
+    __slots__ = ()
+
+
+def dumps(ast):
+    strings = {}
+    out = bytearray()
+    work = [ast]
+    while work:
+        value = work.pop()
+        kind = type(value)
+        if kind is str:
+            index = strings.get(value)
+            if index is None:
+                index = strings[value] = len(strings)
+            out.append(STRING)
+            _varint(out, index)
+        elif kind is tuple:
+            code = _CODES.get(value[0]) if value and type(value[0]) is str else None
+            if code is not None and len(value) == ARITY[code - KIND] + 1:
+                out.append(code)
+                work.extend(reversed(value[1:]))
+            else:
+                out.append(TUPLE)
+                _varint(out, len(value))
+                work.extend(reversed(value))
+        elif isinstance(value, list):       # FrozenList of myJsCache, LazyBody of myJsLazy
+            out.append(LIST)
+            _varint(out, len(value))
+            work.append(_Patch(len(out)))      # where the size goes, once the items are written
+            out.extend(b'\0\0\0\0')
+            work.extend(reversed(value))
+        elif kind is int:
+            out.append(INT)
+            _varint(out, value << 1 if value >= 0 else (-value << 1) - 1)
+        elif kind is float:
+            out.append(FLOAT)
+            out.extend(_double.pack(value))
+        elif kind is _Patch:
+            _size.pack_into(out, value, len(out) - value - 4)
+        else:
+            raise TypeError('cannot serialize %r' % (value,))
+    header = bytearray(MAGIC)
+    header.append(VERSION)
+    _varint(header, len(strings))
+    for string in strings:
+        data = string.encode('utf-8')
+        _varint(header, len(data))
+        header.extend(data)
+    return bytes(header + out)
+
+
+def dump(ast, f):
+    f.write(dumps(ast))
+
+
+# Reading
+
+def _header(data):
+    # the offsets of the strings in the table and the position of the tree
+    if bytes(data[:4]) != MAGIC:
+        raise ValueError('not a .jsast file')
+    if data[4] != VERSION:
+        raise ValueError('unsupported .jsast version %d' % data[4])
+    count, pos = _read_varint(data, 5)
+    offsets = []
+    for _ in range(count):
+        length, pos = _read_varint(data, pos)
+        offsets.append((pos, pos + length))
+        pos += length
+    return offsets, pos
+
+
+def _decode(data, pos, strings):
+    # the value at pos and the position after it
+    stack = []              # the items, count and type of the lists and tuples being read
+    items = []              # start with a list for the one value
+    remaining = 1
+    kind = list
+    while True:
+        tag = data[pos]
+        pos += 1
+        if tag >= KIND:
+            arity = ARITY[tag - KIND]
+            if arity:
+                stack.append((items, remaining, kind))
+                items, remaining, kind = [KINDS[tag - KIND]], arity, tuple
+                continue
+            value = (KINDS[tag - KIND],)
+        elif tag == STRING:
+            index = data[pos]
+            if index < 0x80:
+                pos += 1
+            else:
+                index, pos = _read_varint(data, pos)
+            value = strings[index]
+        elif tag == INT:
+            n = data[pos]
+            if n < 0x80:
+                pos += 1
+            else:
+                n, pos = _read_varint(data, pos)
+            value = n >> 1 if not n & 1 else -((n + 1) >> 1)
+        elif tag == LIST:
+            count, pos = _read_varint(data, pos)
+            pos += 4
+            if count:
+                stack.append((items, remaining, kind))
+                items, remaining, kind = [], count, list
+                continue
+            value = []
+        elif tag == FLOAT:
+            value = _double.unpack_from(data, pos)[0]
+            pos += 8
+        elif tag == TUPLE:
+            count, pos = _read_varint(data, pos)
+            if count:
+                stack.append((items, remaining, kind))
+                items, remaining, kind = [], count, tuple
+                continue
+            value = ()
+        else:
+            raise ValueError('bad tag %d at %d' % (tag, pos - 1))
+        items.append(value)
+        remaining -= 1
+        while not remaining:
+            if not stack:
+                return items[0], pos
+            value = items if kind is list else tuple(items)
+            items, remaining, kind = stack.pop()
+            items.append(value)
+            remaining -= 1
+
+
+def _skip(data, pos):
+    # the position after the value at pos
+    remaining = 1
+    while remaining:
+        tag = data[pos]
+        pos += 1
+        remaining -= 1
+        if tag >= KIND:
+            remaining += ARITY[tag - KIND]
+        elif tag == LIST:
+            _, pos = _read_varint(data, pos)
+            pos += 4 + _size.unpack_from(data, pos)[0]
+        elif tag == STRING or tag == INT:
+            _, pos = _read_varint(data, pos)
+        elif tag == FLOAT:
+            pos += 8
+        elif tag == TUPLE:
+            count, pos = _read_varint(data, pos)
+            remaining += count
+        else:
+            raise ValueError('bad tag %d at %d' % (tag, pos - 1))
+    return pos
+
+
+def loads(data):
+    offsets, pos = _header(data)
+    strings = [sys.intern(str(data[start:end], 'utf-8')) for start, end in offsets]
+    # A tree has no cycles for the garbage collector to find, but the lists
+    # and tuples of a large one set it off again and again, which takes
+    # about as long as the reading.
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        return _decode(data, pos, strings)[0]
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def load(f):
+    return loads(f.read())
+
+
+# Reading in place
+
+class _Strings(object):
+    # the string table, each string decoded when first used
+
+    def __init__(self, data, offsets):
+        self.data = data
+        self.offsets = offsets
+        self.decoded = [None] * len(offsets)
+
+    def __getitem__(self, index):
+        string = self.decoded[index]
+        if string is None:
+            start, end = self.offsets[index]
+            string = self.decoded[index] = sys.intern(str(self.data[start:end], 'utf-8'))
+        return string
+
+
+class _View(object):
+    __slots__ = ('data', 'strings', 'pos', 'start', 'length', 'offsets')
+
+    def __init__(self, data, strings, pos, start, length):
+        self.data = data
+        self.strings = strings
+        self.pos = pos              # of the tag
+        self.start = start          # of the first item
+        self.length = length        # of the items
+        self.offsets = None         # of the items up to the last one indexed
+
+    def __len__(self):
+        return self.length
+
+    def _offset(self, index):
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError('%s index out of range' % type(self).__name__)
+        offsets = self.offsets
+        if offsets is None:
+            offsets = self.offsets = [self.start]
+        while len(offsets) <= index:
+            offsets.append(_skip(self.data, offsets[-1]))
+        return offsets[index]
+
+    def _item(self, pos):
+        data = self.data
+        tag = data[pos]
+        if tag >= KIND:
+            return NodeView(data, self.strings, pos, pos + 1, KINDS[tag - KIND], ARITY[tag - KIND])
+        if tag == TUPLE:
+            count, start = _read_varint(data, pos + 1)
+            return NodeView(data, self.strings, pos, start, None, count)
+        if tag == LIST:
+            count, start = _read_varint(data, pos + 1)
+            return ListView(data, self.strings, pos, start + 4, count)
+        return _decode(data, pos, self.strings)[0]
+
+    def _items(self):
+        data = self.data
+        pos = self.start
+        for _ in range(self.length):
+            yield self._item(pos)
+            pos = _skip(data, pos)
+
+    def load(self):
+        # the value the view stands for
+        return _decode(self.data, self.pos, self.strings)[0]
+
+
+class ListView(_View):
+    __slots__ = ()
+
+    def __getitem__(self, index):
+        return self._item(self._offset(index))
+
+    def __iter__(self):
+        return self._items()
+
+    @property
+    def size(self):
+        # of the items, in bytes
+        return _size.unpack_from(self.data, self.start - 4)[0]
+
+    def __repr__(self):
+        return '<ListView of %d items>' % self.length
+
+
+class NodeView(_View):
+    # For a KIND tuple the items are the ones after the kind, which is item 0
+    # of the tuple and not in the data.
+    __slots__ = ('kind',)
+
+    def __init__(self, data, strings, pos, start, kind, length):
+        _View.__init__(self, data, strings, pos, start, length)
+        self.kind = kind            # None for a TUPLE
+
+    def __len__(self):
+        return self.length + (self.kind is not None)
+
+    def __getitem__(self, index):
+        if self.kind is None:
+            return self._item(self._offset(index))
+        if index < 0:
+            index += self.length + 1
+        if index == 0:
+            return self.kind
+        if index < 0:
+            raise IndexError('NodeView index out of range')
+        return self._item(self._offset(index - 1))
+
+    def __iter__(self):
+        if self.kind is not None:
+            yield self.kind
+        for item in self._items():
+            yield item
+
+    def __repr__(self):
+        return '<NodeView %s>' % (self.kind or 'tuple of %d' % self.length)
+
+
+def view(data):
+    offsets, pos = _header(data)
+    if data[pos] != LIST:
+        raise ValueError('the tree of a .jsast file is not a list')
+    count, start = _read_varint(data, pos + 1)
+    return ListView(data, _Strings(data, offsets), pos, start + 4, count)
+
+
+def open_view(path):
+    with open(path, 'rb') as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    return view(data)
@@ -0,0 +1,354 @@
+# Bytecode for the parse trees built by myJsParser, run by myJsVM.
+#
+#       compile_program(ast) -> Code
+#       disassemble(code) -> str
+#       dump(code, f) / load(f)             the .jsbc file format
+#
+# A Code object holds one function (or the program) as two parallel arrays,
+# one opcode per byte in ops and its operand in args, plus
+#
+#       consts      numbers, strings, true/false/undefined and nested Code
+#       names       the global names the code loads and stores
+#       nparams     the number of parameters
+#       nlocals     parameters plus the var and function names of the body
+#
+# Locals are addressed by the slots myJsResolver assigns. Locals of
+# an enclosing function are addressed by LOAD_OUTER / STORE_OUTER whose
+# operand packs the depth into the high bits and the slot into the low 16.
+# The program itself has a single local, slot 1, which holds the value of
+# the last top-level expression statement. "return f(...)" compiles to a
+# TAIL_CALL, which the machine runs in place of the call it is in.
+
+import marshal
+import sys
+from array import array
+
+from myJsResolver import resolve
+
+
+LOAD_CONST = 0              # push consts[arg]
+LOAD_LOCAL = 1              # push frame[arg]
+STORE_LOCAL = 2             # frame[arg] = pop
+LOAD_OUTER = 3              # push the slot of an enclosing frame
+STORE_OUTER = 4             # pop into the slot of an enclosing frame
+LOAD_GLOBAL = 5             # push globals[names[arg]]
+STORE_GLOBAL = 6            # globals[names[arg]] = pop
+POP = 7                     # discard the top of the stack
+ADD = 8
+SUBTRACT = 9
+MULTIPLY = 10
+DIVIDE = 11
+LESS = 12
+GREATER = 13
+LESS_EQUAL = 14
+GREATER_EQUAL = 15
+EQUAL = 16
+NOT_EQUAL = 17
+NOT = 18
+NEGATIVE = 19
+JUMP = 20                   # pc = arg
+JUMP_IF_FALSE = 21          # pop, jump if it is falsy
+JUMP_IF_FALSE_OR_POP = 22   # jump keeping the top if it is falsy, else pop it (&&)
+JUMP_IF_TRUE_OR_POP = 23    # jump keeping the top if it is truthy, else pop it (||)
+CALL = 24                   # call the function under arg arguments
+RETURN = 25                 # return pop
+MAKE_FUNCTION = 26          # push a function for the Code in consts[arg]
+DECLARE_GLOBAL = 27         # globals[names[arg]] = undefined unless it exists
+TAIL_CALL = 28              # CALL then RETURN, in place of the current call
+
+OPCODES = [
+    'LOAD_CONST', 'LOAD_LOCAL', 'STORE_LOCAL', 'LOAD_OUTER', 'STORE_OUTER', 'LOAD_GLOBAL', 'STORE_GLOBAL', 'POP',
+    'ADD', 'SUBTRACT', 'MULTIPLY', 'DIVIDE',
+    'LESS', 'GREATER', 'LESS_EQUAL', 'GREATER_EQUAL', 'EQUAL', 'NOT_EQUAL', 'NOT', 'NEGATIVE',
+    'JUMP', 'JUMP_IF_FALSE', 'JUMP_IF_FALSE_OR_POP', 'JUMP_IF_TRUE_OR_POP',
+    'CALL', 'RETURN', 'MAKE_FUNCTION', 'DECLARE_GLOBAL', 'TAIL_CALL',
+]
+
+BINARY_OPCODES = {
+    '+': ADD, '-': SUBTRACT, '*': MULTIPLY, '/': DIVIDE,
+    '<': LESS, '>': GREATER, '<=': LESS_EQUAL, '>=': GREATER_EQUAL,
+    '==': EQUAL, '!=': NOT_EQUAL,
+}
+
+HAS_CONST = (LOAD_CONST, MAKE_FUNCTION)
+HAS_NAME = (LOAD_GLOBAL, STORE_GLOBAL, DECLARE_GLOBAL)
+HAS_JUMP = (JUMP, JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP)
+HAS_OUTER = (LOAD_OUTER, STORE_OUTER)
+
+RESULT_SLOT = 1         # the program's completion value
+
+
+class Code(object):
+    __slots__ = ('name', 'params', 'nparams', 'nlocals', 'ops', 'args', 'consts', 'names')
+
+    def __init__(self, name, params, nlocals, ops, args, consts, names):
+        self.name = name
+        self.params = params
+        self.nparams = len(params)
+        self.nlocals = nlocals
+        self.ops = ops
+        self.args = args
+        self.consts = consts
+        self.names = names
+
+    def __repr__(self):
+        return '<Code %s, %d instructions>' % (self.name or '<lambda>', len(self.ops))
+
+
+def pack_outer(depth, slot):
+    if slot >= 0x10000:
+        raise ValueError('too many local variables')
+    return depth << 16 | slot
+
+
+def unpack_outer(arg):
+    return arg >> 16, arg & 0xffff
+
+
+# Compiler
+
+def compile_program(ast):
+    compiler = Compiler('<program>', ())
+    resolution = resolve(ast)
+    for name in resolution.globals:
+        compiler.emit(DECLARE_GLOBAL, compiler.name_slot(name))
+    for stmt in resolution.ast:
+        if stmt[0] == 'stmt' and stmt[1][0] == 'exp':
+            compiler.expression(stmt[1][1])
+            compiler.emit(STORE_LOCAL, RESULT_SLOT)
+        elif stmt[0] == 'lambda':
+            compiler.function(None, stmt[2], stmt[3])
+            compiler.emit(STORE_LOCAL, RESULT_SLOT)
+        else:
+            compiler.statement(stmt)
+    compiler.emit(LOAD_LOCAL, RESULT_SLOT)
+    compiler.emit(RETURN)
+    return compiler.code(RESULT_SLOT)
+
+
+class Compiler(object):
+
+    def __init__(self, name, params):
+        self.name = name
+        self.params = tuple(params)
+        self.ops = array('B')
+        self.args = array('i')
+        self.consts = []
+        self.const_index = {}
+        self.names = []
+        self.name_index = {}
+
+    def code(self, nlocals):
+        return Code(self.name, self.params, nlocals, self.ops, self.args, self.consts, self.names)
+
+    def emit(self, op, arg=0):
+        self.ops.append(op)
+        self.args.append(arg)
+        return len(self.ops) - 1
+
+    def here(self):
+        return len(self.ops)
+
+    def patch(self, at, target):
+        self.args[at] = target
+
+    def const(self, value):
+        # 0.0 and -0.0 are equal but not the same constant
+        key = (float, value.hex()) if type(value) is float else (type(value), value)
+        if key not in self.const_index:
+            self.const_index[key] = len(self.consts)
+            self.consts.append(value)
+        return self.const_index[key]
+
+    def name_slot(self, name):
+        if name not in self.name_index:
+            self.name_index[name] = len(self.names)
+            self.names.append(name)
+        return self.name_index[name]
+
+    # Variables
+
+    def load(self, name, binding):
+        if binding.depth is None:
+            self.emit(LOAD_GLOBAL, self.name_slot(name))
+        elif binding.depth == 0:
+            self.emit(LOAD_LOCAL, binding.slot)
+        else:
+            self.emit(LOAD_OUTER, pack_outer(binding.depth, binding.slot))
+
+    def store(self, name, binding):
+        if binding.depth is None:
+            self.emit(STORE_GLOBAL, self.name_slot(name))
+        elif binding.depth == 0:
+            self.emit(STORE_LOCAL, binding.slot)
+        else:
+            self.emit(STORE_OUTER, pack_outer(binding.depth, binding.slot))
+
+    # Statements
+
+    def block(self, stmts):
+        for stmt in stmts:
+            self.statement(stmt)
+
+    def statement(self, stmt):
+        kind = stmt[0]
+        if kind == 'stmt':
+            stmt = stmt[1]
+            kind = stmt[0]
+        if kind == 'function':
+            self.function(stmt[1], stmt[3], stmt[5])
+            self.store(stmt[1], stmt[4])
+        elif kind == 'lambda':
+            self.function(None, stmt[2], stmt[3])
+            self.emit(POP)
+        elif kind == 'if-then':
+            self.expression(stmt[1])
+            skip = self.emit(JUMP_IF_FALSE)
+            self.block(stmt[2])
+            self.patch(skip, self.here())
+        elif kind == 'if-then-else':
+            self.expression(stmt[1])
+            skip = self.emit(JUMP_IF_FALSE)
+            self.block(stmt[2])
+            done = self.emit(JUMP)
+            self.patch(skip, self.here())
+            self.block(stmt[3])
+            self.patch(done, self.here())
+        elif kind == 'assign' or kind == 'var':
+            self.expression(stmt[2])
+            self.store(stmt[1], stmt[3])
+        elif kind == 'return':
+            if stmt[1][0] == 'call':
+                self.expression(stmt[1], TAIL_CALL)
+            else:
+                self.expression(stmt[1])
+                self.emit(RETURN)
+        elif kind == 'exp':
+            self.expression(stmt[1])
+            self.emit(POP)
+        else:
+            raise ValueError('unknown statement %r' % (kind,))
+
+    def function(self, name, body, layout):
+        compiler = Compiler(name, layout.names[:layout.nparams])
+        compiler.block(body)
+        compiler.emit(LOAD_CONST, compiler.const(None))
+        compiler.emit(RETURN)
+        code = compiler.code(len(layout.names))
+        self.consts.append(code)
+        self.emit(MAKE_FUNCTION, len(self.consts) - 1)
+
+    # Expressions
+
+    def expression(self, exp, call=CALL):
+        # call is the opcode for a call, TAIL_CALL for "return f(...)"
+        kind = exp[0]
+        if kind == 'identifier':
+            self.load(exp[1], exp[2])
+        elif kind == 'number' or kind == 'string':
+            self.emit(LOAD_CONST, self.const(exp[1]))
+        elif kind == 'true':
+            self.emit(LOAD_CONST, self.const(True))
+        elif kind == 'false':
+            self.emit(LOAD_CONST, self.const(False))
+        elif kind == 'not':
+            self.expression(exp[1])
+            self.emit(NOT)
+        elif kind == 'negative':
+            self.expression(exp[1])
+            self.emit(NEGATIVE)
+        elif kind == 'binop':
+            op = exp[2]
+            self.expression(exp[1])
+            if op == '&&' or op == '||':
+                jump = self.emit(JUMP_IF_FALSE_OR_POP if op == '&&' else JUMP_IF_TRUE_OR_POP)
+                self.expression(exp[3])
+                self.patch(jump, self.here())
+            else:
+                self.expression(exp[3])
+                self.emit(BINARY_OPCODES[op])
+        elif kind == 'call':
+            self.load(exp[1], exp[3])
+            for arg in exp[2]:
+                self.expression(arg)
+            self.emit(call, len(exp[2]))
+        else:
+            raise ValueError('unknown expression %r' % (kind,))
+
+
+# Disassembler
+
+def disassemble(code):
+    lines = []
+    _disassemble(code, lines)
+    return '\n'.join(lines)
+
+
+def _disassemble(code, lines):
+    lines.append('code %s(%s) nlocals=%d' % (code.name or '<lambda>', ', '.join(code.params), code.nlocals))
+    nested = []
+    for pc in range(len(code.ops)):
+        op = code.ops[pc]
+        arg = code.args[pc]
+        note = ''
+        if op in HAS_CONST:
+            const = code.consts[arg]
+            note = repr(const)
+            if isinstance(const, Code):
+                nested.append(const)
+        elif op in HAS_NAME:
+            note = code.names[arg]
+        elif op in HAS_JUMP:
+            note = 'to %d' % arg
+        elif op in HAS_OUTER:
+            note = 'depth %d slot %d' % unpack_outer(arg)
+        lines.append('%6d %-22s %6d %s' % (pc, OPCODES[op], arg, note))
+    for code in nested:
+        lines.append('')
+        _disassemble(code, lines)
+
+
+# The .jsbc file format: MAGIC, a version byte, a byte order byte, then the
+# marshalled program. Code objects are marshalled as tuples, which no other
+# constant is.
+
+MAGIC = b'JSBC'
+VERSION = 2
+
+
+def dumps(code):
+    byteorder = b'<' if sys.byteorder == 'little' else b'>'
+    return MAGIC + bytes([VERSION]) + byteorder + marshal.dumps(_to_tuple(code))
+
+
+def loads(data):
+    if data[:4] != MAGIC:
+        raise ValueError('not a .jsbc file')
+    if data[4] != VERSION:
+        raise ValueError('unsupported .jsbc version %d' % data[4])
+    swap = data[5:6] != (b'<' if sys.byteorder == 'little' else b'>')
+    return _from_tuple(marshal.loads(data[6:]), swap)
+
+
+def dump(code, f):
+    f.write(dumps(code))
+
+
+def load(f):
+    return loads(f.read())
+
+
+def _to_tuple(code):
+    consts = [_to_tuple(c) if isinstance(c, Code) else c for c in code.consts]
+    return (code.name, code.params, code.nlocals, code.ops.tobytes(), code.args.tobytes(), consts, code.names)
+
+
+def _from_tuple(data, swap):
+    name, params, nlocals, ops, args, consts, names = data
+    code_ops = array('B', ops)
+    code_args = array('i')
+    code_args.frombytes(args)
+    if swap:
+        code_args.byteswap()
+    consts = [_from_tuple(c, swap) if isinstance(c, tuple) else c for c in consts]
+    return Code(name, tuple(params), nlocals, code_ops, code_args, consts, list(names))
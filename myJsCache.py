@@ -0,0 +1,184 @@
+# A cache of parse trees keyed by the source text.
+#
+#       cache = ParseCache(max_entries=1024, max_bytes=64 << 20, directory=None)
+#       cache.parse(input_string) -> ast
+#
+# The key is the SHA-256 of the source together with the signatures of
+# myJsLexer and myJsParser, so a change to the grammar or the token rules
+# never returns a tree built by the old one. Trees are kept in memory in
+# least recently used order until there are more than max_entries of them
+# or their marshalled size goes over max_bytes. With a directory, every
+# tree parsed is also written there as a marshal file named by its key and
+# read back when it is not in memory, for example by another process. A
+# file that cannot be read back, or written, is a miss: the source is
+# parsed, and kept in memory.
+#
+# The trees returned are shared by every caller, so their lists are
+# FrozenLists, which compare equal to lists but cannot be changed; tuples
+# are immutable already. A source that does not parse is not cached.
+#
+# cache.stats counts hits, misses, disk hits and writes, and evictions.
+# The cache can be used from several threads.
+
+import hashlib
+import marshal
+import os
+import threading
+from collections import OrderedDict
+
+import myJsLexer
+import myJsParser
+from myJsPool import reset
+
+
+class FrozenList(list):
+    # a list that cannot be changed
+
+    def _frozen(self, *args, **kwargs):
+        raise TypeError('parse trees from the cache cannot be changed')
+
+    append = extend = insert = remove = pop = clear = sort = reverse = _frozen
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _frozen
+
+    def __reduce__(self):
+        return (FrozenList, (list(self),))
+
+
+def freeze(tree):
+    if isinstance(tree, list):
+        return FrozenList(freeze(item) for item in tree)
+    if isinstance(tree, tuple):
+        return tuple(freeze(item) for item in tree)
+    return tree
+
+
+def grammar_version():
+    # the marshal version too, for trees written by another Python
+    return '%s%s-%d' % (myJsLexer.signature(), myJsParser.signature(), marshal.version)
+
+
+def source_key(source, version):
+    digest = hashlib.sha256(version.encode('ascii'))
+    digest.update(source.encode('utf-8'))
+    return digest.hexdigest()
+
+
+class CacheStats(object):
+
+    def __init__(self):
+        self.hits = 0           # found in memory
+        self.disk_hits = 0      # found on disk
+        self.misses = 0         # parsed
+        self.disk_writes = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return ('<CacheStats hits=%d disk_hits=%d misses=%d disk_writes=%d evictions=%d>'
+                % (self.hits, self.disk_hits, self.misses, self.disk_writes, self.evictions))
+
+
+class ParseCache(object):
+
+    def __init__(self, max_entries=1024, max_bytes=64 << 20, directory=None, lexer=None, parser=None):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.directory = directory
+        self.lexer = lexer or myJsLexer.build()
+        self.parser = parser or myJsParser.build()
+        self.version = grammar_version()
+        self.stats = CacheStats()
+        self.bytes = 0
+        self._entries = OrderedDict()   # key -> (ast, size)
+        self._lock = threading.Lock()
+        self._parse_lock = threading.Lock()     # the lexer and parser are not reentrant
+        if directory is not None and not os.path.isdir(directory):
+            os.makedirs(directory)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, source):
+        return source_key(source, self.version) in self._entries
+
+    def parse(self, source):
+        key = source_key(source, self.version)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                self.stats.hits += 1
+                return entry[0]
+        data = self._read(key)
+        ast = None
+        if data is not None:
+            try:
+                ast = freeze(marshal.loads(data))
+            except (EOFError, ValueError, TypeError):
+                data = None             # a corrupt file is parsed again
+            else:
+                with self._lock:
+                    self.stats.disk_hits += 1
+        if data is None:
+            with self._parse_lock:
+                reset(self.lexer)
+                ast = self.parser.parse(source, lexer=self.lexer)
+            with self._lock:
+                self.stats.misses += 1
+            if ast is None:
+                return None
+            data = marshal.dumps(ast)
+            self._write(key, data)
+            ast = freeze(ast)
+        with self._lock:
+            return self._add(key, ast, len(data))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.bytes = 0
+
+    def _add(self, key, ast, size):
+        # With self._lock held. Returns the tree in the cache, which is
+        # another thread's if it parsed the same source first. The newest
+        # tree stays even when it is over max_bytes on its own.
+        entry = self._entries.get(key)
+        if entry is not None:
+            return entry[0]
+        self._entries[key] = (ast, size)
+        self.bytes += size
+        while len(self._entries) > self.max_entries or (self.bytes > self.max_bytes and len(self._entries) > 1):
+            _, (_, evicted) = self._entries.popitem(last=False)
+            self.bytes -= evicted
+            self.stats.evictions += 1
+        return ast
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + '.ast')
+
+    def _read(self, key):
+        if self.directory is None:
+            return None
+        try:
+            with open(self._path(key), 'rb') as f:
+                return f.read()
+        except (IOError, OSError):
+            return None
+
+    def _write(self, key, data):
+        if self.directory is None:
+            return
+        path = self._path(key)
+        scratch = '%s.%d.%d' % (path, os.getpid(), threading.get_ident())
+        try:
+            with open(scratch, 'wb') as f:
+                f.write(data)
+            os.replace(scratch, path)
+        except OSError:
+            # the tree is still kept in memory
+            try:
+                os.remove(scratch)
+            except OSError:
+                pass
+            return
+        with self._lock:
+            self.stats.disk_writes += 1
@@ -0,0 +1,386 @@
+# Closure compilation: the parse tree is walked once and turned into nested
+# Python closures, one per node, so running the program never looks at a
+# node tag again.
+#
+#       compile_program(ast, globals, cached=None) -> program
+#       program() -> value                  same result as interpret()
+#
+# Everything that can be decided by looking at the tree is decided while
+# compiling: the operator function of every binop, and where every variable
+# lives. The tree is first run through myJsResolver; top-level names are
+# globals and are kept in the globals dict, and locals live in the frame
+# lists described there, so a local variable is found by following frame[0]
+# a fixed number of times and indexing, instead of searching dicts by name.
+#
+# The call sites of a program are numbered in the order they are compiled,
+# the same on every compilation of the same tree. cached maps the numbers of
+# some of them to the global name they call, the sites myJsRunProfile found
+# always calling the same function; each of those names gets a cell, a
+# one-item list that every store to the name updates along with the globals
+# dict and that program() fills from the dict when it starts, and its sites
+# take the function from the cell, which skips the lookup in the globals and
+# its KeyError check. A change made to the dict from Python while the
+# program runs, by a builtin, is not seen by the cached sites.
+
+import operator
+
+from myJsResolver import resolve
+from myJsRuntime import BINOPS, JsRuntimeError, logical_not, negative, truthy
+
+
+NORMAL = object()       # marks a statement list that finished without return
+_UNDEFINED = object()   # in the cell of a cached name that is not a global
+
+_NUMBER_TYPES = frozenset((int, float))
+
+# operators whose JavaScript result on two numbers is the Python one; not
+# "*", as 0 * -1 is -0 in JavaScript
+_NUMBER_OPS = {
+    '+': operator.add,
+    '-': operator.sub,
+    '<': operator.lt,
+    '>': operator.gt,
+    '<=': operator.le,
+    '>=': operator.ge,
+    '==': operator.eq,
+    '!=': operator.ne,
+}
+
+
+class CompiledFunction(object):
+    # A compiled function closed over the frame it was defined in. Calling it
+    # from Python (for example from a builtin) runs it like a JavaScript call.
+    __slots__ = ('name', 'params', 'nparams', 'padding', 'body', 'frame')
+
+    def __init__(self, name, params, padding, body, frame):
+        self.name = name
+        self.params = params
+        self.nparams = len(params)
+        self.padding = padding
+        self.body = body
+        self.frame = frame
+
+    def __call__(self, *args):
+        return call(self, list(args))
+
+    def __repr__(self):
+        return '<CompiledFunction %s(%s)>' % (self.name or '', ', '.join(self.params))
+
+
+def call(callee, args):
+    if type(callee) is CompiledFunction:
+        nparams = callee.nparams
+        if len(args) != nparams:
+            args = args[:nparams] + [None] * (nparams - len(args))
+        frame = [callee.frame]
+        frame += args
+        frame += callee.padding
+        value = callee.body(frame)
+        return None if value is NORMAL else value
+    if callable(callee):
+        return callee(*args)
+    raise JsRuntimeError('%r is not a function' % (callee,))
+
+
+def run(ast, env=None):
+    if env is None:
+        env = {}
+    elif not isinstance(env, dict):
+        env = env.names
+    return compile_program(ast, env)()
+
+
+def compile_program(ast, globals, cached=None):
+    return Compiler(globals, cached).program(ast)
+
+
+class Compiler(object):
+
+    def __init__(self, globals, cached=None):
+        self.globals = globals
+        self.cached = cached or {}      # call site number -> global name
+        self.cells = dict((name, [_UNDEFINED]) for name in set(self.cached.values()))
+        self.sites = 0                  # call sites compiled
+
+    def program(self, ast):
+        globals = self.globals
+        cells = list(self.cells.items())
+        resolution = resolve(ast)
+        for name in resolution.globals:
+            globals.setdefault(name, None)
+        steps = []
+        for stmt in resolution.ast:
+            if stmt[0] == 'stmt' and stmt[1][0] == 'exp':
+                steps.append((True, self.expression(stmt[1][1])))
+            elif stmt[0] == 'lambda':
+                steps.append((True, self.function(None, stmt[2], stmt[3])))
+            else:
+                steps.append((False, self.statement(stmt)))
+
+        def program():
+            for name, cell in cells:
+                cell[0] = globals.get(name, _UNDEFINED)
+            frame = [None]
+            result = None
+            for completes, step in steps:
+                value = step(frame)
+                if completes:
+                    result = value
+                elif value is not NORMAL:
+                    return value
+            return result
+        return program
+
+    # Variables
+
+    def load(self, name, binding):
+        if binding.depth is None:
+            globals = self.globals
+
+            def load_global(frame):
+                try:
+                    return globals[name]
+                except KeyError:
+                    raise JsRuntimeError('%s is not defined' % name)
+            return load_global
+        depth, slot = binding.depth, binding.slot
+        if depth == 0:
+            return lambda frame: frame[slot]
+        if depth == 1:
+            return lambda frame: frame[0][slot]
+
+        def load_outer(frame):
+            for _ in range(depth):
+                frame = frame[0]
+            return frame[slot]
+        return load_outer
+
+    def store(self, name, binding, value):
+        if binding.depth is None:
+            globals = self.globals
+            cell = self.cells.get(name)
+            if cell is not None:
+                def store_cached(frame):
+                    globals[name] = cell[0] = value(frame)
+                    return NORMAL
+                return store_cached
+
+            def store_global(frame):
+                globals[name] = value(frame)
+                return NORMAL
+            return store_global
+        depth, slot = binding.depth, binding.slot
+        if depth == 0:
+            def store_local(frame):
+                frame[slot] = value(frame)
+                return NORMAL
+            return store_local
+
+        def store_outer(frame):
+            result = value(frame)
+            for _ in range(depth):
+                frame = frame[0]
+            frame[slot] = result
+            return NORMAL
+        return store_outer
+
+    # Statements
+
+    def block(self, stmts):
+        steps = [self.statement(stmt) for stmt in stmts]
+        if len(steps) == 1:
+            return steps[0]
+
+        def block(frame):
+            for step in steps:
+                value = step(frame)
+                if value is not NORMAL:
+                    return value
+            return NORMAL
+        return block
+
+    def statement(self, stmt):
+        kind = stmt[0]
+        if kind == 'stmt':
+            stmt = stmt[1]
+            kind = stmt[0]
+        if kind == 'function':
+            make = self.function(stmt[1], stmt[3], stmt[5])
+            return self.store(stmt[1], stmt[4], make)
+        if kind == 'lambda':
+            make = self.function(None, stmt[2], stmt[3])
+
+            def lambda_stmt(frame):
+                make(frame)
+                return NORMAL
+            return lambda_stmt
+        if kind == 'if-then' or kind == 'if-then-else':
+            test = self.expression(stmt[1])
+            then = self.block(stmt[2])
+            if kind == 'if-then':
+                def if_then(frame):
+                    return then(frame) if truthy(test(frame)) else NORMAL
+                return if_then
+            otherwise = self.block(stmt[3])
+
+            def if_then_else(frame):
+                return then(frame) if truthy(test(frame)) else otherwise(frame)
+            return if_then_else
+        if kind == 'assign' or kind == 'var':
+            return self.store(stmt[1], stmt[3], self.expression(stmt[2]))
+        if kind == 'return':
+            return self.expression(stmt[1])
+        if kind == 'exp':
+            value = self.expression(stmt[1])
+
+            def exp_stmt(frame):
+                value(frame)
+                return NORMAL
+            return exp_stmt
+        raise JsRuntimeError('unknown statement %r' % (kind,))
+
+    def function(self, name, body, layout):
+        # returns a step that creates the function value in the current frame
+        code = self.function_body(name, body, layout)
+        padding = [None] * (len(layout.names) - layout.nparams)
+        params = list(layout.names[:layout.nparams])
+        return lambda frame: CompiledFunction(name, params, padding, code, frame)
+
+    def function_body(self, name, body, layout):
+        return self.block(body)
+
+    # Expressions
+
+    def expression(self, exp):
+        kind = exp[0]
+        if kind == 'identifier':
+            return self.load(exp[1], exp[2])
+        if kind == 'number' or kind == 'string':
+            value = exp[1]
+            return lambda frame: value
+        if kind == 'true':
+            return lambda frame: True
+        if kind == 'false':
+            return lambda frame: False
+        if kind == 'not':
+            operand = self.expression(exp[1])
+            return lambda frame: logical_not(operand(frame))
+        if kind == 'negative':
+            operand = self.expression(exp[1])
+            return lambda frame: negative(operand(frame))
+        if kind == 'binop':
+            return self.binop(exp)
+        if kind == 'call':
+            return self.call(exp)
+        raise JsRuntimeError('unknown expression %r' % (kind,))
+
+    def binop(self, exp):
+        op = exp[2]
+        left = self.expression(exp[1])
+        right = self.expression(exp[3])
+        if op == '&&':
+            def and_op(frame):
+                value = left(frame)
+                return right(frame) if truthy(value) else value
+            return and_op
+        if op == '||':
+            def or_op(frame):
+                value = left(frame)
+                return value if truthy(value) else right(frame)
+            return or_op
+        js_op = BINOPS[op]
+        number_op = _NUMBER_OPS.get(op)
+        if number_op is None:
+            return lambda frame: js_op(left(frame), right(frame))
+        if exp[3][0] == 'number':
+            # the right operand is a numeric literal: only the left needs a check
+            constant = exp[3][1]
+
+            def binop_constant(frame):
+                value = left(frame)
+                if type(value) in _NUMBER_TYPES:
+                    return number_op(value, constant)
+                return js_op(value, constant)
+            return binop_constant
+
+        def binop(frame):
+            a = left(frame)
+            b = right(frame)
+            if type(a) in _NUMBER_TYPES and type(b) in _NUMBER_TYPES:
+                return number_op(a, b)
+            return js_op(a, b)
+        return binop
+
+    def call(self, exp):
+        site = self.sites
+        self.sites += 1
+        if exp[3].depth is None and self.cached.get(site) == exp[1]:
+            return self.cached_call(exp[1], self.cells[exp[1]], [self.expression(arg) for arg in exp[2]])
+        callee = self.callee(site, exp)
+        args = [self.expression(arg) for arg in exp[2]]
+        nargs = len(args)
+
+        def call_site(frame):
+            function = callee(frame)
+            values = [arg(frame) for arg in args]
+            if type(function) is CompiledFunction and function.nparams == nargs:
+                new_frame = [function.frame]
+                new_frame += values
+                new_frame += function.padding
+                value = function.body(new_frame)
+                return None if value is NORMAL else value
+            return call(function, values)
+        return call_site
+
+    def callee(self, site, exp):
+        return self.load(exp[1], exp[3])
+
+    def cached_call(self, name, cell, args):
+        # a call site with its callee, the global name, in cell, with one or
+        # two arguments evaluated without a list comprehension
+        nargs = len(args)
+
+        def undefined():
+            return JsRuntimeError('%s is not defined' % name)
+        if nargs == 1:
+            arg, = args
+
+            def cached_call_1(frame):
+                function = cell[0]
+                if type(function) is CompiledFunction and function.nparams == 1:
+                    new_frame = [function.frame, arg(frame)]
+                    new_frame += function.padding
+                    value = function.body(new_frame)
+                    return None if value is NORMAL else value
+                if function is _UNDEFINED:
+                    raise undefined()
+                return call(function, [arg(frame)])
+            return cached_call_1
+        if nargs == 2:
+            first, second = args
+
+            def cached_call_2(frame):
+                function = cell[0]
+                if type(function) is CompiledFunction and function.nparams == 2:
+                    new_frame = [function.frame, first(frame), second(frame)]
+                    new_frame += function.padding
+                    value = function.body(new_frame)
+                    return None if value is NORMAL else value
+                if function is _UNDEFINED:
+                    raise undefined()
+                return call(function, [first(frame), second(frame)])
+            return cached_call_2
+
+        def cached_call(frame):
+            function = cell[0]
+            if function is _UNDEFINED:
+                raise undefined()
+            values = [arg(frame) for arg in args]
+            if type(function) is CompiledFunction and function.nparams == nargs:
+                new_frame = [function.frame]
+                new_frame += values
+                new_frame += function.padding
+                value = function.body(new_frame)
+                return None if value is NORMAL else value
+            return call(function, values)
+        return cached_call
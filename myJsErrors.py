@@ -0,0 +1,116 @@
+# Syntax errors collected as data instead of printed.
+#
+#       collector = ErrorCollector(max_errors=20, fail_fast=False)
+#       collector.parse(input_string) -> (ast, [Diagnostic])
+#
+# myJsLexer and myJsParser print a line for every illegal character and
+# syntax error. A collector parses with a clone of the lexer and a copy of
+# the parser whose error functions record a Diagnostic instead:
+#
+#       line, column        where the error is, both counting from 1
+#       message             "unexpected SEMICOLON" or "illegal character '@'"
+#       token, value        the token type and value found, None at the end
+#       expected            the token types the parser could have taken
+#                           there, sorted; '$end' is the end of the input.
+#                           The LALR tables merge states, so the set can
+#                           hold a token that would fail one step later.
+#
+# str(diagnostic) is "line 3, column 7: unexpected SEMICOLON, expected ...".
+#
+# The parser carries on after an error by skipping to the end of the
+# statement or block (the error rules of myJsParser), so the tree returned
+# has an ('error',) statement for each part that was skipped. A run of
+# illegal characters is one diagnostic. The parser reports nothing more
+# until it has taken three tokens after an error, so one mistake is not
+# reported again for every token that follows it.
+#
+# After max_errors diagnostics the parse stops and the tree is None. With
+# fail_fast the first error raises JsSyntaxError instead, which is the
+# cheapest way to reject a bad input. A collector is used by one thread at
+# a time, like the lexer and parser it copies.
+
+import copy
+from collections import namedtuple
+
+import myJsLexer
+import myJsParser
+from myJsPool import reset
+
+
+class Diagnostic(namedtuple('Diagnostic', 'line column message token value expected')):
+    __slots__ = ()
+
+    def __str__(self):
+        text = 'line %d, column %d: %s' % (self.line, self.column, self.message)
+        if self.expected:
+            text += ', expected ' + ', '.join('end of input' if t == '$end' else t for t in self.expected)
+        return text
+
+
+class JsSyntaxError(Exception):
+
+    def __init__(self, diagnostic):
+        Exception.__init__(self, str(diagnostic))
+        self.diagnostic = diagnostic
+
+
+class _Stop(Exception):
+    pass
+
+
+def column(source, lexpos):
+    return lexpos - source.rfind('\n', 0, lexpos)
+
+
+class ErrorCollector(object):
+
+    def __init__(self, max_errors=20, fail_fast=False, lexer=None, parser=None):
+        self.max_errors = max_errors
+        self.fail_fast = fail_fast
+        self.diagnostics = []
+        self.lexer = (lexer or myJsLexer.build()).clone()
+        self.lexer.lexstateerrorf = dict(self.lexer.lexstateerrorf)
+        self.lexer.lexstateerrorf['INITIAL'] = self._illegal
+        self.lexer.lexerrorf = self._illegal
+        self.parser = copy.copy(parser or myJsParser.build())
+        self.parser.errorfunc = self._unexpected
+        self._illegal_end = -1      # where the last run of illegal characters ended
+
+    def parse(self, source):
+        self.diagnostics = []
+        self._illegal_end = -1
+        reset(self.lexer)
+        try:
+            ast = self.parser.parse(source, lexer=self.lexer)
+        except _Stop:
+            ast = None
+        return ast, self.diagnostics
+
+    def _illegal(self, t):
+        lexer = t.lexer
+        lexer.skip(1)
+        if t.lexpos == self._illegal_end:     # the run goes on
+            value = self.diagnostics[-1].value + t.value[0]
+            self.diagnostics[-1] = self.diagnostics[-1]._replace(message='illegal characters %r' % value, value=value)
+        else:
+            self._add(Diagnostic(t.lineno, column(lexer.lexdata, t.lexpos), 'illegal character %r' % t.value[0],
+                                 None, t.value[0], ()))
+        self._illegal_end = t.lexpos + 1
+
+    def _unexpected(self, t):
+        parser = self.parser
+        expected = tuple(sorted(name for name in parser.action[parser.state] if name != 'error'))
+        if t is None:
+            lexer = self.lexer
+            self._add(Diagnostic(lexer.lineno, column(lexer.lexdata, len(lexer.lexdata)), 'unexpected end of input',
+                                 None, None, expected))
+        else:
+            self._add(Diagnostic(t.lineno, column(t.lexer.lexdata, t.lexpos), 'unexpected %s' % t.type,
+                                 t.type, t.value, expected))
+
+    def _add(self, diagnostic):
+        if self.fail_fast:
+            raise JsSyntaxError(diagnostic)
+        self.diagnostics.append(diagnostic)
+        if len(self.diagnostics) >= self.max_errors:
+            raise _Stop()
@@ -0,0 +1,233 @@
+# A hand-written lexer producing the same tokens as myJsLexer.
+#
+#       build() -> FastLexer
+#
+# FastLexer has the interface the parser and the rest of the package use on
+# a PLY lexer: input(), token(), iteration, clone(), begin(), skip(),
+# current_state(), lineno and lexpos. The tokens are ply.lex.LexToken objects
+# with the same type, value, lineno and lexpos as myJsLexer gives.
+#
+# PLY tries every rule as one alternative of a master regular expression and
+# calls a Python function for each identifier, number, string and newline.
+# Here the first character of the input picks the one rule that can match:
+#
+#       letter or _         IDENTIFIER or a reserved word
+#       digit               NUMBER
+#       "                   STRING
+#       /                   /* comment, // comment or DIVIDE
+#       newline             counts a line
+#       other               the operators of myJsLexer, longest first
+#
+# identifiers, numbers and strings are matched with the regular expressions
+# of the myJsLexer rules and the operators are read from its string rules,
+# so the two cannot drift apart. Characters that no rule matches go to the
+# error function of myJsLexer, as with PLY. Inside a /* */ comment the lexer
+# jumps to the next "*/" or newline, like t_comment_text of myJsLexer.
+
+import re
+import string
+
+from ply.lex import LexError, LexToken
+
+import myJsLexer
+
+
+_FLAGS = re.VERBOSE     # as PLY compiles the rules
+
+IDENTIFIER = re.compile(myJsLexer.t_IDENTIFIER.__doc__, _FLAGS)
+NUMBER = re.compile(myJsLexer.t_NUMBER.__doc__, _FLAGS)
+STRING = re.compile(myJsLexer.t_STRING.__doc__, _FLAGS)
+
+
+def _operators():
+    # first character -> [(text, type)] for the string rules that do not
+    # start like an identifier, which t_IDENTIFIER always matches first.
+    # PLY tries longer regular expressions first.
+    rules = []
+    for name in myJsLexer.tokens:
+        pattern = getattr(myJsLexer, 't_' + name, None)
+        if isinstance(pattern, str):
+            text = re.sub(r'\\(.)', r'\1', pattern)
+            if not IDENTIFIER.match(text):
+                rules.append((len(pattern), text, name))
+    rules.sort(key=lambda rule: -rule[0])
+    operators = {}
+    for _, text, name in rules:
+        operators.setdefault(text[0], []).append((text, name))
+    return operators
+
+
+OPERATORS = _operators()
+
+# kinds of first character
+_IGNORE, _NEWLINE, _WORD, _DIGIT, _QUOTE, _SLASH, _OPERATOR = range(7)
+
+FIRST = {}
+for c in myJsLexer.t_ignore:
+    FIRST[c] = _IGNORE
+FIRST['\n'] = _NEWLINE
+for c in string.ascii_letters + '_':
+    FIRST[c] = _WORD
+for c in string.digits:
+    FIRST[c] = _DIGIT
+FIRST['"'] = _QUOTE
+for c in OPERATORS:
+    FIRST[c] = _OPERATOR
+FIRST['/'] = _SLASH
+del c
+
+
+def build():
+    return FastLexer()
+
+
+class FastLexer(object):
+
+    def __init__(self):
+        self.lexdata = None
+        self.lexpos = 0
+        self.lexlen = 0
+        self.lineno = 1
+        self.lexstate = 'INITIAL'
+        self.lexstateerrorf = {'INITIAL': myJsLexer.t_error, 'comment': myJsLexer.t_comment_error}
+        self.lexerrorf = myJsLexer.t_error
+
+    def input(self, s):
+        if not isinstance(s[:1], str):
+            raise ValueError('Expected a string')
+        self.lexdata = s
+        self.lexpos = 0
+        self.lexlen = len(s)
+
+    def clone(self):
+        c = FastLexer.__new__(FastLexer)
+        c.__dict__.update(self.__dict__)
+        return c
+
+    def begin(self, state):
+        if state not in self.lexstateerrorf:
+            raise ValueError('Undefined state')
+        self.lexstate = state
+        self.lexerrorf = self.lexstateerrorf[state]
+
+    def current_state(self):
+        return self.lexstate
+
+    def skip(self, n):
+        self.lexpos += n
+
+    def __iter__(self):
+        return self
+
+    def __next__(self):
+        t = self.token()
+        if t is None:
+            raise StopIteration
+        return t
+
+    def token(self):
+        data = self.lexdata
+        pos = self.lexpos
+        end = self.lexlen
+        first = FIRST
+        while pos < end:
+            if self.lexstate == 'comment':
+                pos = self._comment(pos)
+                continue
+            c = data[pos]
+            kind = first.get(c)
+            if kind == _IGNORE:
+                pos += 1
+                continue
+            if kind == _WORD:
+                m = IDENTIFIER.match(data, pos)
+                value = m.group()
+                tok = LexToken()
+                tok.type = myJsLexer.reserved.get(value, 'IDENTIFIER')
+                tok.value = value
+                tok.lineno = self.lineno
+                tok.lexpos = pos
+                self.lexpos = m.end()
+                return tok
+            if kind == _NEWLINE:
+                self.lineno += 1
+                pos += 1
+                continue
+            if kind == _SLASH:
+                following = data[pos + 1:pos + 2]
+                if following == '*':
+                    self.begin('comment')
+                    pos += 2
+                    continue
+                if following == '/':
+                    newline = data.find('\n', pos)
+                    pos = end if newline < 0 else newline
+                    continue
+                kind = _OPERATOR
+            if kind == _OPERATOR:
+                for text, name in OPERATORS[c]:
+                    if data.startswith(text, pos):
+                        tok = LexToken()
+                        tok.type = name
+                        tok.value = text
+                        tok.lineno = self.lineno
+                        tok.lexpos = pos
+                        self.lexpos = pos + len(text)
+                        return tok
+            elif kind == _DIGIT:
+                m = NUMBER.match(data, pos)
+                value = m.group()
+                tok = LexToken()
+                tok.type = 'NUMBER'
+                tok.value = float(value) if '.' in value else int(value)
+                tok.lineno = self.lineno
+                tok.lexpos = pos
+                self.lexpos = m.end()
+                return tok
+            elif kind == _QUOTE:
+                m = STRING.match(data, pos)
+                if m is not None:
+                    value = m.group()
+                    tok = LexToken()
+                    tok.type = 'STRING'
+                    tok.value = value[1:-1]
+                    tok.lineno = self.lineno
+                    tok.lexpos = pos
+                    self.lineno += value.count('\n')
+                    self.lexpos = m.end()
+                    return tok
+            # no rule matches
+            tok = self._error(pos)
+            if tok:
+                return tok
+            pos = self.lexpos
+        self.lexpos = pos + 1
+        if data is None:
+            raise RuntimeError('No input string given with input()')
+        return None
+
+    def _comment(self, pos):
+        # skips to the end of the comment, counting the lines on the way
+        data = self.lexdata
+        close = data.find('*/', pos)
+        if close < 0:
+            self.lineno += data.count('\n', pos)
+            return self.lexlen
+        self.lineno += data.count('\n', pos, close)
+        self.begin('INITIAL')
+        return close + 2
+
+    def _error(self, pos):
+        # Hands the rest of the input to the error function as PLY does,
+        # which moves lexpos on and may return a token.
+        tok = LexToken()
+        tok.value = self.lexdata[pos:]
+        tok.lineno = self.lineno
+        tok.type = 'error'
+        tok.lexer = self
+        tok.lexpos = pos
+        self.lexpos = pos
+        newtok = self.lexerrorf(tok)
+        if self.lexpos == pos:
+            raise LexError("Scanning error. Illegal character '%s'" % (self.lexdata[pos]), self.lexdata[pos:])
+        return newtok
@@ -0,0 +1,118 @@
+# Parsing a source again after an edit without parsing all of it again.
+#
+#       doc = Document(input_string)
+#       doc.ast                             the parse tree of doc.source
+#       doc.edit(start, end, text) -> ast   doc.source[start:end] replaced by text
+#
+# A Document keeps the source cut into segments, one for each top-level
+# statement or function (topStmt in myJsParser): the offsets of its first
+# and last characters and the list of statements it parses to. A segment
+# ends at a ; or at the } that closes its outermost block, unless an else
+# follows.
+#
+# An edit is lexed again from the start of the segment before the first one
+# it touches, as an else typed after an if belongs to it, or from the start
+# of the source. The new tokens are cut into segments and each is parsed on
+# its own, until a segment starts at what was the start of a segment after
+# the edit: from there on the source and its lexing are as they were, so
+# the rest of the segments are kept, with their offsets moved by the change
+# in length, and their trees are reused as they are. doc.reparsed is the
+# number of segments the last edit parsed.
+#
+# For a source without syntax errors doc.ast is what myJsParser returns for
+# doc.source; the errors in a segment are reported and recovered from within
+# that segment alone. The offsets kept are those of the characters, so a
+# typed parser (myJsAst) must have positions=False: the positions in the
+# trees reused would be those of the source they were parsed from.
+
+from bisect import bisect_left
+
+import myJsLexer
+import myJsParser
+from myJsPool import reset
+
+
+class Document(object):
+
+    def __init__(self, source, lexer=None, parser=None):
+        self.lexer = (lexer or myJsLexer.build()).clone()
+        self.parser = parser or myJsParser.build()
+        self.source = source
+        self.starts = []
+        segments, _ = self._scan(0, lambda start: None)
+        self.starts = [start for start, _, _ in segments]
+        self.ends = [end for _, end, _ in segments]
+        self.trees = [tree for _, _, tree in segments]
+        self.reparsed = len(segments)
+        self.ast = [stmt for tree in self.trees for stmt in tree]
+
+    def edit(self, start, end, text):
+        if not 0 <= start <= end <= len(self.source):
+            raise ValueError('edit %d:%d outside the source of length %d' % (start, end, len(self.source)))
+        starts, ends, trees = self.starts, self.ends, self.trees
+        delta = len(text) - (end - start)
+        self.source = self.source[:start] + text + self.source[end:]
+
+        def resync(position):
+            # the index of the old segment starting at position, if it is
+            # past the edit
+            old = position - delta
+            if old < end:
+                return None
+            k = bisect_left(starts, old)
+            if k < len(starts) and starts[k] == old:
+                return k
+            return None
+
+        first = bisect_left(ends, start) - 1      # the segment before the first one touched
+        if first < 0:
+            first, position = 0, 0
+        else:
+            position = starts[first]
+        segments, k = self._scan(position, resync)
+        self.starts = starts[:first] + [s for s, _, _ in segments] + [s + delta for s in starts[k:]]
+        self.ends = ends[:first] + [e for _, e, _ in segments] + [e + delta for e in ends[k:]]
+        self.trees = trees[:first] + [tree for _, _, tree in segments] + trees[k:]
+        self.reparsed = len(segments)
+        self.ast = [stmt for tree in self.trees for stmt in tree]
+        return self.ast
+
+    def _scan(self, position, resync):
+        # The segments of the source from position on, as (start, end, tree),
+        # up to the first one that starts where resync(start) gives the index
+        # of an old segment, and that index (the number of old segments if
+        # the end of the source came first).
+        lexer = self.lexer
+        reset(lexer)
+        lexer.input(self.source)
+        lexer.lexpos = position
+        lexer.lineno = self.source.count('\n', 0, position) + 1
+        token = lexer.token
+        segments = []
+        tok = token()
+        while tok is not None:
+            start = tok.lexpos
+            k = resync(start)
+            if k is not None:
+                return segments, k
+            tokens = []
+            depth = 0
+            while tok is not None:
+                tokens.append(tok)
+                end = lexer.lexpos
+                kind = tok.type
+                tok = token()
+                if kind == 'LBRACE':
+                    depth += 1
+                elif kind == 'RBRACE':
+                    depth -= 1
+                    if depth <= 0 and (tok is None or tok.type != 'ELSE'):
+                        break
+                elif kind == 'SEMICOLON' and depth <= 0:
+                    break
+            segments.append((start, end, self._parse(tokens)))
+        return segments, len(self.starts)
+
+    def _parse(self, tokens):
+        tokens = iter(tokens)
+        return self.parser.parse(lexer=self.lexer, tokenfunc=lambda: next(tokens, None)) or []
@@ -0,0 +1,238 @@
+# Tree-walking evaluator for the parse trees built by myJsParser.
+#
+#       interpret(ast, env) -> value
+#       run(ast, env, engine) -> value      the same, on the named engine
+#
+# ast is the list returned by the parser and env is either an Env or a dict
+# of global bindings (Python callables in it can be called as builtins). The
+# result is the value of a top-level return statement if one runs, and
+# otherwise the value of the last top-level expression statement, much like
+# JavaScript's eval.
+#
+# Statements are executed by execute(), which returns the value of the first
+# return statement it runs, or NORMAL when control falls off the end. Passing
+# that value back up through the nested statement lists is cheaper than
+# raising an exception for every return in a hot recursive function.
+#
+# Every JavaScript call is a few nested Python calls, as few as execute()
+# and the evaluators can make them, and interpret() raises the recursion
+# limit of Python to RECURSION_LIMIT while it runs, so calls go about 10000
+# deep. Deeper recursion raises a JsRuntimeError.
+#
+# The other execution engines produce the same results and are listed in
+# ENGINES:
+#
+#       'tree'          this evaluator
+#       'closure'       myJsClosure, compiles the tree to Python closures first
+#       'vm'            myJsVM, compiles the tree to myJsBytecode first
+
+import sys
+
+import myJsClosure
+import myJsVM
+from myJsRuntime import BINOPS, Env, JsFunction, JsRuntimeError, declarations, logical_not, negative, truthy
+
+
+NORMAL = object()       # marks a statement list that finished without return
+RECURSION_LIMIT = 50000     # Python frames while interpreting, about five per JavaScript call
+
+
+def interpret(ast, env=None):
+    if env is None:
+        env = Env()
+    elif isinstance(env, dict):
+        env = Env(env)
+    names = env.names
+    for name in declarations(ast):
+        names.setdefault(name, None)
+    limit = sys.getrecursionlimit()
+    if limit < RECURSION_LIMIT:
+        sys.setrecursionlimit(RECURSION_LIMIT)
+    try:
+        return _interpret(ast, env)
+    except RecursionError:
+        raise JsRuntimeError('maximum call stack size exceeded') from None
+    finally:
+        sys.setrecursionlimit(limit)
+
+
+def _interpret(ast, env):
+    result = None
+    for stmt in ast:
+        kind = stmt[0]
+        if kind == 'stmt' and stmt[1][0] == 'exp':
+            result = evaluate(stmt[1][1], env)
+        elif kind == 'lambda':
+            result = JsFunction(None, stmt[1], stmt[2], env)
+        else:
+            value = STATEMENTS[kind](stmt, env)
+            if value is not NORMAL:
+                return value
+    return result
+
+
+def run(ast, env=None, engine='tree'):
+    if engine not in ENGINES:
+        raise ValueError('unknown engine %r, choose from %s' % (engine, ', '.join(sorted(ENGINES))))
+    return ENGINES[engine](ast, env)
+
+
+def execute(stmts, env):
+    for stmt in stmts:
+        if stmt[0] == 'stmt':
+            stmt = stmt[1]          # one Python frame less for every statement
+        value = STATEMENTS[stmt[0]](stmt, env)
+        if value is not NORMAL:
+            return value
+    return NORMAL
+
+
+def evaluate(exp, env):
+    return EXPRESSIONS[exp[0]](exp, env)
+
+
+def call(callee, args):
+    if isinstance(callee, JsFunction):
+        params = callee.params
+        declared = callee.declared
+        names = dict.fromkeys(callee.declare() if declared is None else declared)
+        for i in range(len(params)):
+            names[params[i]] = args[i] if i < len(args) else None
+        value = execute(callee.body, Env(names, callee.env))
+        return None if value is NORMAL else value
+    if callable(callee):
+        return callee(*args)
+    raise JsRuntimeError('%r is not a function' % (callee,))
+
+
+# Statements
+
+def _exec_stmt(stmt, env):
+    stmt = stmt[1]
+    return STATEMENTS[stmt[0]](stmt, env)
+
+
+def _exec_function(stmt, env):
+    env.names[stmt[1]] = JsFunction(stmt[1], stmt[2], stmt[3], env)
+    return NORMAL
+
+
+def _exec_lambda(stmt, env):
+    JsFunction(None, stmt[1], stmt[2], env)
+    return NORMAL
+
+
+def _exec_if_then(stmt, env):
+    if truthy(evaluate(stmt[1], env)):
+        return execute(stmt[2], env)
+    return NORMAL
+
+
+def _exec_if_then_else(stmt, env):
+    if truthy(evaluate(stmt[1], env)):
+        return execute(stmt[2], env)
+    return execute(stmt[3], env)
+
+
+def _exec_assign(stmt, env):
+    env.assign(stmt[1], evaluate(stmt[2], env))
+    return NORMAL
+
+
+def _exec_return(stmt, env):
+    exp = stmt[1]
+    return EXPRESSIONS[exp[0]](exp, env)
+
+
+def _exec_var(stmt, env):
+    env.names[stmt[1]] = evaluate(stmt[2], env)
+    return NORMAL
+
+
+def _exec_exp(stmt, env):
+    evaluate(stmt[1], env)
+    return NORMAL
+
+
+def _exec_error(stmt, env):
+    raise ValueError('unknown statement %r' % (stmt[0],))
+
+
+STATEMENTS = {
+    'stmt': _exec_stmt,
+    'function': _exec_function,
+    'lambda': _exec_lambda,
+    'if-then': _exec_if_then,
+    'if-then-else': _exec_if_then_else,
+    'assign': _exec_assign,
+    'return': _exec_return,
+    'var': _exec_var,
+    'exp': _exec_exp,
+    'error': _exec_error,
+}
+
+
+# Expressions
+
+def _eval_identifier(exp, env):
+    return env.lookup(exp[1])
+
+
+def _eval_literal(exp, env):
+    return exp[1]
+
+
+def _eval_true(exp, env):
+    return True
+
+
+def _eval_false(exp, env):
+    return False
+
+
+def _eval_not(exp, env):
+    return logical_not(evaluate(exp[1], env))
+
+
+def _eval_negative(exp, env):
+    return negative(evaluate(exp[1], env))
+
+
+def _eval_binop(exp, env):
+    op = exp[2]
+    left = exp[1]
+    left = EXPRESSIONS[left[0]](left, env)
+    right = exp[3]
+    if op == '&&':
+        return EXPRESSIONS[right[0]](right, env) if truthy(left) else left
+    if op == '||':
+        return left if truthy(left) else EXPRESSIONS[right[0]](right, env)
+    return BINOPS[op](left, EXPRESSIONS[right[0]](right, env))
+
+
+def _eval_call(exp, env):
+    callee = env.lookup(exp[1])
+    args = []
+    for arg in exp[2]:
+        args.append(EXPRESSIONS[arg[0]](arg, env))
+    return call(callee, args)
+
+
+EXPRESSIONS = {
+    'identifier': _eval_identifier,
+    'number': _eval_literal,
+    'string': _eval_literal,
+    'true': _eval_true,
+    'false': _eval_false,
+    'not': _eval_not,
+    'negative': _eval_negative,
+    'binop': _eval_binop,
+    'call': _eval_call,
+}
+
+
+ENGINES = {
+    'tree': interpret,
+    'closure': myJsClosure.run,
+    'vm': myJsVM.run,
+}
@@ -0,0 +1,221 @@
+# Parsing the bodies of top-level functions only when they are used.
+#
+#       parser = LazyParser(lexer=None, parser=None)
+#       parser.parse(input_string) -> ast   function bodies are LazyBody lists
+#       force(ast) -> ast                   the tree with every body parsed
+#
+# A LazyParser hands the parser only the braces of the body of a top-level
+# "function name(...) {...}". The closing brace is found by a scan for just
+# the strings, comments and braces of the body, which is much cheaper than
+# lexing it, and carries a LazyBody holding where the body is in the
+# source. The parse tree is the one myJsParser builds, with the LazyBody as
+# the body of each of those functions (Function.body for a typed parser). A
+# body that is never closed is lexed and parsed like the rest, for the
+# parser to report.
+#
+# A LazyBody is a list that parses its source the first time it is looked
+# at or changed, by iterating, indexing, len(), ==, +, copy(), append() and
+# so on, and keeps the statements in itself from then on. They are what
+# parsing the whole source at once gives, the body being parsed with its
+# braces; a syntax error in a body is reported when the body is parsed. The
+# tree evaluator (myJsInterpreter) parses a body at the first call of its
+# function. myJsClosure and myJsVM compile the whole tree before running,
+# so they parse every body first. force(ast) returns the tree with plain
+# lists for the bodies, for marshal and for comparing with a list exactly.
+#
+# A LazyParser and the bodies it returns share one lexer and parser, so
+# they are used by one thread at a time.
+
+import copy
+import re
+
+import ply.lex as lex
+
+import myJsLexer
+import myJsParser
+from myJsPool import reset
+
+
+class LazyBody(list):
+    __slots__ = ('unparsed', 'parser', 'source', 'start', 'end', 'lineno')
+
+    def __init__(self, parser, source, start, end, lineno):
+        list.__init__(self)
+        self.unparsed = True
+        self.parser = parser
+        self.source = source
+        self.start = start
+        self.end = end
+        self.lineno = lineno
+
+    def force(self):
+        if self.unparsed:
+            self.unparsed = False
+            list.extend(self, self.parser.parse_body(self.source, self.start, self.end, self.lineno))
+            self.parser = self.source = None
+        return self
+
+    def __repr__(self):
+        if self.unparsed:
+            return '<LazyBody %d:%d>' % (self.start, self.end)
+        return list.__repr__(self)
+
+    def __radd__(self, other):
+        if not isinstance(other, list):
+            return NotImplemented
+        return other + list(self)
+
+    def __reduce__(self):
+        return (list, (list(self),))
+
+
+def _forcing(name):
+    method = getattr(list, name)
+
+    def forcing(self, *args):
+        return method(self.force(), *args)
+    forcing.__name__ = name
+    return forcing
+
+
+# every list method that looks at or changes the statements, copy(), + and
+# the comparisons included, parses the body first
+for _name in ('__iter__', '__reversed__', '__len__', '__getitem__', '__contains__', '__eq__', '__ne__',
+              '__lt__', '__le__', '__gt__', '__ge__', '__add__', '__iadd__', '__mul__', '__rmul__',
+              '__imul__', '__setitem__', '__delitem__', 'append', 'extend', 'insert', 'remove', 'pop', 'clear',
+              'index', 'count', 'copy', 'sort', 'reverse'):
+    setattr(LazyBody, _name, _forcing(_name))
+
+
+# The strings, comments and braces of the source as the lexer finds them:
+# its string rule, a comment to */ or, if it is not closed, to the end, and
+# a comment to the end of the line.
+_BRACES = re.compile(r'%s|/\*(?s:.*?)\*/|/\*(?s:.*)|//.*|[{}]' % myJsLexer.t_STRING.__doc__)
+
+
+def closing_brace(source, start):
+    # the offset of the } closing the block whose { is just before start,
+    # or -1 if it is not closed
+    nested = 1
+    for match in _BRACES.finditer(source, start):
+        text = match.group()
+        if text == '{':
+            nested += 1
+        elif text == '}':
+            nested -= 1
+            if not nested:
+                return match.start()
+    return -1
+
+
+def p_compoundstmt(p):
+    # a body left for later is an empty topStmts and a LazyBody on the }
+    body = p[3]
+    p[0] = body if type(body) is LazyBody else p[2]
+
+
+class LazyParser(object):
+
+    def __init__(self, lexer=None, parser=None):
+        self.lexer = (lexer or myJsLexer.build()).clone()
+        self.eager = parser or myJsParser.build()
+        productions = []
+        for production in self.eager.productions:
+            if production.func == 'p_compoundstmt':
+                production = copy.copy(production)
+                production.callable = p_compoundstmt
+            productions.append(production)
+        self.parser = copy.copy(self.eager)
+        self.parser.productions = productions
+
+    def parse(self, source):
+        lexer = self.lexer
+        reset(lexer)
+        lexer.input(source)
+        return self.parser.parse(lexer=lexer, tokenfunc=self._tokens(source).__next__)
+
+    def _tokens(self, source):
+        # the tokens of the source with the bodies of top-level functions
+        # left out, then None forever
+        lexer = self.lexer
+        token = lexer.token
+        depth = 0
+        function = False        # after "function name" at the top level
+        last = None
+        tok = token()
+        while tok is not None:
+            kind = tok.type
+            if kind == 'LBRACE':
+                if depth == 0 and function and last == 'RPAREN':
+                    function = False
+                    start, lineno = lexer.lexpos, lexer.lineno
+                    end = closing_brace(source, start)
+                    if end >= 0:
+                        lexer.lexpos = end + 1
+                        lexer.lineno += source.count('\n', start, end)
+                        yield tok
+                        tok = lex.LexToken()
+                        tok.type = last = 'RBRACE'
+                        tok.value = LazyBody(self, source, start, end, lineno)
+                        tok.lineno = lexer.lineno
+                        tok.lexpos = end
+                        yield tok
+                        tok = token()
+                        continue
+                depth += 1
+            elif kind == 'RBRACE':
+                depth -= 1
+                function = False
+            elif kind == 'IDENTIFIER' and last == 'FUNCTION':
+                function = depth == 0
+            elif kind == 'SEMICOLON':
+                function = False
+            last = kind
+            yield tok
+            tok = token()
+        while True:
+            yield None
+
+    def parse_body(self, source, start, end, lineno):
+        # the body with its braces, parsed as the compoundstmt of a function
+        # for the errors in it to be recovered from as in a whole parse
+        lexer = self.lexer
+        reset(lexer)
+        lexer.input(source)
+        lexer.lexpos = start - 1
+        lexer.lexlen = end + 1
+        lexer.lineno = lineno
+        ast = self.eager.parse(lexer=lexer, tokenfunc=self._function_tokens(start - 1, lineno).__next__)
+        if not ast:
+            return []
+        function = ast[0]
+        return function[3] if type(function) is tuple else function.body
+
+    def _function_tokens(self, lexpos, lineno):
+        # "function f()" then the tokens of the lexer, then None forever
+        for kind, value in (('FUNCTION', 'function'), ('IDENTIFIER', 'f'), ('LPAREN', '('), ('RPAREN', ')')):
+            tok = lex.LexToken()
+            tok.type = kind
+            tok.value = value
+            tok.lineno = lineno
+            tok.lexpos = lexpos
+            yield tok
+        token = self.lexer.token
+        tok = token()
+        while tok is not None:
+            yield tok
+            tok = token()
+        while True:
+            yield None
+
+
+def force(ast):
+    result = []
+    for stmt in ast:
+        if type(stmt) is tuple:
+            if stmt[0] == 'function' and type(stmt[3]) is LazyBody:
+                stmt = stmt[:3] + (list(stmt[3]),)
+        elif type(getattr(stmt, 'body', None)) is LazyBody:
+            stmt.body = list(stmt.body)
+        result.append(stmt)
+    return result
@@ -1,4 +1,7 @@
+import sys
+
 import ply.lex as lex
+import myJsTables
 
 
 states = (('comment', 'exclusive'),)    # comment state rules
@@ -21,6 +24,13 @@ def t_comment_newline(t):
     t.lexer.lineno += 1
 
 
+def t_comment_text(t):
+    r'(?:[^*\n]|\*(?!/))+'
+    # everything up to the next newline or */ at once: the error function
+    # below is handed a copy of the rest of the input for every character
+    pass
+
+
 def t_comment_error(t):
     # print "JavaScript Lexer (comment state): Illegal character " + t.value[0]
     t.lexer.skip(1)
@@ -123,8 +133,43 @@ def t_NUMBER(t):
 
 def t_STRING(t):
     r'"(?:[^"\\]|(?:\\.))*"'
+    t.lexer.lineno += t.value.count('\n')
     t.value = t.value[1:-1]
     return t
 
 t_ignore = ' \t\v\r'  # whitespace
 t_comment_ignore = ' \t\v\r'
+
+
+def signature():
+    # hash of everything that shapes the master regular expression
+    namespace = globals()
+    strings = sorted((name, value) for name, value in namespace.items()
+                     if name.startswith('t_') and isinstance(value, str))
+    return myJsTables.signature([tokens, states, sorted(reserved.items()), strings,
+                                 myJsTables.rule_functions(namespace, 't_')])
+
+
+def build(outputdir=None, cache=True):
+    # Return a new lexer. With cache the master regular expression is read
+    # from a generated table module instead of being compiled from the rules.
+    module = sys.modules[__name__]
+    if not cache:
+        return lex.lex(module=module)
+    if outputdir is None:
+        outputdir = myJsTables.TABLE_DIR
+    name = myJsTables.table_name('myJsLextab', signature())
+    table = myJsTables.load_table(name, outputdir)
+    if table is not None:
+        try:
+            return lex.lex(module=module, optimize=1, lextab=table)
+        except ImportError:     # written by another version of PLY
+            pass
+    lexer = lex.lex(module=module)
+
+    def write(directory, module):
+        if directory is not None:
+            lexer.writetab(module, directory)
+    myJsTables.write_table(name, outputdir, write)
+    myJsTables.remove_stale('myJsLextab', name, outputdir)
+    return lexer
@@ -0,0 +1,156 @@
+# Memoizing the pure functions of a program, on the closure engine.
+#
+#       memo = Memo(max_entries=1024, limits=None, builtins=())
+#       program = memo.compile(ast, env, cached=None)     a program of myJsClosure
+#       program() -> value
+#       memo.stats() -> dict                the counts of every function, for json
+#       memo.clear()                        forget every result
+#       run(ast, env=None) -> value
+#
+# memo.compile() compiles like myJsClosure.compile_program, cached call
+# sites and all, with the functions myJsPurity finds pure wrapped in a
+# cache of their results keyed by their arguments. builtins are passed on
+# to myJsPurity: the names of the builtins of env that are pure. The
+# memoizing is opt-in: nothing else uses it.
+#
+# A call whose arguments are all numbers and strings looks them up in the
+# cache of the function and returns the result found, or runs the body and
+# keeps its result. A call with any other argument, true/false, undefined or
+# a function, runs the body and is counted as skipped. The key tells 1 from
+# "1" and 1.0 from 1, and -0.0 from 0.0, as 1 / -0.0 is -Infinity. A call
+# that raises keeps nothing.
+#
+# Each function keeps at most max_entries results, or limits[name] for the
+# names in limits, and forgets the least recently used one when it has one
+# too many. Functions are named as in myJsPurity. The results of a
+# compiled program are its own: compiling again starts with empty caches,
+# while the counts of stats() add up.
+
+from collections import OrderedDict
+
+import myJsPurity
+from myJsClosure import Compiler
+
+
+_MISSING = object()
+
+
+def run(ast, env=None):
+    return Memo().compile(ast, env)()
+
+
+def _key(values):
+    # the cache key of the arguments, or None when one of them is not a
+    # number or a string
+    key = []
+    for value in values:
+        kind = type(value)
+        if kind is int or kind is str:
+            key.append(value)
+        elif kind is float:
+            key.append((float, value.hex()))
+        else:
+            return None
+    return tuple(key)
+
+
+class MemoStats(object):
+
+    def __init__(self, max_entries):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.skipped = 0        # calls with an argument that is not a number or a string
+        self.evictions = 0
+
+    @property
+    def hit_rate(self):
+        looked_up = self.hits + self.misses
+        return self.hits / looked_up if looked_up else 0.0
+
+    def __repr__(self):
+        return ('<MemoStats hits=%d misses=%d skipped=%d evictions=%d>'
+                % (self.hits, self.misses, self.skipped, self.evictions))
+
+
+class _Compiler(Compiler):
+
+    def __init__(self, globals, memo, pure, cached=None):
+        Compiler.__init__(self, globals, cached)
+        self.memo = memo
+        self.pure = pure
+        self.names = []                 # of the functions being compiled
+
+    def function_body(self, name, body, layout):
+        label = '.'.join(self.names + [name or '<lambda>'])
+        self.names.append(name or '<lambda>')
+        code = Compiler.function_body(self, name, body, layout)
+        self.names.pop()
+        if name is not None and label in self.pure:
+            return self.memo.memoized(label, layout.nparams, code)
+        return code
+
+
+class Memo(object):
+
+    def __init__(self, max_entries=1024, limits=None, builtins=()):
+        self.max_entries = max_entries
+        self.limits = limits or {}
+        self.builtins = builtins
+        self.functions = OrderedDict()  # name -> MemoStats
+        self._entries = {}              # name -> the results of its latest compilation, key -> value
+
+    def compile(self, ast, env=None, cached=None):
+        if env is None:
+            env = {}
+        elif not isinstance(env, dict):
+            env = env.names
+        pure = myJsPurity.pure_functions(ast, self.builtins)
+        return _Compiler(env, self, pure, cached).program(ast)
+
+    def memoized(self, name, nparams, code):
+        # code, a compiled function body, with a cache
+        max_entries = self.limits.get(name, self.max_entries)
+        stats = self.functions.get(name)
+        if stats is None:
+            stats = self.functions[name] = MemoStats(max_entries)
+        entries = self._entries[name] = OrderedDict()
+        end = nparams + 1
+
+        def memoized(frame):
+            if end == 2:
+                key = frame[1]
+                kind = type(key)
+                if kind is float:
+                    key = (float, key.hex())
+                elif kind is not int and kind is not str:
+                    key = None
+            else:
+                key = _key(frame[1:end])
+            if key is None:
+                stats.skipped += 1
+                return code(frame)
+            value = entries.get(key, _MISSING)
+            if value is not _MISSING:
+                entries.move_to_end(key)
+                stats.hits += 1
+                return value
+            stats.misses += 1
+            value = code(frame)
+            entries[key] = value
+            if len(entries) > max_entries:
+                entries.popitem(last=False)
+                stats.evictions += 1
+            return value
+        return memoized
+
+    def clear(self):
+        for entries in self._entries.values():
+            entries.clear()
+
+    def stats(self):
+        return OrderedDict((name, OrderedDict([('hits', s.hits), ('misses', s.misses), ('skipped', s.skipped),
+                                               ('evictions', s.evictions),
+                                               ('entries', len(self._entries[name])),
+                                               ('max_entries', s.max_entries), ('hit_rate', s.hit_rate)]))
+                           for name, s in self.functions.items())
@@ -0,0 +1,204 @@
+# Optimization passes over the parse trees built by myJsParser.
+#
+#       optimize(ast) -> (ast, stats)
+#
+# The passes run in order over the whole tree, each returning a new tree:
+#
+#       fold        binop, not and negative nodes on literals become a
+#                   literal, computed with the operators of myJsRuntime so
+#                   "+" on strings and "/" by zero behave as in JavaScript;
+#                   "&&" and "||" fold as soon as their left side is literal
+#       prune       if-then and if-then-else on a literal condition are
+#                   replaced by the statements of the branch that runs
+#       dead        statements after a return in the same statement list
+#                   are removed
+#
+# A statement that declares a var or function name is never removed: the
+# declaration is hoisted to the whole function, so dropping it would change
+# which variable the other statements see. An if whose discarded branch
+# declares a name is left alone for the same reason.
+#
+# stats counts what each pass did, and stats.eliminated is how many nodes
+# the tree has lost in total.
+
+from myJsResolver import declared_names
+from myJsRuntime import BINOPS, logical_not, negative, truthy
+
+
+class OptimizeStats(object):
+
+    def __init__(self):
+        self.folded = 0             # expressions replaced by a literal
+        self.pruned = 0             # if statements replaced by one branch
+        self.dead = 0               # statements removed after a return
+        self.nodes_before = 0
+        self.nodes_after = 0
+
+    @property
+    def eliminated(self):
+        return self.nodes_before - self.nodes_after
+
+    def __repr__(self):
+        return ('<OptimizeStats folded=%d pruned=%d dead=%d eliminated=%d>'
+                % (self.folded, self.pruned, self.dead, self.eliminated))
+
+
+def optimize(ast, passes=None):
+    stats = OptimizeStats()
+    stats.nodes_before = count_nodes(ast)
+    for optimization in passes or PASSES:
+        ast = optimization(ast, stats)
+    stats.nodes_after = count_nodes(ast)
+    return ast, stats
+
+
+def count_nodes(tree):
+    if isinstance(tree, list):
+        return sum(count_nodes(item) for item in tree)
+    if isinstance(tree, tuple):
+        return 1 + sum(count_nodes(item) for item in tree[1:] if isinstance(item, (tuple, list)))
+    return 0
+
+
+# Literals
+
+LITERALS = ('number', 'string', 'true', 'false')
+
+
+def is_literal(exp):
+    return exp[0] in LITERALS
+
+
+def literal_value(exp):
+    kind = exp[0]
+    if kind == 'true':
+        return True
+    if kind == 'false':
+        return False
+    return exp[1]
+
+
+def literal(value):
+    if value is True:
+        return ('true', 'true')
+    if value is False:
+        return ('false', 'false')
+    if isinstance(value, str):
+        return ('string', value)
+    return ('number', value)
+
+
+def declares(stmt):
+    return bool(declared_names([stmt]))
+
+
+def is_exp_stmt(stmt):
+    return stmt[0] == 'lambda' or stmt[0] == 'stmt' and stmt[1][0] == 'exp'
+
+
+# Walking statement lists. map_statements rebuilds every statement list of
+# the tree, including function bodies, with rewrite(stmts, top) applied to
+# each after its nested lists; rewrite returns the new list. top is true for
+# the program's own list, whose expression statements give the program its
+# value (see myJsInterpreter).
+
+def map_statements(stmts, rewrite, expression=None, top=True):
+    result = []
+    for stmt in stmts:
+        kind = stmt[0]
+        if kind == 'function':
+            stmt = ('function', stmt[1], stmt[2], map_statements(stmt[3], rewrite, expression, False))
+        elif kind == 'lambda':
+            stmt = ('lambda', stmt[1], map_statements(stmt[2], rewrite, expression, False))
+        else:
+            inner = stmt[1]
+            kind = inner[0]
+            if kind == 'if-then':
+                inner = ('if-then', _exp(inner[1], expression), map_statements(inner[2], rewrite, expression, False))
+            elif kind == 'if-then-else':
+                inner = ('if-then-else', _exp(inner[1], expression), map_statements(inner[2], rewrite, expression, False),
+                         map_statements(inner[3], rewrite, expression, False))
+            elif kind == 'assign' or kind == 'var':
+                inner = (kind, inner[1], _exp(inner[2], expression))
+            elif kind == 'return' or kind == 'exp':
+                inner = (kind, _exp(inner[1], expression))
+            stmt = ('stmt', inner)
+        result.append(stmt)
+    return rewrite(result, top)
+
+
+def _exp(exp, expression):
+    return exp if expression is None else expression(exp)
+
+
+def _unchanged(stmts, top):
+    return stmts
+
+
+# Passes
+
+def fold(ast, stats):
+    def expression(exp):
+        kind = exp[0]
+        if kind == 'binop':
+            left = expression(exp[1])
+            op = exp[2]
+            right = expression(exp[3])
+            if is_literal(left):
+                if op == '&&' or op == '||':
+                    stats.folded += 1
+                    if truthy(literal_value(left)) == (op == '&&'):
+                        return right
+                    return left
+                if is_literal(right):
+                    stats.folded += 1
+                    return literal(BINOPS[op](literal_value(left), literal_value(right)))
+            return ('binop', left, op, right)
+        if kind == 'not' or kind == 'negative':
+            operand = expression(exp[1])
+            if is_literal(operand):
+                stats.folded += 1
+                value = literal_value(operand)
+                return literal(logical_not(value) if kind == 'not' else negative(value))
+            return (kind, operand)
+        if kind == 'call':
+            return ('call', exp[1], [expression(arg) for arg in exp[2]])
+        return exp
+    return map_statements(ast, _unchanged, expression)
+
+
+def prune(ast, stats):
+    def rewrite(stmts, top):
+        result = []
+        for stmt in stmts:
+            inner = stmt[1] if stmt[0] == 'stmt' else None
+            if inner is not None and inner[0] in ('if-then', 'if-then-else') and is_literal(inner[1]):
+                then = inner[2]
+                otherwise = inner[3] if inner[0] == 'if-then-else' else []
+                if truthy(literal_value(inner[1])):
+                    taken, dropped = then, otherwise
+                else:
+                    taken, dropped = otherwise, then
+                # at the top, a branch's expression statements would become
+                # the program's value once moved out of the if
+                if not (any(declares(s) for s in dropped) or top and any(is_exp_stmt(s) for s in taken)):
+                    stats.pruned += 1
+                    result.extend(taken)
+                    continue
+            result.append(stmt)
+        return result
+    return map_statements(ast, rewrite)
+
+
+def dead(ast, stats):
+    def rewrite(stmts, top):
+        for i, stmt in enumerate(stmts):
+            if stmt[0] == 'stmt' and stmt[1][0] == 'return':
+                kept = [s for s in stmts[i + 1:] if declares(s)]
+                stats.dead += len(stmts) - i - 1 - len(kept)
+                return stmts[:i + 1] + kept
+        return stmts
+    return map_statements(ast, rewrite)
+
+
+PASSES = [fold, prune, dead]
@@ -22,7 +22,7 @@
 #
 #       optparams ->
 #       optparams -> params
-#       params -> IDENTIFIER , params
+#       params -> params , IDENTIFIER
 #       params -> IDENTIFIER
 #
 # optparams is a comma-separated list of zero or more identifiers. The
@@ -61,7 +61,14 @@
 #       ("assign", identifier, new_value) 
 #       ("return", expression)
 #       ("var", identifier, initial_value) 
-#       ("exp", expression) 
+#       ("exp", expression)
+#
+# After a syntax error the parser skips ahead to the next ; or to the } of
+# the block it is in, and the statement, or the whole block, becomes
+#       ("error",)
+#
+#       stmt -> error ;
+#       compoundstmt -> { error }
 #
 # To simplify things, for now we will assume that there is only one type of
 # expression: identifiers that reference variables. In the next assignment,
@@ -85,9 +92,12 @@
 # 'LE',           # <=          | 'VAR',          # var 
 # 'LPAREN',       # (           |
 
+import sys
+
 import ply.yacc as yacc
 import ply.lex as lex
 import myJsLexer                 # use my JavaScript lexer
+import myJsTables
 from myJsLexer import tokens     # use my JavaScript tokens
 
 
@@ -126,7 +136,8 @@ def p_topStmtsPrefix_one(p):
 
 def p_topStmtsPrefix_more(p):
     'topStmtsPrefix : topStmtsPrefix topStmt'
-    p[0] = p[1] + [p[2]]
+    p[1].append(p[2])   # the list is owned by this rule, so grow it in place
+    p[0] = p[1]
 
 
 def p_topStmt(p):
@@ -160,8 +171,9 @@ def p_params_one(p):
 
 
 def p_params_multi(p):
-    'params : IDENTIFIER COMMA params'
-    p[0] = [p[1]] + p[3]
+    'params : params COMMA IDENTIFIER'
+    p[1].append(p[3])
+    p[0] = p[1]
 
 
 def p_compoundstmt(p):
@@ -169,6 +181,11 @@ def p_compoundstmt(p):
     p[0] = p[2]
 
 
+def p_compoundstmt_error(p):
+    'compoundstmt : LBRACE error RBRACE'
+    p[0] = [('stmt', ('error',))]
+
+
 def p_stmt_if(p):
     'stmt : IF LPAREN exp RPAREN compoundstmt'
     p[0] = ('if-then', p[3], p[5])
@@ -198,6 +215,11 @@ def p_stmt_exp(p):
     'stmt : exp SEMICOLON'
     p[0] = ('exp', p[1])
 
+
+def p_stmt_error(p):
+    'stmt : error SEMICOLON'
+    p[0] = ('error',)
+
 # Here's the rules for simple expressions.
 
 
@@ -274,8 +296,9 @@ def p_optargs(p):
 
 
 def p_args_multi(p):
-    'args : exp COMMA args'
-    p[0] = [p[1]] + p[3]
+    'args : args COMMA exp'
+    p[1].append(p[3])
+    p[0] = p[1]
 
 
 def p_args_one(p):
@@ -284,7 +307,42 @@ def p_args_one(p):
 
 
 def p_error(p):
-    print("Syntax error at token", p.type)
-    # Just discard the token and tell the parser it's okay.
-    yacc.errok()
-
+    # The parser recovers by itself through the error rules above: it skips
+    # to the end of the statement or the block and puts an ('error',)
+    # statement in its place. myJsErrors collects these instead of printing.
+    if p is None:
+        print("Syntax error at end of input")
+    else:
+        print("Syntax error at token", p.type)
+
+
+def signature():
+    # hash of everything that shapes the LALR tables
+    return myJsTables.signature([start, precedence, tokens, myJsTables.rule_functions(globals(), 'p_')])
+
+
+def build(outputdir=None, cache=True, typed=False, positions=True):
+    # Return a new parser. With cache the LALR tables are read from a
+    # generated table module instead of being constructed from the grammar.
+    # With typed the parser builds the node classes of myJsAst instead of
+    # tuples, with source positions unless positions is false.
+    if typed:
+        import myJsAst
+        return myJsAst.typed(build(outputdir, cache), positions)
+    module = sys.modules[__name__]
+    if not cache:
+        return yacc.yacc(debug=0, write_tables=0, module=module)
+    if outputdir is None:
+        outputdir = myJsTables.TABLE_DIR
+    name = myJsTables.table_name('myJsParsetab', signature())
+    table = myJsTables.load_table(name, outputdir)
+    if table is not None:
+        return yacc.yacc(debug=0, write_tables=0, optimize=1, module=module, tabmodule=table,
+                         outputdir=outputdir)
+
+    def write(directory, tabmodule):
+        return yacc.yacc(debug=0, write_tables=directory is not None, module=module, tabmodule=tabmodule,
+                         outputdir=directory)
+    parser = myJsTables.write_table(name, outputdir, write)
+    myJsTables.remove_stale('myJsParsetab', name, outputdir)
+    return parser
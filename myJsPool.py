@@ -0,0 +1,74 @@
+# A pool of lexer and parser pairs for parsing from several threads.
+#
+#       pool = ParserPool(size=None, typed=False)
+#       pool.parse(input_string) -> ast
+#       with pool.pair() as (lexer, parser): ...
+#
+# A PLY lexer keeps its position, lineno and state (inside a /* */ comment
+# or not) between calls, and a PLY parser keeps its stacks, so one pair can
+# only be used by one thread at a time. The pool hands every thread a pair
+# of its own: the lexers are clones of one built lexer, sharing its
+# compiled regular expressions, and the parsers are copies of one built
+# parser, sharing its LALR tables. Before a pair is handed out its lexer is
+# reset to line 1 in the INITIAL state, so nothing carries over from the
+# last parse, however it ended.
+#
+# Pairs are made when no free one is left. With a size, no more than size
+# pairs are made and pair() waits for one to be given back.
+
+import copy
+import queue
+import threading
+from contextlib import contextmanager
+
+import myJsLexer
+import myJsParser
+
+
+class ParserPool(object):
+
+    def __init__(self, size=None, typed=False, lexer=None, parser=None):
+        self.size = size
+        self.lexer = lexer or myJsLexer.build()
+        self.parser = parser or myJsParser.build(typed=typed)
+        self.made = 0
+        self._free = queue.LifoQueue()
+        self._lock = threading.Lock()
+
+    def parse(self, source):
+        with self.pair() as (lexer, parser):
+            return parser.parse(source, lexer=lexer)
+
+    @contextmanager
+    def pair(self):
+        pair = self.acquire()
+        try:
+            yield pair
+        finally:
+            self.release(pair)
+
+    def acquire(self):
+        try:
+            pair = self._free.get_nowait()
+        except queue.Empty:
+            pair = self._make()
+            if pair is None:
+                pair = self._free.get()
+        reset(pair[0])
+        return pair
+
+    def release(self, pair):
+        self._free.put(pair)
+
+    def _make(self):
+        with self._lock:
+            if self.size is not None and self.made >= self.size:
+                return None
+            self.made += 1
+        return self.lexer.clone(), copy.copy(self.parser)
+
+
+def reset(lexer):
+    lexer.lineno = 1
+    lexer.begin('INITIAL')
+    lexer.input('')
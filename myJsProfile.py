@@ -0,0 +1,216 @@
+# Counting and timing what the lexer and parser do.
+#
+#       profiler = Profiler(lexer=None, parser=None)
+#       profiler.parse(input_string) -> ast     parsed and measured
+#       profiler.stats() -> dict                everything measured, for json
+#       profiler.folded() -> str                the times as folded stacks
+#
+#       python myJsProfile.py [--json | --folded] file.js...
+#
+# A Profiler parses with a clone of the lexer and a copy of the parser whose
+# token rule functions, token() method and production functions are wrapped
+# to count and time every call; the lexer and parser it was given are left
+# as they are, so nothing is measured, or slowed down, unless a Profiler is
+# used. What is added up over every parse:
+#
+#       lexer rules         calls and seconds of each rule function of
+#                           myJsLexer (t_IDENTIFIER, t_newline, t_error...)
+#       lexer tokens        how many tokens of each type were returned
+#       productions         reductions and seconds of each production, like
+#                           "exp -> exp PLUS exp", with its p_ function
+#       tokens, reductions  the tokens the parser read, shifted or, at a
+#                           syntax error, dropped, and the reductions of the
+#                           LALR parser
+#       peak depth          the most symbols the parser stack held, not
+#                           counting the $end at its bottom
+#
+# Each timer includes the time of the timer itself, so small callbacks look
+# slower than they are; compare counts and the relative times.
+#
+# folded() has one line per stack, "parse;lexer;t_NUMBER 1520", with the
+# time in microseconds spent in that frame and not in the frames below it:
+# the input of flamegraph.pl, speedscope and other flame graph viewers.
+
+import argparse
+import copy
+import json
+import sys
+import time
+from collections import OrderedDict
+
+import myJsLexer
+import myJsParser
+from myJsPool import reset
+
+
+class Counter(object):
+    __slots__ = ('calls', 'seconds')
+
+    def __init__(self):
+        self.calls = 0
+        self.seconds = 0.0
+
+    def __repr__(self):
+        return '<Counter calls=%d seconds=%.6f>' % (self.calls, self.seconds)
+
+
+def timed(func, counter):
+    # func counted and timed in counter
+    clock = time.perf_counter
+
+    def call(*args):
+        start = clock()
+        try:
+            return func(*args)
+        finally:
+            counter.calls += 1
+            counter.seconds += clock() - start
+    call.__name__ = func.__name__
+    return call
+
+
+class Profiler(object):
+
+    def __init__(self, lexer=None, parser=None):
+        self.rules = OrderedDict()          # lexer rule function name -> Counter
+        self.tokens = {}                    # token type -> count
+        self.productions = OrderedDict()    # str(production) -> (function name, Counter)
+        self.lexing = Counter()             # calls of token()
+        self.parsing = Counter()            # calls of parse()
+        self.peak_depth = 0
+        self.lexer = self._lexer((lexer or myJsLexer.build()).clone())
+        self.parser = self._parser(copy.copy(parser or myJsParser.build()))
+
+    def _lexer(self, lexer):
+        def rule(func):
+            return timed(func, self.rules.setdefault(func.__name__, Counter()))
+
+        def entry(item):
+            # (function, token type) for a group of the master regular
+            # expression; no function for string rules
+            if item is None or item[0] is None:
+                return item
+            return rule(item[0]), item[1]
+        lexstatere = {}
+        for state, matchers in lexer.lexstatere.items():
+            lexstatere[state] = [(regex, [entry(item) for item in items]) for regex, items in matchers]
+        lexer.lexstatere = lexstatere
+        lexer.lexre = lexstatere[lexer.lexstate]
+        lexer.lexstateerrorf = dict((state, rule(func)) for state, func in lexer.lexstateerrorf.items())
+        lexer.lexerrorf = lexer.lexstateerrorf.get(lexer.lexstate)
+
+        # the tokens returned, counted by type, and the time spent getting them
+        tokens = self.tokens
+        next_token = timed(lexer.token, self.lexing)
+
+        def token():
+            tok = next_token()
+            if tok is not None:
+                tokens[tok.type] = tokens.get(tok.type, 0) + 1
+            return tok
+        lexer.token = token
+        return lexer
+
+    def _parser(self, parser):
+        profiler = self
+        productions = []
+        for production in parser.productions:
+            if production.callable is not None:
+                counter = Counter()
+                self.productions[str(production)] = (production.func, counter)
+                action = timed(production.callable, counter)
+
+                def reduce(p, action=action):
+                    # PLY has already taken the right-hand side off the
+                    # stack, which starts with $end
+                    depth = len(p.stack) - 1 + len(p.slice) - 1
+                    if depth > profiler.peak_depth:
+                        profiler.peak_depth = depth
+                    action(p)
+                production = copy.copy(production)
+                production.callable = reduce
+            productions.append(production)
+        parser.productions = productions
+        return parser
+
+    def parse(self, source):
+        reset(self.lexer)
+        start = time.perf_counter()
+        try:
+            return self.parser.parse(source, lexer=self.lexer)
+        finally:
+            self.parsing.calls += 1
+            self.parsing.seconds += time.perf_counter() - start
+
+    def stats(self):
+        reductions = sum(counter.calls for _, counter in self.productions.values())
+        return OrderedDict([
+            ('parses', self.parsing.calls),
+            ('seconds', self.parsing.seconds),
+            ('lexer', OrderedDict([
+                ('seconds', self.lexing.seconds),
+                ('tokens', OrderedDict(sorted(self.tokens.items()))),
+                ('rules', OrderedDict((name, OrderedDict([('calls', c.calls), ('seconds', c.seconds)]))
+                                      for name, c in self.rules.items() if c.calls)),
+            ])),
+            ('parser', OrderedDict([
+                ('tokens', sum(self.tokens.values())),
+                ('reductions', reductions),
+                ('peak_depth', self.peak_depth),
+                ('productions', OrderedDict((name, OrderedDict([('function', func), ('calls', c.calls),
+                                                                ('seconds', c.seconds)]))
+                                            for name, (func, c) in self.productions.items() if c.calls)),
+            ])),
+        ])
+
+    def folded(self):
+        lines = []
+
+        def line(stack, seconds):
+            microseconds = int(round(seconds * 1e6))
+            if microseconds > 0:
+                lines.append('%s %d' % (';'.join(stack), microseconds))
+        rules = sum(c.seconds for c in self.rules.values())
+        reductions = sum(c.seconds for _, c in self.productions.values())
+        line(['parse'], self.parsing.seconds - self.lexing.seconds - reductions)
+        line(['parse', 'lexer'], self.lexing.seconds - rules)
+        for name, counter in self.rules.items():
+            line(['parse', 'lexer', name], counter.seconds)
+        for name, (func, counter) in self.productions.items():
+            line(['parse', 'reduce', '%s (%s)' % (name, func)], counter.seconds)
+        return '\n'.join(lines) + '\n'
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='myJsProfile.py', description='Profile the JavaScript lexer and parser.')
+    parser.add_argument('files', nargs='+', help='.js files to parse')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--json', action='store_true', help='print the counts and times as JSON')
+    output.add_argument('--folded', action='store_true', help='print the times as folded stacks')
+    args = parser.parse_args(argv)
+
+    profiler = Profiler()
+    for path in args.files:
+        with open(path, encoding='utf-8') as f:
+            profiler.parse(f.read())
+    if args.json:
+        print(json.dumps(profiler.stats(), indent=2))
+    elif args.folded:
+        sys.stdout.write(profiler.folded())
+    else:
+        stats = profiler.stats()
+        lexer, parser = stats['lexer'], stats['parser']
+        print('%d files in %.3f s, %.3f s lexing' % (stats['parses'], stats['seconds'], lexer['seconds']))
+        print('%d tokens, %d reductions, peak stack depth %d'
+              % (parser['tokens'], parser['reductions'], parser['peak_depth']))
+        print('\n%8s %10s  %s' % ('calls', 'seconds', 'lexer rule'))
+        for name, rule in sorted(lexer['rules'].items(), key=lambda item: -item[1]['seconds']):
+            print('%8d %10.4f  %s' % (rule['calls'], rule['seconds'], name))
+        print('\n%8s %10s  %s' % ('calls', 'seconds', 'production'))
+        for name, production in sorted(parser['productions'].items(), key=lambda item: -item[1]['seconds']):
+            print('%8d %10.4f  %s' % (production['calls'], production['seconds'], name))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,128 @@
+# Which functions of a program are pure: their result depends on their
+# arguments only, and calling them changes nothing.
+#
+#       analyze(ast, builtins=()) -> OrderedDict     name -> None, or why it is not pure
+#       pure_functions(ast, builtins=()) -> set      the names of the pure ones
+#
+# ast is a tree of myJsParser. Functions are named as in myJsRunProfile,
+# "outer.inner" for a function in another; lambdas have no name and are
+# left out, and a function in one is "<lambda>.name". builtins are the
+# names of the builtins of the env that are pure themselves, like a max()
+# or an abs(); any other builtin may do anything.
+#
+# The analysis runs on the tree of myJsResolver, where every name is bound
+# to a local or a global, and is conservative. A function is pure when its
+# body, not counting nested functions, only
+#
+#       assigns to its own parameters and locals
+#       reads its own parameters and locals, and global functions
+#       calls global functions that are pure, and the builtins given
+#       defines no function, which could read and assign its locals later
+#
+# where a global function is one declared once by a function statement
+# and never assigned, so that its name always holds it; a name declared
+# twice is not pure either. Reading any other global, which may change, or
+# a local of an enclosing function makes a function impure, and so does
+# calling a parameter, or an enclosing function's local, which could be
+# anything. Whether a function that calls others is pure depends on them:
+# every function that passes the checks of its own body is taken to be
+# pure, then the ones calling a function that is not are taken out until
+# none is left to take out, so recursive and mutually recursive functions
+# are pure when together they are.
+
+from collections import OrderedDict
+
+from myJsResolver import resolve
+
+
+def analyze(ast, builtins=()):
+    resolution = resolve(ast, builtins)
+    functions = OrderedDict()       # name -> [why not, global functions called, body]
+    declared = {}                   # global name -> times declared by a function statement
+    assigned = set()                # global names assigned, or declared by var
+    _collect(resolution.ast, [], functions, declared, assigned)
+    stable = set(name for name, count in declared.items() if count == 1 and name not in assigned)
+    pure_builtins = set(builtins) - assigned - set(declared)
+
+    for name, (why, calls, body) in list(functions.items()):
+        if why is None:
+            why = _check(body, stable, pure_builtins, calls)
+        functions[name] = [why, calls]
+
+    changed = True
+    while changed:
+        changed = False
+        for name, info in functions.items():
+            if info[0] is None:
+                for callee in info[1]:
+                    if functions[callee][0] is not None:
+                        info[0] = 'calls %s, which is not pure' % callee
+                        changed = True
+                        break
+    return OrderedDict((name, why) for name, (why, _) in functions.items())
+
+
+def pure_functions(ast, builtins=()):
+    return set(name for name, why in analyze(ast, builtins).items() if why is None)
+
+
+def _collect(stmts, names, functions, declared, assigned):
+    # every function in stmts, with its name and body, and the global names
+    # declared and assigned
+    for stmt in stmts:
+        if stmt[0] == 'stmt':
+            stmt = stmt[1]
+        kind = stmt[0]
+        if kind == 'function':
+            name = '.'.join(names + [stmt[1]])
+            if stmt[4].depth is None:
+                declared[stmt[1]] = declared.get(stmt[1], 0) + 1
+            if name in functions:
+                functions[name][0] = 'declared more than once'
+            else:
+                functions[name] = [None, [], stmt[3]]
+            _collect(stmt[3], names + [stmt[1]], functions, declared, assigned)
+        elif kind == 'lambda':
+            _collect(stmt[2], names + ['<lambda>'], functions, declared, assigned)
+        elif kind == 'if-then' or kind == 'if-then-else':
+            for branch in stmt[2:]:
+                _collect(branch, names, functions, declared, assigned)
+        elif (kind == 'assign' or kind == 'var') and stmt[3].depth is None:
+            assigned.add(stmt[1])
+
+
+def _check(body, stable, builtins, calls):
+    # why the statements of a function body are not pure, or None; the
+    # global functions they call are added to calls
+    work = list(body)
+    while work:
+        node = work.pop()
+        kind = node[0]
+        if kind == 'stmt' or kind == 'return' or kind == 'exp' or kind == 'not' or kind == 'negative':
+            work.append(node[1])
+        elif kind == 'function' or kind == 'lambda':
+            return 'defines a function'
+        elif kind == 'if-then' or kind == 'if-then-else':
+            work.append(node[1])
+            for branch in node[2:]:
+                work.extend(branch)
+        elif kind == 'assign' or kind == 'var':
+            if node[3].depth != 0:
+                return 'assigns %s' % node[1]
+            work.append(node[2])
+        elif kind == 'identifier':
+            binding = node[2]
+            if binding.depth != 0 and not (binding.depth is None and node[1] in stable):
+                return 'reads %s' % node[1]
+        elif kind == 'call':
+            binding = node[3]
+            if binding.depth is None and node[1] in stable:
+                if node[1] not in calls:
+                    calls.append(node[1])
+            elif not (binding.depth is None and node[1] in builtins):
+                return 'calls %s' % node[1]
+            work.extend(node[2])
+        elif kind == 'binop':
+            work.append(node[1])
+            work.append(node[3])
+    return None
@@ -0,0 +1,160 @@
+# Lexical scope resolution for the parse trees built by myJsParser.
+#
+#       resolve(ast, builtins=()) -> Resolution
+#
+# Every name in the program is bound to the place it lives, so the engines
+# can use array-indexed frames instead of looking names up at run time.
+# Parameters and the var and function names of a function body are locals of
+# that function and get a slot in its frame; everything else is a global. A
+# frame is a list whose item 0 is the frame of the enclosing function, so the
+# slots of a function are numbered from 1: parameters first, then the body's
+# declarations in source order.
+#
+# The resolved tree has the same shape as the parser's, with one more item
+# on the nodes that use a name and on function nodes:
+#
+#       ("identifier", name, binding)
+#       ("call", name, args, binding)
+#       ("assign", name, exp, binding)
+#       ("var", name, exp, binding)
+#       ("function", name, params, body, binding, layout)
+#       ("lambda", params, body, layout)
+#
+# binding is a Binding(kind, depth, slot): kind is "param", "var" or
+# "function" for locals, with depth the number of enclosing functions to
+# walk out through, or "global" with depth and slot None. layout is a
+# Layout(names, nparams) giving the local name in every slot of the
+# function's frame.
+#
+# Names that are used but never declared by a var or function statement,
+# a parameter or builtins are listed in Resolution.undeclared.
+
+from collections import namedtuple
+
+
+Binding = namedtuple('Binding', 'kind depth slot')
+Layout = namedtuple('Layout', 'names nparams')
+Undeclared = namedtuple('Undeclared', 'name use')       # use is "read", "call" or "assign"
+
+GLOBAL = Binding('global', None, None)
+
+
+class Resolution(object):
+
+    def __init__(self, ast, globals, undeclared):
+        self.ast = ast                  # the resolved tree
+        self.globals = globals          # names declared at the top level, in order
+        self.undeclared = undeclared    # Undeclared uses, in source order
+
+
+def resolve(ast, builtins=()):
+    declared = declared_names(ast)
+    resolver = Resolver(set(declared) | set(builtins))
+    return Resolution(resolver.block(ast, None), list(declared), resolver.undeclared)
+
+
+def declared_names(stmts):
+    # {name: "var" or "function"} for the var and function statements of a
+    # function body, including inside if branches but not inside nested
+    # functions, in source order. A name declared both ways is a function.
+    names = {}
+    for stmt in stmts:
+        kind = stmt[0]
+        if kind == 'function':
+            names[stmt[1]] = 'function'
+            continue
+        if kind != 'stmt':
+            continue
+        stmt = stmt[1]
+        kind = stmt[0]
+        if kind == 'var':
+            names.setdefault(stmt[1], 'var')
+        elif kind == 'if-then' or kind == 'if-then-else':
+            for branch in stmt[2:]:
+                for name, how in declared_names(branch).items():
+                    if how == 'function' or name not in names:
+                        names[name] = how
+    return names
+
+
+class Scope(object):
+    # The locals of one function: name -> (kind, slot). A repeated parameter
+    # name still takes a slot, but only the last one can be referred to.
+    __slots__ = ('locals', 'names', 'parent')
+
+    def __init__(self, params, body, parent):
+        self.locals = {}
+        self.names = list(params)
+        for i, name in enumerate(params):
+            self.locals[name] = ('param', i + 1)
+        for name, kind in declared_names(body).items():
+            if name not in self.locals:
+                self.names.append(name)
+                self.locals[name] = (kind, len(self.names))
+        self.parent = parent
+
+    def layout(self, nparams):
+        return Layout(tuple(self.names), nparams)
+
+
+class Resolver(object):
+
+    def __init__(self, known_globals):
+        self.known_globals = known_globals
+        self.undeclared = []
+
+    def binding(self, name, scope, use):
+        depth = 0
+        while scope is not None:
+            local = scope.locals.get(name)
+            if local is not None:
+                return Binding(local[0], depth, local[1])
+            depth += 1
+            scope = scope.parent
+        if name not in self.known_globals:
+            self.undeclared.append(Undeclared(name, use))
+        return GLOBAL
+
+    def block(self, stmts, scope):
+        return [self.statement(stmt, scope) for stmt in stmts]
+
+    def statement(self, stmt, scope):
+        kind = stmt[0]
+        if kind == 'stmt':
+            return ('stmt', self.statement(stmt[1], scope))
+        if kind == 'function':
+            name, params, body = stmt[1:4]
+            binding = self.binding(name, scope, 'assign')
+            body, layout = self.function(params, body, scope)
+            return ('function', name, params, body, binding, layout)
+        if kind == 'lambda':
+            body, layout = self.function(stmt[1], stmt[2], scope)
+            return ('lambda', stmt[1], body, layout)
+        if kind == 'if-then':
+            return ('if-then', self.expression(stmt[1], scope), self.block(stmt[2], scope))
+        if kind == 'if-then-else':
+            return ('if-then-else', self.expression(stmt[1], scope), self.block(stmt[2], scope),
+                    self.block(stmt[3], scope))
+        if kind == 'assign' or kind == 'var':
+            value = self.expression(stmt[2], scope)
+            return (kind, stmt[1], value, self.binding(stmt[1], scope, 'assign'))
+        if kind == 'return' or kind == 'exp':
+            return (kind, self.expression(stmt[1], scope))
+        raise ValueError('unknown statement %r' % (kind,))
+
+    def function(self, params, body, parent):
+        scope = Scope(params, body, parent)
+        return self.block(body, scope), scope.layout(len(params))
+
+    def expression(self, exp, scope):
+        kind = exp[0]
+        if kind == 'identifier':
+            return ('identifier', exp[1], self.binding(exp[1], scope, 'read'))
+        if kind == 'call':
+            binding = self.binding(exp[1], scope, 'call')
+            return ('call', exp[1], [self.expression(arg, scope) for arg in exp[2]], binding)
+        if kind == 'binop':
+            return ('binop', self.expression(exp[1], scope), exp[2], self.expression(exp[3], scope))
+        if kind == 'not' or kind == 'negative':
+            return (kind, self.expression(exp[1], scope))
+        return exp
@@ -0,0 +1,291 @@
+# Counting and timing the JavaScript functions a program runs.
+#
+#       profiler = RunProfiler(ast, env=None, source=None)
+#       profiler.run() -> value             the program run once more, measured
+#       profiler.stats() -> dict            everything measured, for json
+#       profiler.folded() -> str            the times as folded stacks
+#       profiler.monomorphic() -> dict      the call sites to cache
+#
+#       python myJsRunProfile.py [--json | --folded] file.js...
+#
+# A RunProfiler compiles the program with myJsClosure, with every function
+# body wrapped to count and time its calls and every call site to record
+# the functions it calls; programs compiled by myJsClosure itself are not
+# slowed down. The program is compiled once, and run() runs it as often as
+# wanted, adding up:
+#
+#       functions       for each function: calls, seconds, the time from its
+#                       calls to their returns, not counted twice for
+#                       recursive calls, and self seconds, without the time
+#                       of the functions it called
+#       call sites      for each call: the function it is in, the name it
+#                       calls, how many calls and the targets called, by
+#                       function; a site with a single target is
+#                       monomorphic
+#
+# A function is named by its name, after the names of the functions it is
+# in: "outer.inner". A lambda has no name and is "<lambda N>", the Nth of
+# the program, or "<lambda lines A-B>" when the source is given to find it
+# in, as the tuple trees of myJsParser have no positions. Lambdas are
+# counted as they start in the source, nested ones included. A builtin
+# target is named by its Python name.
+#
+# folded() has one line per stack of JavaScript calls, "program;main;fib;fib
+# 1520", with the self time in microseconds of the last of them on that
+# stack, for flamegraph.pl, speedscope and other flame graph viewers.
+#
+# monomorphic() maps the number of every call site that called a global
+# name and found the same function every time to that name, the cached
+# argument of myJsClosure.compile_program:
+#
+#       myJsClosure.compile_program(ast, env, cached=profiler.monomorphic())
+#
+# As with myJsProfile, each timer includes the time of the timer itself, so
+# small functions look slower than they are.
+
+import argparse
+import json
+import sys
+import time
+from collections import OrderedDict
+
+import myJsLexer
+import myJsParser
+from myJsClosure import CompiledFunction, Compiler
+from myJsProfile import Counter
+
+
+class FunctionStats(Counter):
+    __slots__ = ('self_seconds', 'active')
+
+    def __init__(self):
+        Counter.__init__(self)
+        self.self_seconds = 0.0
+        self.active = 0                 # calls under way, for recursion
+
+    def __repr__(self):
+        return '<FunctionStats calls=%d seconds=%.6f self=%.6f>' % (self.calls, self.seconds, self.self_seconds)
+
+
+class Site(object):
+    __slots__ = ('function', 'callee', 'is_global', 'calls', 'targets')
+
+    def __init__(self, function, callee, is_global):
+        self.function = function        # the name of the function the call is in
+        self.callee = callee            # the name called
+        self.is_global = is_global
+        self.calls = 0
+        self.targets = OrderedDict()    # function body or builtin -> calls
+
+    def __repr__(self):
+        return '<Site %s in %s, %d calls, %d targets>' % (self.callee, self.function, self.calls,
+                                                           len(self.targets))
+
+
+class _Frame(object):
+    # a node of the tree of calls, for folded()
+    __slots__ = ('children', 'seconds')
+
+    def __init__(self):
+        self.children = {}
+        self.seconds = 0.0
+
+
+class _Compiler(Compiler):
+
+    def __init__(self, globals, profiler):
+        Compiler.__init__(self, globals)
+        self.profiler = profiler
+        self.names = []                 # of the functions being compiled
+        self.lambdas = 0
+
+    def function_body(self, name, body, layout):
+        if name is None:
+            label = self.profiler.lambda_label(self.lambdas)
+            self.lambdas += 1
+        else:
+            label = '.'.join(self.names + [name])
+        self.names.append(label)
+        code = Compiler.function_body(self, name, body, layout)
+        self.names.pop()
+        return self.profiler.timed(label, code)
+
+    def callee(self, site, exp):
+        load = Compiler.callee(self, site, exp)
+        record = self.profiler.sites[site] = Site(
+            self.names[-1] if self.names else 'program', exp[1], exp[3].depth is None)
+        targets = record.targets
+
+        def recorded(frame):
+            function = load(frame)
+            key = function.body if type(function) is CompiledFunction else function
+            record.calls += 1
+            targets[key] = targets.get(key, 0) + 1
+            return function
+        return recorded
+
+
+class RunProfiler(object):
+
+    def __init__(self, ast, env=None, source=None):
+        if env is None:
+            env = {}
+        elif not isinstance(env, dict):
+            env = env.names
+        self.functions = OrderedDict()  # name -> FunctionStats
+        self.sites = {}                 # call site number -> Site
+        self.labels = {}                # timed function body -> name
+        self.root = _Frame()
+        self.program = Counter()
+        self.spans = _lambda_spans(source) if source is not None else None
+        self.stack = [[self.root, 0.0]]     # the frame of every call under way and the time of its calls
+        self.compiled = _Compiler(env, self).program(ast)
+
+    def lambda_label(self, index):
+        if self.spans is not None and index < len(self.spans):
+            first, last = self.spans[index]
+            return '<lambda line %d>' % first if first == last else '<lambda lines %d-%d>' % (first, last)
+        return '<lambda %d>' % (index + 1)
+
+    def timed(self, label, code):
+        stats = self.functions.setdefault(label, FunctionStats())
+        stack = self.stack
+        clock = time.perf_counter
+
+        def body(frame):
+            caller = stack[-1]
+            node = caller[0].children.get(label)
+            if node is None:
+                node = caller[0].children[label] = _Frame()
+            entry = [node, 0.0]
+            stack.append(entry)
+            stats.active += 1
+            start = clock()
+            try:
+                return code(frame)
+            finally:
+                seconds = clock() - start
+                stack.pop()
+                caller[1] += seconds
+                stats.calls += 1
+                stats.active -= 1
+                if not stats.active:
+                    stats.seconds += seconds
+                node.seconds += seconds - entry[1]
+                stats.self_seconds += seconds - entry[1]
+        self.labels[body] = label
+        return body
+
+    def run(self):
+        start = time.perf_counter()
+        try:
+            return self.compiled()
+        finally:
+            seconds = time.perf_counter() - start
+            self.program.calls += 1
+            self.program.seconds += seconds
+            self.root.seconds += seconds - self.stack[0][1]
+            self.stack[0][1] = 0.0
+
+    def target_name(self, target):
+        label = self.labels.get(target)
+        if label is not None:
+            return label
+        return getattr(target, '__name__', None) or repr(target)
+
+    def monomorphic(self):
+        return dict((number, site.callee) for number, site in self.sites.items()
+                    if site.is_global and len(site.targets) == 1)
+
+    def stats(self):
+        return OrderedDict([
+            ('runs', self.program.calls),
+            ('seconds', self.program.seconds),
+            ('functions', OrderedDict((name, OrderedDict([('calls', f.calls), ('seconds', f.seconds),
+                                                          ('self_seconds', f.self_seconds)]))
+                                      for name, f in self.functions.items() if f.calls)),
+            ('sites', [OrderedDict([('site', number), ('function', site.function), ('callee', site.callee),
+                                    ('calls', site.calls),
+                                    ('targets', OrderedDict((self.target_name(target), calls)
+                                                            for target, calls in site.targets.items())),
+                                    ('monomorphic', len(site.targets) == 1)])
+                       for number, site in sorted(self.sites.items()) if site.calls]),
+        ])
+
+    def folded(self):
+        lines = []
+        work = [(['program'], self.root)]
+        while work:
+            stack, frame = work.pop()
+            microseconds = int(round(frame.seconds * 1e6))
+            if microseconds > 0:
+                lines.append('%s %d' % (';'.join(stack), microseconds))
+            for label in sorted(frame.children, reverse=True):
+                work.append((stack + [label], frame.children[label]))
+        return '\n'.join(lines) + '\n'
+
+
+def _lambda_spans(source):
+    # the first and last lines of every lambda of source, nested ones
+    # included, in the order they start, which is the order they compile in
+    lexer = myJsLexer.build()
+    lexer.input(source)
+    spans = []
+    open_ = []          # [index in spans, depth of its body or None before its {]
+    depth = 0
+    previous = None
+    for tok in iter(lexer.token, None):
+        if tok.type == 'LPAREN' and previous is not None and previous.type == 'FUNCTION':
+            open_.append([len(spans), None])
+            spans.append((previous.lineno, previous.lineno))
+        elif tok.type == 'LBRACE':
+            depth += 1
+            if open_ and open_[-1][1] is None:
+                open_[-1][1] = depth
+        elif tok.type == 'RBRACE':
+            if open_ and open_[-1][1] == depth:
+                index = open_.pop()[0]
+                spans[index] = (spans[index][0], tok.lineno)
+            depth -= 1
+        previous = tok
+    return spans
+
+
+def main(argv):
+    parser = argparse.ArgumentParser(prog='myJsRunProfile.py', description='Profile the JavaScript functions a program runs.')
+    parser.add_argument('files', nargs='+', help='.js files to run, one after the other')
+    output = parser.add_mutually_exclusive_group()
+    output.add_argument('--json', action='store_true', help='print the counts and times as JSON')
+    output.add_argument('--folded', action='store_true', help='print the times as folded stacks')
+    args = parser.parse_args(argv)
+
+    jslexer = myJsLexer.build()
+    jsparser = myJsParser.build()
+    profilers = []
+    for path in args.files:
+        with open(path, encoding='utf-8') as f:
+            source = f.read()
+        profiler = RunProfiler(jsparser.parse(source, lexer=jslexer), source=source)
+        profiler.run()
+        profilers.append((path, profiler))
+    if args.json:
+        print(json.dumps(OrderedDict((path, profiler.stats()) for path, profiler in profilers), indent=2))
+        return 0
+    for path, profiler in profilers:
+        if args.folded:
+            sys.stdout.write(''.join('%s;%s' % (path, line) for line in profiler.folded().splitlines(True)))
+            continue
+        stats = profiler.stats()
+        print('%s: %.3f s' % (path, stats['seconds']))
+        print('\n%8s %10s %10s  %s' % ('calls', 'seconds', 'self', 'function'))
+        for name, function in sorted(stats['functions'].items(), key=lambda item: -item[1]['self_seconds']):
+            print('%8d %10.4f %10.4f  %s' % (function['calls'], function['seconds'], function['self_seconds'], name))
+        print('\n%8s %8s  %s' % ('calls', 'targets', 'call site'))
+        for site in sorted(stats['sites'], key=lambda site: -site['calls']):
+            print('%8d %8d  %s in %s' % (site['calls'], len(site['targets']), site['callee'], site['function']))
+        print()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,286 @@
+# JavaScript values and operators shared by the execution engines.
+#
+# JavaScript values are represented by Python values:
+#
+#       number          int or float
+#       string          str
+#       true / false    True / False
+#       undefined       None
+#       function        JsFunction, or any Python callable used as a builtin
+#
+# The operators follow JavaScript rather than Python: "+" concatenates as
+# soon as one side is a string, "/" by zero gives Infinity or NaN, "==" and
+# the comparisons convert their operands to numbers, and "&&" / "||" return
+# one of their operands (the engines evaluate those two themselves because
+# they short-circuit).
+
+import math
+import re
+
+from myJsResolver import declared_names
+
+
+class JsRuntimeError(Exception):
+    pass
+
+
+class Env(object):
+    # One frame of variables with a link to the frame it is nested in.
+    __slots__ = ('names', 'parent')
+
+    def __init__(self, names=None, parent=None):
+        self.names = {} if names is None else names
+        self.parent = parent
+
+    def lookup(self, name):
+        env = self
+        while env is not None:
+            names = env.names
+            if name in names:
+                return names[name]
+            env = env.parent
+        raise JsRuntimeError('%s is not defined' % name)
+
+    def assign(self, name, value):
+        # Assigning a name no frame declares creates a global, as in
+        # non-strict JavaScript.
+        env = self
+        while True:
+            if name in env.names or env.parent is None:
+                env.names[name] = value
+                return
+            env = env.parent
+
+
+class JsFunction(object):
+    # A function closed over the environment it was defined in. declared
+    # holds the var and function names of the body that are not parameters;
+    # for a body not parsed yet (myJsLazy) it is None until declare() is
+    # called at the first call.
+    __slots__ = ('name', 'params', 'body', 'env', 'declared')
+
+    def __init__(self, name, params, body, env):
+        self.name = name
+        self.params = params
+        self.body = body
+        self.env = env
+        self.declared = None if getattr(body, 'unparsed', False) else self.declare()
+
+    def declare(self):
+        self.declared = tuple(name for name in declarations(self.body) if name not in self.params)
+        return self.declared
+
+    def __call__(self, *args):
+        from myJsInterpreter import call        # myJsInterpreter imports this module
+        return call(self, list(args))
+
+    def __repr__(self):
+        return '<JsFunction %s(%s)>' % (self.name or '', ', '.join(self.params))
+
+
+def declarations(stmts):
+    # Names declared by var and function statements in a function body, see
+    # myJsResolver. They belong to the function's frame from the moment it
+    # is called.
+    return list(declared_names(stmts))
+
+
+# Conversions
+
+def truthy(value):
+    if value is None or value is False:
+        return False
+    if value is True:
+        return True
+    if isinstance(value, (int, float)):
+        return value == value and value != 0     # NaN is falsy
+    if isinstance(value, str):
+        return value != ''
+    return True
+
+
+def to_number(value):
+    if value is True:
+        return 1
+    if value is False:
+        return 0
+    if isinstance(value, (int, float)):
+        return value
+    if value is None:
+        return math.nan
+    if isinstance(value, str):
+        match = _NUMBER_STRING.match(value)
+        if match is None:
+            return math.nan
+        digits, radix_digits, radix = match.group('decimal', 'digits', 'radix')
+        if radix_digits is not None:
+            try:
+                return int(radix_digits, _RADIXES[radix.lower()])
+            except ValueError:      # 0b2, 0o9
+                return math.nan
+        if digits is None:
+            return 0
+        unsigned = digits.lstrip('+-')
+        if unsigned == 'Infinity':
+            return -math.inf if digits[0] == '-' else math.inf
+        if unsigned.isdigit():
+            number = int(digits)
+            if number or digits[0] != '-':
+                return number
+        return float(digits)        # -0 is -0.0
+    return math.nan
+
+
+# the StringNumericLiteral of JavaScript: blanks, a decimal number with its
+# sign, Infinity, or a 0x, 0o or 0b integer, or blanks alone; Python's own
+# forms, like 1_000, inf and nan, are not numbers
+_NUMBER_STRING = re.compile(r"""\s*(?:
+    (?P<decimal>[+-]?(?:Infinity|(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?))
+    |0(?P<radix>[xXoObB])(?P<digits>[0-9a-fA-F]+)
+)?\s*\Z""", re.VERBOSE)
+_RADIXES = {'x': 16, 'o': 8, 'b': 2}
+
+
+def to_string(value):
+    if isinstance(value, str):
+        return value
+    if value is None:
+        return 'undefined'
+    if value is True:
+        return 'true'
+    if value is False:
+        return 'false'
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if value != value:
+            return 'NaN'
+        if math.isinf(value):
+            return 'Infinity' if value > 0 else '-Infinity'
+        if value.is_integer():
+            return str(int(value))
+        return repr(value)
+    if isinstance(value, JsFunction):
+        return 'function %s(%s) { ... }' % (value.name or '', ', '.join(value.params))
+    return 'function () { [native code] }'
+
+
+def is_function(value):
+    return isinstance(value, JsFunction) or callable(value)
+
+
+# Operators
+#
+# Each operator first checks for the common case of two plain numbers (bool
+# is excluded because it converts to 0 or 1) before doing any conversion.
+
+_NUMBER_TYPES = frozenset((int, float))
+
+
+def add(left, right):
+    if type(left) in _NUMBER_TYPES and type(right) in _NUMBER_TYPES:
+        return left + right
+    if isinstance(left, str) or isinstance(right, str):
+        return to_string(left) + to_string(right)
+    return to_number(left) + to_number(right)
+
+
+def subtract(left, right):
+    if type(left) in _NUMBER_TYPES and type(right) in _NUMBER_TYPES:
+        return left - right
+    return to_number(left) - to_number(right)
+
+
+def multiply(left, right):
+    if type(left) not in _NUMBER_TYPES or type(right) not in _NUMBER_TYPES:
+        left = to_number(left)
+        right = to_number(right)
+    value = left * right
+    if value == 0 and type(value) is int and (left < 0 or right < 0):
+        return -0.0         # 0 * -1 is -0
+    return value
+
+
+def divide(left, right):
+    left = to_number(left)
+    right = to_number(right)
+    if right == 0:
+        if left == 0 or left != left:
+            return math.nan
+        return math.copysign(math.inf, left) * math.copysign(1, right)
+    if type(left) is int and type(right) is int and left % right == 0:
+        if left == 0 and right < 0:
+            return -0.0     # 0 / -1 is -0
+        return left // right
+    return left / right
+
+
+def less(left, right):
+    if type(left) in _NUMBER_TYPES and type(right) in _NUMBER_TYPES:
+        return left < right
+    if isinstance(left, str) and isinstance(right, str):
+        return left < right
+    return to_number(left) < to_number(right)
+
+
+def greater(left, right):
+    if type(left) in _NUMBER_TYPES and type(right) in _NUMBER_TYPES:
+        return left > right
+    if isinstance(left, str) and isinstance(right, str):
+        return left > right
+    return to_number(left) > to_number(right)
+
+
+def less_equal(left, right):
+    if type(left) in _NUMBER_TYPES and type(right) in _NUMBER_TYPES:
+        return left <= right
+    if isinstance(left, str) and isinstance(right, str):
+        return left <= right
+    return to_number(left) <= to_number(right)
+
+
+def greater_equal(left, right):
+    if type(left) in _NUMBER_TYPES and type(right) in _NUMBER_TYPES:
+        return left >= right
+    if isinstance(left, str) and isinstance(right, str):
+        return left >= right
+    return to_number(left) >= to_number(right)
+
+
+def equal(left, right):
+    if type(left) in _NUMBER_TYPES and type(right) in _NUMBER_TYPES:
+        return left == right
+    if isinstance(left, str) and isinstance(right, str):
+        return left == right
+    if left is None or right is None:
+        return left is right
+    if is_function(left) or is_function(right):
+        return left is right
+    return to_number(left) == to_number(right)
+
+
+def not_equal(left, right):
+    return not equal(left, right)
+
+
+def negative(value):
+    value = to_number(value)
+    return -value if value else -float(value)     # -0 is -0.0, as 1 / -0 is -Infinity
+
+
+def logical_not(value):
+    return not truthy(value)
+
+
+BINOPS = {
+    '+': add,
+    '-': subtract,
+    '*': multiply,
+    '/': divide,
+    '<': less,
+    '>': greater,
+    '<=': less_equal,
+    '>=': greater_equal,
+    '==': equal,
+    '!=': not_equal,
+}
@@ -0,0 +1,84 @@
+# Many programs run at once on myJsVM, taking turns, under asyncio.
+#
+#       scheduler = Scheduler(turn=1000, max_steps=None, max_depth=None, max_string=None)
+#       await scheduler.run(program, env) -> value
+#       scheduler.stats() -> dict
+#
+# program is a parse tree or a Code of myJsBytecode. run() executes it
+# turn steps at a time (see Task in myJsVM) and lets the other coroutines
+# of the event loop run between two turns, so that any number of scripts
+# gathered on one loop share it, each one waiting at most one turn of each
+# of the others, whatever it does. The limits are those of a Task and apply
+# to every script: one that goes over a limit is ended and its run()
+# raises BudgetExceeded, as any other error of the script is raised, while
+# the others go on.
+#
+# The scheduler keeps the latency of every script, from the call of run()
+# to its end, with its number of steps and turns. stats() gives the
+# number of scripts finished and failed, steps and turns in all, and the
+# 50th and 99th percentiles and the maximum of the latencies, in seconds.
+
+import asyncio
+import time
+
+import myJsVM
+from myJsBytecode import Code, compile_program
+
+
+class Scheduler(object):
+
+    def __init__(self, turn=1000, max_steps=None, max_depth=None, max_string=None):
+        if turn < 1:
+            raise ValueError('a turn must be at least one step')
+        self.turn = turn
+        self.max_steps = max_steps
+        self.max_depth = max_depth
+        self.max_string = max_string
+        self.latencies = []     # seconds, of every script that ended
+        self.finished = 0
+        self.failed = 0
+        self.steps = 0
+        self.turns = 0
+
+    def run(self, program, env=None):
+        # the latency of the script starts now, not when it is first given a turn
+        code = program if isinstance(program, Code) else compile_program(program)
+        task = myJsVM.spawn(code, env, self.max_steps, self.max_depth, self.max_string)
+        return self._run(task, time.perf_counter())
+
+    async def _run(self, task, start):
+        turn = self.turn
+        turns = 1
+        try:
+            while not task.run(turn):
+                turns += 1
+                await asyncio.sleep(0)
+        except Exception:
+            self.failed += 1
+            raise
+        else:
+            self.finished += 1
+        finally:
+            self.latencies.append(time.perf_counter() - start)
+            self.steps += task.steps
+            self.turns += turns
+        return task.result
+
+    def stats(self):
+        latencies = sorted(self.latencies)
+        return {
+            'finished': self.finished,
+            'failed': self.failed,
+            'steps': self.steps,
+            'turns': self.turns,
+            'p50_seconds': percentile(latencies, 50),
+            'p99_seconds': percentile(latencies, 99),
+            'max_seconds': latencies[-1] if latencies else 0.0,
+        }
+
+
+def percentile(values, p):
+    # the nearest-rank percentile of sorted values
+    if not values:
+        return 0.0
+    return values[max(0, -(-len(values) * p // 100) - 1)]
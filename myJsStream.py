@@ -0,0 +1,144 @@
+# Tokenizing JavaScript source that does not fit in one string.
+#
+#       tokens(source, lexer=None, chunk_size=CHUNK_SIZE) -> generator of LexToken
+#       tokenize_file(path, lexer=None, chunk_size=CHUNK_SIZE) -> generator of LexToken
+#
+# source is a str, a file object opened in text or binary mode, or an mmap;
+# bytes are decoded as UTF-8. tokenize_file reads the file in binary mode
+# rather than mapping it: the pages of a mapping stay resident once they
+# have been read, so a mapped file of several hundred MB ends up in memory
+# after all.
+#
+# The source is read chunk_size characters at a time and handed to the PLY
+# lexer up to the last newline read so far, keeping the rest for the next
+# piece. No token other than a string can contain a newline, and inside a
+# /* */ comment the lexer stays in its comment state from one piece to the
+# next, so the only thing that can be cut in two is a string literal. When a
+# piece ends inside one, its opening quote fails to match and the lexer
+# reports an error there; instead of skipping the quote, the rest of the
+# piece is carried over and lexed again with more input behind it. A string
+# that is never closed is only reported as an error at the end of input,
+# and everything after its quote is held in memory until then.
+#
+# Text read without a newline, like a minified bundle on one line, is lexed
+# all the same, holding back the last token of the piece, which could go on
+# in the next one: the piece is cut at its start. A piece with no token in
+# it is cut at its end if it is blanks or inside a /* */ comment. Only a
+# // comment, or a string, longer than chunk_size is lexed again as more
+# of it is read, which takes time quadratic in its length.
+#
+# The tokens are the ones the lexer would produce for the whole source at
+# once: lineno keeps counting from piece to piece and lexpos is the offset in
+# the whole source, in characters.
+
+import codecs
+
+import myJsLexer
+
+
+CHUNK_SIZE = 1 << 20
+
+
+class _OpenString(Exception):
+    pass
+
+
+def tokenize_file(path, lexer=None, chunk_size=CHUNK_SIZE):
+    with open(path, 'rb') as f:
+        for tok in tokens(f, lexer, chunk_size):
+            yield tok
+
+
+def tokens(source, lexer=None, chunk_size=CHUNK_SIZE):
+    if isinstance(source, str):
+        read = _reader(source)
+    else:
+        read = source.read
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    lexer = (lexer or myJsLexer.build()).clone()
+    state = {'final': False}
+    lexer.lexstateerrorf = dict(lexer.lexstateerrorf)
+    lexer.lexstateerrorf['INITIAL'] = _string_error(lexer.lexstateerrorf.get('INITIAL'), state)
+    if lexer.lexstate == 'INITIAL':
+        lexer.lexerrorf = lexer.lexstateerrorf['INITIAL']
+
+    base = 0            # offset of the piece being lexed in the whole source
+    carry = ''
+    while not state['final']:
+        data = read(chunk_size)
+        if isinstance(data, bytes):
+            text = decoder.decode(data, not data)
+        else:
+            text = data
+        state['final'] = not data
+        text = carry + text
+        hold = False        # the last token of the piece may go on in the next
+        if state['final']:
+            piece, carry = text, ''
+        else:
+            cut = text.rfind('\n') + 1
+            if cut:
+                piece, carry = text[:cut], text[cut:]
+            else:
+                piece, carry, hold = text, '', True
+            if not piece:
+                continue
+        start_state = lexer.lexstate
+        lexer.input(piece)
+        held = None
+        try:
+            while True:
+                tok = lexer.token()
+                if tok is None:
+                    break
+                tok.lexpos += base
+                if hold:
+                    if held is not None:
+                        yield held
+                    held = tok
+                else:
+                    yield tok
+        except _OpenString:
+            if held is not None:
+                yield held
+            carry = piece[lexer.lexpos:] + carry
+            base += lexer.lexpos
+            continue
+        if not hold:
+            base += len(piece)
+        elif held is not None:
+            # lexed again from its start, where the lexer was in INITIAL
+            cut = held.lexpos - base
+            carry = piece[cut:]
+            base += cut
+            lexer.begin('INITIAL')
+        elif lexer.lexstate == 'comment' or not piece.strip(' \t\v\r'):
+            # inside a comment or blanks, which can be cut anywhere but
+            # between the * and / of a */
+            cut = len(piece) - 1 if piece.endswith('*') else len(piece)
+            carry = piece[cut:]
+            base += cut
+        else:
+            # a // comment, or the end of one after a */: all of it again
+            carry = piece
+            lexer.begin(start_state)
+
+
+def _reader(text):
+    position = [0]
+
+    def read(size):
+        start = position[0]
+        position[0] = start + size
+        return text[start:start + size]
+    return read
+
+
+def _string_error(error, state):
+    # The INITIAL state error function: an unmatched quote is the start of a
+    # string that goes on in the next piece, unless there is no more input.
+    def string_error(t):
+        if t.value[0] == '"' and not state['final']:
+            raise _OpenString()
+        return error(t)
+    return string_error
@@ -0,0 +1,84 @@
+# Generated PLY tables for myJsLexer and myJsParser.
+#
+# Building the lexer compiles its master regular expression and building the
+# parser runs the whole LALR construction, which dominates the start-up time
+# of short-lived processes. Both are written once to table modules whose file
+# name carries a hash of the rules they were generated from, e.g.
+#
+#       myJsLextab_3f2a9c0d1e4b5a67.py
+#       myJsParsetab_9b8c7d6e5f4a3b21.py
+#
+# so editing a token rule or a production docstring picks a new file name and
+# the stale table is never loaded.
+
+import glob
+import hashlib
+import importlib.util
+import os
+
+
+TABLE_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def signature(parts):
+    digest = hashlib.sha1()
+    for part in parts:
+        digest.update(repr(part).encode('utf-8'))
+        digest.update(b'\0')
+    return digest.hexdigest()[:16]
+
+
+def rule_functions(namespace, prefix):
+    # (name, docstring) of every rule function, in the order PLY sees them
+    funcs = [value for name, value in namespace.items() if name.startswith(prefix) and callable(value)]
+    funcs.sort(key=lambda f: f.__code__.co_firstlineno)
+    return [(f.__name__, f.__doc__) for f in funcs]
+
+
+def table_name(prefix, sig):
+    return '%s_%s' % (prefix, sig)
+
+
+def load_table(name, outputdir):
+    # the table module called name in outputdir, or None if there isn't one
+    path = os.path.join(outputdir, name + '.py')
+    if not os.path.exists(path):
+        return None
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    try:
+        spec.loader.exec_module(module)
+    except Exception:
+        return None
+    return module
+
+
+def write_table(name, outputdir, writer):
+    # writer(directory, module) generates module.py in directory and returns
+    # a result. It runs in a scratch directory under a name nothing can import
+    # by accident, and the file is moved into place in one step so that a
+    # concurrent process never loads a half-written table.
+    import shutil       # only needed when the tables are stale, keep them out of start-up
+    import tempfile
+    try:
+        scratch = tempfile.mkdtemp(prefix='.tables-', dir=outputdir)
+    except OSError:
+        return writer(None, None)
+    module = '%s_%d' % (name, os.getpid())
+    try:
+        result = writer(scratch, module)
+        written = os.path.join(scratch, module + '.py')
+        if os.path.exists(written):
+            os.replace(written, os.path.join(outputdir, name + '.py'))
+        return result
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+
+def remove_stale(prefix, keep, outputdir):
+    for path in glob.glob(os.path.join(outputdir, prefix + '_*.py')):
+        if os.path.basename(path) != keep + '.py':
+            try:
+                os.remove(path)
+            except OSError:
+                pass
@@ -0,0 +1,128 @@
+# Tokenizing a whole source into a compact buffer, and parsing from it.
+#
+#       tokenize_all(source) -> TokenBuffer
+#       parse(buffer, parser) -> ast
+#
+# A TokenBuffer keeps one entry per token in four parallel arrays instead of
+# one LexToken object per token:
+#
+#       types       array('B'), the index of the token type in TYPES
+#       starts      array('i'), lexpos of the first character
+#       ends        array('i'), lexpos after the last character
+#       lines       array('i'), lineno
+#
+# Values are not stored: they are cut out of the source when asked for, so
+# a token costs 13 bytes however long the source is.
+#
+# BufferLexer gives the tokens of a buffer to the PLY parser through the
+# token() method it calls on a lexer. The parser keeps the tokens it has
+# shifted on its stack, so each call still makes an object, but a small one
+# with __slots__, made only when the parser asks for it.
+
+from array import array
+
+import myJsFastLexer
+import myJsLexer
+
+
+TYPES = tuple(myJsLexer.tokens)
+CODES = dict((name, code) for code, name in enumerate(TYPES))
+
+NUMBER = CODES['NUMBER']
+STRING = CODES['STRING']
+
+
+class TokenBuffer(object):
+
+    def __init__(self, source):
+        self.source = source
+        self.types = array('B')
+        self.starts = array('i')
+        self.ends = array('i')
+        self.lines = array('i')
+
+    def __len__(self):
+        return len(self.types)
+
+    def type(self, i):
+        return TYPES[self.types[i]]
+
+    def value(self, i):
+        # the value myJsLexer gives the token
+        text = self.source[self.starts[i]:self.ends[i]]
+        code = self.types[i]
+        if code == NUMBER:
+            return float(text) if '.' in text else int(text)
+        if code == STRING:
+            return text[1:-1]
+        return text
+
+    def token(self, i):
+        return Token(TYPES[self.types[i]], self.value(i), self.lines[i], self.starts[i])
+
+    def nbytes(self):
+        return sum(a.itemsize * len(a) for a in (self.types, self.starts, self.ends, self.lines))
+
+
+class Token(object):
+    __slots__ = ('type', 'value', 'lineno', 'lexpos')
+
+    def __init__(self, type, value, lineno, lexpos):
+        self.type = type
+        self.value = value
+        self.lineno = lineno
+        self.lexpos = lexpos
+
+    def __repr__(self):
+        return 'Token(%s,%r,%d,%d)' % (self.type, self.value, self.lineno, self.lexpos)
+
+
+def tokenize_all(source, lexer=None):
+    buffer = TokenBuffer(source)
+    lexer = (lexer or myJsFastLexer.build()).clone()
+    lexer.lineno = 1
+    lexer.input(source)
+    types = buffer.types.append
+    starts = buffer.starts.append
+    ends = buffer.ends.append
+    lines = buffer.lines.append
+    codes = CODES
+    token = lexer.token
+    while True:
+        tok = token()
+        if tok is None:
+            return buffer
+        types(codes[tok.type])
+        starts(tok.lexpos)
+        ends(lexer.lexpos)
+        lines(tok.lineno)
+
+
+class BufferLexer(object):
+    # The tokens of a TokenBuffer, one at a time, as a lexer for the parser.
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self.position = 0
+        self.lineno = 1
+        self.lexpos = 0
+
+    def input(self, source):
+        raise ValueError('a BufferLexer reads its tokens from a TokenBuffer')
+
+    def token(self):
+        i = self.position
+        buffer = self.buffer
+        if i >= len(buffer.types):
+            return None
+        self.position = i + 1
+        self.lineno = buffer.lines[i]
+        self.lexpos = buffer.ends[i]
+        return buffer.token(i)
+
+    def __iter__(self):
+        return iter(self.token, None)
+
+
+def parse(buffer, parser):
+    return parser.parse(lexer=BufferLexer(buffer))
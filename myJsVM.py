@@ -0,0 +1,367 @@
+# Stack machine for the bytecode built by myJsBytecode.
+#
+#       run(ast, env) -> value              compile, then execute
+#       run_code(code, env) -> value        execute an already compiled program
+#       spawn(code, env, max_steps=None, max_depth=None, max_string=None) -> Task
+#       task.run(budget=None) -> done       execute up to budget more steps
+#
+# env is a dict of globals as for the other engines. Every call gets a new
+# frame list laid out as described in myJsResolver and its own operand
+# stack; the dispatch loop tests the most frequent opcodes first.
+#
+# A call from JavaScript to JavaScript does not call execute() again: the
+# caller's code, pc, operand stack, frame and globals are pushed on a list
+# of callers and the loop goes on with the callee, and RETURN pops them
+# back. So recursion is as deep as memory allows, not as deep as Python's
+# recursion limit. A TAIL_CALL ("return f(...)") pushes nothing, as the
+# caller would only return what the callee returns: a loop written as tail
+# recursion runs in constant memory. A builtin is called as a Python
+# function, and a VMFunction called from Python runs a loop of its own.
+#
+# A Task is a program being executed, which can stop and go on later. Its
+# steps are the instructions it has executed. task.run(budget) goes on
+# until the program returns, then task.done is true and task.result its
+# value, or until it has taken budget steps: it stops at the next call or
+# return and goes on from there at the next run(). As there are no loops,
+# every function gets to a call or a return within as many instructions as
+# it has. The steps are counted at each jump, call and return only, which
+# costs the loop next to nothing.
+#
+# A task has limits, which raise BudgetExceeded, a JsRuntimeError, and end
+# it: max_steps on its steps, max_depth on the number of calls under way,
+# and max_string on the length of the strings "+" makes, the two ways a
+# program without loops can take up memory. What a builtin does, including
+# a VMFunction it calls, is not counted, but is one step.
+
+import sys
+
+from myJsBytecode import (ADD, CALL, DECLARE_GLOBAL, DIVIDE, EQUAL, GREATER, GREATER_EQUAL, JUMP,
+                          JUMP_IF_FALSE, JUMP_IF_FALSE_OR_POP, JUMP_IF_TRUE_OR_POP, LESS, LESS_EQUAL,
+                          LOAD_CONST, LOAD_GLOBAL, LOAD_LOCAL, LOAD_OUTER, MAKE_FUNCTION, MULTIPLY,
+                          NEGATIVE, NOT, NOT_EQUAL, POP, RETURN, STORE_GLOBAL, STORE_LOCAL, STORE_OUTER,
+                          SUBTRACT, TAIL_CALL, compile_program)
+from myJsRuntime import (JsRuntimeError, add, divide, equal, greater, greater_equal, less, less_equal,
+                         multiply, negative, subtract, truthy)
+
+
+_NUMBER_TYPES = frozenset((int, float))
+
+
+class VMFunction(object):
+    # A function closed over the frame it was defined in. Calling it from
+    # Python (for example from a builtin) runs it on the machine.
+    __slots__ = ('code', 'frame', 'globals', 'padding')
+
+    def __init__(self, code, frame, globals):
+        self.code = code
+        self.frame = frame
+        self.globals = globals
+        self.padding = [None] * (code.nlocals - code.nparams)
+
+    def __call__(self, *args):
+        return call(self, list(args))
+
+    def __repr__(self):
+        return '<VMFunction %s(%s)>' % (self.code.name or '', ', '.join(self.code.params))
+
+
+def run(ast, env=None):
+    return run_code(compile_program(ast), env)
+
+
+def run_code(code, env=None):
+    task = spawn(code, env)
+    task.run()
+    return task.result
+
+
+def spawn(code, env=None, max_steps=None, max_depth=None, max_string=None):
+    if env is None:
+        env = {}
+    elif not isinstance(env, dict):
+        env = env.names
+    frame = [None] * (code.nlocals + 1)
+    return Task(code, frame, env, max_steps, max_depth, max_string)
+
+
+def call(callee, args):
+    if type(callee) is VMFunction:
+        code = callee.code
+        nparams = code.nparams
+        if len(args) != nparams:
+            args = args[:nparams] + [None] * (nparams - len(args))
+        frame = [callee.frame]
+        frame += args
+        frame += callee.padding
+        return execute(code, frame, callee.globals)
+    if callable(callee):
+        return callee(*args)
+    raise JsRuntimeError('%r is not a function' % (callee,))
+
+
+def execute(code, frame, globals):
+    task = Task(code, frame, globals)
+    task.run()
+    return task.result
+
+
+class BudgetExceeded(JsRuntimeError):
+    # a task went over one of its limits
+    pass
+
+
+class Task(object):
+    __slots__ = ('code', 'pc', 'stack', 'frame', 'globals', 'callers', 'steps', 'done', 'result', 'error',
+                 'max_steps', 'max_depth', 'max_string')
+
+    def __init__(self, code, frame, globals, max_steps=None, max_depth=None, max_string=None):
+        self.code = code
+        self.pc = 0
+        self.stack = []
+        self.frame = frame
+        self.globals = globals
+        self.callers = []       # (code, pc, stack, frame, globals) of every call under way
+        self.steps = 0
+        self.done = False
+        self.result = None
+        self.error = None       # that ended the task, raised again by run()
+        self.max_steps = sys.maxsize if max_steps is None else max_steps
+        self.max_depth = sys.maxsize if max_depth is None else max_depth
+        self.max_string = sys.maxsize if max_string is None else max_string
+
+    def __repr__(self):
+        state = 'error' if self.error is not None else 'done' if self.done else 'at %d' % self.pc
+        return '<Task %s, %d steps>' % (state, self.steps)
+
+    def _finish(self, value):
+        self.result = value
+        self.done = True
+        self.code = self.stack = self.frame = self.globals = self.callers = None
+        return True
+
+    def run(self, budget=None):
+        if self.error is not None:
+            raise self.error
+        if self.done:
+            return True
+        limit = self.max_steps if budget is None else min(self.steps + budget, self.max_steps)
+        max_depth = self.max_depth
+        max_string = self.max_string
+        callers = self.callers
+        code = self.code
+        ops = code.ops
+        args = code.args
+        consts = code.consts
+        names = code.names
+        stack = self.stack
+        push = stack.append
+        pop = stack.pop
+        frame = self.frame
+        globals = self.globals
+        pc = start = self.pc            # start: where the instructions not yet counted start
+        steps = self.steps
+        try:
+            while True:
+                op = ops[pc]
+                arg = args[pc]
+                pc += 1
+                if op == LOAD_LOCAL:
+                    push(frame[arg])
+                elif op == LOAD_CONST:
+                    push(consts[arg])
+                elif op == LOAD_GLOBAL:
+                    try:
+                        push(globals[names[arg]])
+                    except KeyError:
+                        raise JsRuntimeError('%s is not defined' % names[arg])
+                elif op == STORE_LOCAL:
+                    frame[arg] = pop()
+                elif op == JUMP_IF_FALSE:
+                    value = pop()
+                    if value is not True and not truthy(value):
+                        steps += pc - start
+                        pc = start = arg
+                elif op == ADD:
+                    b = pop()
+                    a = stack[-1]
+                    if type(a) in _NUMBER_TYPES and type(b) in _NUMBER_TYPES:
+                        stack[-1] = a + b
+                    else:
+                        value = add(a, b)
+                        if type(value) is str and len(value) > max_string:
+                            raise BudgetExceeded('string of more than %d characters' % max_string)
+                        stack[-1] = value
+                elif op == SUBTRACT:
+                    b = pop()
+                    a = stack[-1]
+                    if type(a) in _NUMBER_TYPES and type(b) in _NUMBER_TYPES:
+                        stack[-1] = a - b
+                    else:
+                        stack[-1] = subtract(a, b)
+                elif op == MULTIPLY:
+                    b = pop()
+                    a = stack[-1]
+                    if type(a) in _NUMBER_TYPES and type(b) in _NUMBER_TYPES and (a and b or type(a * b) is float):
+                        stack[-1] = a * b
+                    else:
+                        stack[-1] = multiply(a, b)
+                elif op == LESS:
+                    b = pop()
+                    a = stack[-1]
+                    if type(a) in _NUMBER_TYPES and type(b) in _NUMBER_TYPES:
+                        stack[-1] = a < b
+                    else:
+                        stack[-1] = less(a, b)
+                elif op == LESS_EQUAL:
+                    b = pop()
+                    a = stack[-1]
+                    if type(a) in _NUMBER_TYPES and type(b) in _NUMBER_TYPES:
+                        stack[-1] = a <= b
+                    else:
+                        stack[-1] = less_equal(a, b)
+                elif op == EQUAL:
+                    b = pop()
+                    a = stack[-1]
+                    if type(a) in _NUMBER_TYPES and type(b) in _NUMBER_TYPES:
+                        stack[-1] = a == b
+                    else:
+                        stack[-1] = equal(a, b)
+                elif op == CALL or op == TAIL_CALL:
+                    if steps + pc - 1 - start >= limit:
+                        pc -= 1
+                        steps += pc - start
+                        break
+                    steps += pc - start
+                    start = pc
+                    if arg:
+                        call_args = stack[-arg:]
+                        del stack[-arg:]
+                    else:
+                        call_args = []
+                    callee = pop()
+                    if type(callee) is not VMFunction:
+                        value = call(callee, call_args)
+                        if op == CALL:
+                            push(value)
+                            continue
+                        if not callers:
+                            self.steps = steps
+                            return self._finish(value)
+                        code, pc, stack, frame, globals = callers.pop()
+                        stack.append(value)
+                    else:
+                        if op == CALL:
+                            if len(callers) >= max_depth:
+                                raise BudgetExceeded('more than %d calls deep' % max_depth)
+                            callers.append((code, pc, stack, frame, globals))
+                        code = callee.code
+                        nparams = code.nparams
+                        if len(call_args) != nparams:
+                            call_args = call_args[:nparams] + [None] * (nparams - len(call_args))
+                        frame = [callee.frame]
+                        frame += call_args
+                        frame += callee.padding
+                        globals = callee.globals
+                        stack = []
+                        pc = 0
+                    start = pc
+                    ops = code.ops
+                    args = code.args
+                    consts = code.consts
+                    names = code.names
+                    push = stack.append
+                    pop = stack.pop
+                elif op == RETURN:
+                    if not callers:
+                        self.steps = steps + pc - start
+                        return self._finish(pop())
+                    if steps + pc - 1 - start >= limit:
+                        pc -= 1
+                        steps += pc - start
+                        break
+                    steps += pc - start
+                    value = pop()
+                    code, pc, stack, frame, globals = callers.pop()
+                    stack.append(value)
+                    ops = code.ops
+                    args = code.args
+                    consts = code.consts
+                    names = code.names
+                    push = stack.append
+                    pop = stack.pop
+                    start = pc
+                elif op == JUMP:
+                    steps += pc - start
+                    pc = start = arg
+                elif op == GREATER:
+                    b = pop()
+                    a = stack[-1]
+                    if type(a) in _NUMBER_TYPES and type(b) in _NUMBER_TYPES:
+                        stack[-1] = a > b
+                    else:
+                        stack[-1] = greater(a, b)
+                elif op == GREATER_EQUAL:
+                    b = pop()
+                    a = stack[-1]
+                    if type(a) in _NUMBER_TYPES and type(b) in _NUMBER_TYPES:
+                        stack[-1] = a >= b
+                    else:
+                        stack[-1] = greater_equal(a, b)
+                elif op == NOT_EQUAL:
+                    b = pop()
+                    stack[-1] = not equal(stack[-1], b)
+                elif op == DIVIDE:
+                    b = pop()
+                    stack[-1] = divide(stack[-1], b)
+                elif op == NOT:
+                    stack[-1] = not truthy(stack[-1])
+                elif op == NEGATIVE:
+                    stack[-1] = negative(stack[-1])
+                elif op == POP:
+                    pop()
+                elif op == JUMP_IF_FALSE_OR_POP:
+                    if truthy(stack[-1]):
+                        pop()
+                    else:
+                        steps += pc - start
+                        pc = start = arg
+                elif op == JUMP_IF_TRUE_OR_POP:
+                    if truthy(stack[-1]):
+                        steps += pc - start
+                        pc = start = arg
+                    else:
+                        pop()
+                elif op == LOAD_OUTER:
+                    outer = frame
+                    for _ in range(arg >> 16):
+                        outer = outer[0]
+                    push(outer[arg & 0xffff])
+                elif op == STORE_OUTER:
+                    outer = frame
+                    for _ in range(arg >> 16):
+                        outer = outer[0]
+                    outer[arg & 0xffff] = pop()
+                elif op == STORE_GLOBAL:
+                    globals[names[arg]] = pop()
+                elif op == MAKE_FUNCTION:
+                    push(VMFunction(consts[arg], frame, globals))
+                elif op == DECLARE_GLOBAL:
+                    globals.setdefault(names[arg], None)
+                else:
+                    raise JsRuntimeError('bad opcode %d at %d in %r' % (op, pc - 1, code))
+        except BaseException as error:
+            self.steps = steps
+            self.done = True
+            self.error = error
+            raise
+        self.code = code
+        self.pc = pc
+        self.stack = stack
+        self.frame = frame
+        self.globals = globals
+        self.steps = steps
+        if steps >= self.max_steps:
+            self.done = True
+            self.error = BudgetExceeded('more than %d steps' % self.max_steps)
+            raise self.error
+        return False
@@ -0,0 +1,316 @@
+# Evaluating one expression over many records at once, with NumPy.
+#
+#       rule = compile_expression(exp)
+#       rule(columns, n=None) -> array      the value of exp for every row
+#       evaluate_rows(exp, columns, n=None) -> list     the same, one row at a time
+#
+# exp is an expression of myJsParser, like ast[0][1][1] of "price * qty > 100;".
+# columns maps the names in it to a column of values, a list or an array
+# with one value per row, or to a single value for every row: a number, a
+# string, true/false or a function for the calls. n is the number of rows,
+# which is only needed when no name is bound to a column.
+#
+# A column of numbers or of booleans is one NumPy array, float64 or bool,
+# and the operators of numbers and booleans are done by NumPy on all of the
+# rows at once: + - * / < > <= >= == != && || ! and -, with the conversions
+# of myJsRuntime, so that "/" by zero gives Infinity or NaN and NaN is
+# falsy. Numbers are float64, as in JavaScript; an int of more than 53 bits
+# is rounded, where the row by row evaluator would keep it exact.
+#
+# Anything else is done one row at a time with the functions of
+# myJsRuntime and myJsInterpreter, for only the nodes that need it: a
+# call, an operator with a string, undefined or a function on either side,
+# or a && or || whose operands are a boolean and a number, which gives
+# either. Their results are held in object arrays, which turn back into
+# float64 or bool arrays as soon as every value is a number or every value
+# is a boolean, so the rest of the expression is done by NumPy again.
+#
+# The right side of && and || is evaluated only for the rows that need it
+# when it has a call in it, so a function is called for the same rows as
+# row by row evaluation would, though in another order; without one it is
+# evaluated for every row, which is cheaper than picking the rows out.
+#
+# The result is an array of n values: float64 for numbers, bool for
+# booleans and object for anything else.
+
+try:
+    import numpy
+except ImportError:     # only needed to use this module
+    numpy = None
+
+from myJsInterpreter import call, evaluate
+from myJsRuntime import BINOPS, Env, JsRuntimeError, logical_not, negative, truthy
+
+
+def compile_expression(exp):
+    if numpy is None:
+        raise ImportError('myJsVector needs NumPy')
+    kernel = _compile(exp)
+
+    def rule(columns, n=None):
+        rows = _Rows(columns, _length(columns, [name for name, value in columns.items() if _is_column(value)], n))
+        return _full(kernel(rows), rows.n)
+    return rule
+
+
+def evaluate_rows(exp, columns, n=None):
+    # exp evaluated by myJsInterpreter for one row after the other
+    names = [name for name, value in columns.items() if _is_column(value)]
+    n = _length(columns, names, n)
+    env = Env(dict(columns))
+    values = env.names
+    lists = [(name, list(columns[name]) if isinstance(columns[name], (list, tuple)) else columns[name].tolist())
+             for name in names]
+    results = []
+    for i in range(n):
+        for name, column in lists:
+            values[name] = column[i]
+        results.append(evaluate(exp, env))
+    return results
+
+
+def _is_column(value):
+    return isinstance(value, (list, tuple)) or (numpy is not None and isinstance(value, numpy.ndarray))
+
+
+def _length(columns, names, n):
+    lengths = set(len(columns[name]) for name in names)
+    if len(lengths) > 1:
+        raise ValueError('columns of different lengths: %s' % ', '.join(
+            '%s %d' % (name, len(columns[name])) for name in names))
+    if lengths:
+        if n is not None and n not in lengths:
+            raise ValueError('n is %d but the columns have %d rows' % (n, lengths.pop()))
+        return lengths.pop()
+    if n is None:
+        raise ValueError('no column to take the number of rows from, give n')
+    return n
+
+
+# Values
+#
+# A value is an array of one item per row or a 0-d array for the same item
+# in every row, of dtype float64, bool or object.
+
+def _typed(values):
+    # an object array as a float64 or bool array if it can be one
+    items = values.tolist() if values.ndim else [values[()]]
+    types = set(map(type, items))
+    if types and types <= {bool}:
+        return values.astype(bool)
+    if types and types <= {int, float}:
+        try:
+            return values.astype(numpy.float64)
+        except OverflowError:
+            return values
+    return values
+
+
+def _value(item):
+    # one item as a 0-d array
+    if type(item) is bool:
+        return numpy.asarray(item)
+    if type(item) in (int, float):
+        return numpy.asarray(float(item))
+    value = numpy.empty((), dtype=object)
+    value[()] = item
+    return value
+
+
+def _array(column):
+    # a column as a value
+    if isinstance(column, numpy.ndarray) and column.dtype.kind in 'biuf':
+        return column.astype(bool if column.dtype.kind == 'b' else numpy.float64, copy=False)
+    values = numpy.empty(len(column), dtype=object)
+    values[:] = column.tolist() if isinstance(column, numpy.ndarray) else list(column)
+    return _typed(values)
+
+
+def _items(value, n):
+    # the items of a value as Python values, n of them
+    if value.ndim:
+        return value.tolist()
+    return [value[()].item() if value.dtype != object else value[()]] * n
+
+
+def _full(value, n):
+    if value.ndim:
+        return value
+    result = numpy.empty(n, dtype=value.dtype)
+    result[:] = value[()]
+    return result
+
+
+def _number(value):
+    return value.astype(numpy.float64) if value.dtype == bool else value
+
+
+def _truthy(value, n):
+    if value.dtype == bool:
+        return value
+    if value.dtype == object:
+        return numpy.array([truthy(item) for item in _items(value, n)], dtype=bool)
+    return (value == value) & (value != 0)
+
+
+def _each(func, values, n):
+    # func applied to the items of the values, row by row
+    results = numpy.empty(n, dtype=object)
+    if values:
+        results[:] = [func(*items) for items in zip(*[_items(value, n) for value in values])]
+    else:
+        results[:] = [func() for _ in range(n)]
+    return _typed(results)
+
+
+def _choose(chosen, yes, no, n, masked):
+    # yes for the rows chosen, no for the others; with masked yes has an
+    # item for each row chosen only
+    dtype = yes.dtype if yes.dtype == no.dtype else object
+    result = numpy.empty(n, dtype=dtype)
+    result[:] = no.astype(dtype, copy=False)
+    yes = yes.astype(dtype, copy=False)
+    result[chosen] = yes[chosen] if yes.ndim and not masked else yes
+    return _typed(result) if dtype == object else result
+
+
+class _Rows(object):
+    # the columns of the rows being evaluated, as values
+
+    def __init__(self, columns, n):
+        self.columns = columns
+        self.n = n
+        self.values = {}
+        self.parent = None      # for some of the rows of another _Rows,
+        self.mask = None        # the ones where mask is true
+
+    def get(self, name):
+        value = self.values.get(name)
+        if value is None:
+            if self.parent is not None:
+                value = self.parent.get(name)
+                if value.ndim:
+                    value = value[self.mask]
+            elif name not in self.columns:
+                raise JsRuntimeError('%s is not defined' % name)
+            elif _is_column(self.columns[name]):
+                value = _array(self.columns[name])
+            else:
+                value = _value(self.columns[name])
+            self.values[name] = value
+        return value
+
+    def where(self, mask):
+        rows = _Rows(self.columns, int(numpy.count_nonzero(mask)))
+        rows.parent = self
+        rows.mask = mask
+        return rows
+
+
+# Compiling
+
+def _compile(exp):
+    kind = exp[0]
+    if kind == 'identifier':
+        name = exp[1]
+        return lambda rows: rows.get(name)
+    if kind in ('number', 'string'):
+        value = exp[1]
+        return lambda rows: _value(value)
+    if kind == 'true':
+        return lambda rows: numpy.asarray(True)
+    if kind == 'false':
+        return lambda rows: numpy.asarray(False)
+    if kind == 'not':
+        return _compile_not(_compile(exp[1]))
+    if kind == 'negative':
+        return _compile_negative(_compile(exp[1]))
+    if kind == 'binop':
+        if exp[2] in ('&&', '||'):
+            return _compile_logical(exp[2], _compile(exp[1]), _compile(exp[3]), _has_call(exp[3]))
+        return _compile_binop(exp[2], _compile(exp[1]), _compile(exp[3]))
+    if kind == 'call':
+        return _compile_call(exp[1], [_compile(arg) for arg in exp[2]])
+    raise ValueError('not an expression: %r' % (exp,))
+
+
+def _has_call(exp):
+    if type(exp) is tuple:
+        return exp[0] == 'call' or any(_has_call(item) for item in exp[1:])
+    return False
+
+
+def _compile_not(operand):
+    def run(rows):
+        value = operand(rows)
+        if value.dtype == object:
+            return _each(logical_not, [value], rows.n)
+        return numpy.asarray(~_truthy(value, rows.n))
+    return run
+
+
+def _compile_negative(operand):
+    def run(rows):
+        value = operand(rows)
+        if value.dtype == object:
+            return _each(negative, [value], rows.n)
+        return numpy.asarray(-_number(value))
+    return run
+
+
+# the NumPy functions of the operators on numbers
+_VECTOR_OPS = {
+    '+': 'add',
+    '-': 'subtract',
+    '*': 'multiply',
+    '/': 'true_divide',
+    '<': 'less',
+    '>': 'greater',
+    '<=': 'less_equal',
+    '>=': 'greater_equal',
+    '==': 'equal',
+    '!=': 'not_equal',
+}
+
+
+def _compile_binop(op, left, right):
+    vector = getattr(numpy, _VECTOR_OPS[op])
+    each = BINOPS[op]
+
+    def run(rows):
+        a = left(rows)
+        b = right(rows)
+        if a.dtype == object or b.dtype == object:
+            return _each(each, [a, b], rows.n)
+        with numpy.errstate(divide='ignore', invalid='ignore'):     # x / 0 is Infinity or NaN
+            return numpy.asarray(vector(_number(a), _number(b)))
+    return run
+
+
+def _compile_logical(op, left, right, masked):
+    # a && b is b for the rows where a is truthy and a for the others, a || b
+    # the other way round; with masked b is evaluated for those rows only
+    def run(rows):
+        a = left(rows)
+        n = rows.n
+        chosen = _full(numpy.asarray(_truthy(a, n)), n)
+        if op == '||':
+            chosen = ~chosen
+        if masked:
+            return _choose(chosen, right(rows.where(chosen)), a, n, True)
+        b = right(rows)
+        if a.dtype == b.dtype == bool:
+            return numpy.asarray(a & b if op == '&&' else a | b)
+        return _choose(chosen, b, a, n, False)
+    return run
+
+
+def _compile_call(name, args):
+    def run(rows):
+        callee = rows.get(name)
+        values = [arg(rows) for arg in args]
+        if callee.ndim:
+            return _each(lambda callee, *items: call(callee, list(items)), [callee] + values, rows.n)
+        callee = callee[()]
+        return _each(lambda *items: call(callee, list(items)), values, rows.n)
+    return run
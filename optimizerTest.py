@@ -0,0 +1,99 @@
+import myJsInterpreter
+import myJsLexer
+import myJsParser
+from myJsOptimizer import optimize
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+
+def test_optimize(input_string):
+    return optimize(jsparser.parse(input_string, lexer=jslexer))
+
+
+def test_fold():
+    ast, stats = test_optimize('2 * 3; "a" + 1; 1 / 0; -(1 - 3); !true; x + (1 < 2);')
+    assert ast == [('stmt', ('exp', ('number', 6))),
+                   ('stmt', ('exp', ('string', 'a1'))),
+                   ('stmt', ('exp', ('number', float('inf')))),
+                   ('stmt', ('exp', ('number', 2))),
+                   ('stmt', ('exp', ('false', 'false'))),
+                   ('stmt', ('exp', ('binop', ('identifier', 'x'), '+', ('true', 'true'))))]
+    assert stats.folded == 7
+
+    ast, _ = test_optimize('true && x; false && x; 0 || f(1 + 1); x && true;')
+    assert ast == [('stmt', ('exp', ('identifier', 'x'))),
+                   ('stmt', ('exp', ('false', 'false'))),
+                   ('stmt', ('exp', ('call', 'f', [('number', 2)]))),
+                   ('stmt', ('exp', ('binop', ('identifier', 'x'), '&&', ('true', 'true'))))]
+
+
+def test_prune():
+    ast, stats = test_optimize('''function f() {
+                                      if (false) {g();}
+                                      if (1 < 2) {g(1);} else {g(2);}
+                                      if (0) {var y = 1;}
+                                      return y;
+                                  }''')
+    assert ast[0][3] == [('stmt', ('exp', ('call', 'g', [('number', 1)]))),
+                         ('stmt', ('if-then', ('number', 0), [('stmt', ('var', 'y', ('number', 1)))])),
+                         ('stmt', ('return', ('identifier', 'y')))]
+    assert stats.pruned == 2
+
+    # moving an expression statement to the top level would change the result
+    ast, _ = test_optimize('if (true) {1;} if (true) {x = 2;}')
+    assert ast == [('stmt', ('if-then', ('true', 'true'), [('stmt', ('exp', ('number', 1)))])),
+                   ('stmt', ('assign', 'x', ('number', 2)))]
+
+
+def test_dead():
+    ast, stats = test_optimize('''function f() {
+                                      if (x) {return 1; g();}
+                                      return 2;
+                                      g();
+                                      var x = 3;
+                                      function g() {}
+                                  }''')
+    assert ast[0][3] == [('stmt', ('if-then', ('identifier', 'x'), [('stmt', ('return', ('number', 1)))])),
+                         ('stmt', ('return', ('number', 2))),
+                         ('stmt', ('var', 'x', ('number', 3))),
+                         ('function', 'g', [], [])]
+    assert stats.dead == 2
+
+    ast, stats = test_optimize('function f() {if (true) {return 1;} return 2;}')
+    assert ast[0][3] == [('stmt', ('return', ('number', 1)))]
+    assert (stats.pruned, stats.dead) == (1, 1)
+    assert stats.eliminated == stats.nodes_before - stats.nodes_after == 6
+
+
+def test_same_result():
+    source = '''function f(n) {
+                    if (!false && 2 * 3 > 5) {
+                        if (n < 1 + 1) {return "n=" + n;}
+                        return f(n - 1) + 10 / 4;
+                        return 0;
+                    } else {
+                        return -1;
+                    }
+                }
+                var s = "" + (1 == 1);
+                if (false) {s = "no";}
+                s + f(4);'''
+    ast = jsparser.parse(source, lexer=jslexer)
+    optimized, stats = optimize(ast)
+    assert stats.eliminated > 0
+    for engine in sorted(myJsInterpreter.ENGINES):
+        assert myJsInterpreter.run(optimized, {}, engine) == myJsInterpreter.run(ast, {}, engine)
+
+
+def test():
+    test_fold()
+    test_prune()
+    test_dead()
+    test_same_result()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
@@ -1,11 +1,12 @@
-import ply.lex as lex
-import ply.yacc as yacc
+import contextlib
+import io
+
 import myJsLexer
 import myJsParser
 
 
-jslexer = lex.lex(module=myJsLexer)
-jsparser = yacc.yacc(debug=0, write_tables=0, module=myJsParser)
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
 
 
 def test_parser(input_string):
@@ -59,6 +60,8 @@ def test_expression():
     assert test_parser('fun(1,2);') == [('stmt', ('exp', ('call', 'fun', [('number', 1), ('number', 2)])))]
     assert test_parser('fun(1,"y");') == [('stmt', ('exp', ('call', 'fun', [('number', 1), ('string', 'y')])))]
     assert test_parser('fun(x,1);') == [('stmt', ('exp', ('call', 'fun', [('identifier', 'x'), ('number', 1)])))]
+    assert test_parser('fun(1,2,3);') == [('stmt', ('exp', ('call', 'fun', [('number', 1), ('number', 2),
+                                                                          ('number', 3)])))]
 
 
 def test_stmt():
@@ -99,6 +102,7 @@ def test_topStmt_func():
                                                            [('stmt', ('return', ('number', 2)))])]
     assert test_parser('function fun(x,y) {return x;}') == [('function', 'fun', ['x', 'y'],
                                                              [('stmt', ('return', ('identifier', 'x')))])]
+    assert test_parser('function fun(x,y,z) {}') == [('function', 'fun', ['x', 'y', 'z'], [])]
 
     # test anonymous function
     assert test_parser('function() {return 1;}') == [('lambda', [], [('stmt', ('return', ('number', 1)))])]
@@ -121,11 +125,25 @@ def test_topStmts():
                                                         ('function', 'f', [], [])]
 
 
+def test_error():
+    out = io.StringIO()
+    with contextlib.redirect_stdout(out):
+        assert test_parser('x = 1 2; y;') == [('stmt', ('error',)), ('stmt', ('exp', ('identifier', 'y')))]
+        assert test_parser('function f() {x = ;} if (x) {)} 1;') == [('function', 'f', [], [('stmt', ('error',))]),
+                                                                 ('stmt', ('if-then', ('identifier', 'x'),
+                                                                           [('stmt', ('error',))])),
+                                                                 ('stmt', ('exp', ('number', 1)))]
+        assert test_parser('x = 1 +') is None
+    assert out.getvalue().splitlines() == ['Syntax error at token NUMBER', 'Syntax error at token SEMICOLON',
+                                           'Syntax error at token RPAREN', 'Syntax error at end of input']
+
+
 def test():
     test_expression()
     test_stmt()
     test_topStmt_func()
     test_topStmts()
+    test_error()
     print('tests pass')
 
 
@@ -0,0 +1,75 @@
+import sys
+import threading
+
+import myJsAst
+import myJsPool
+
+
+SOURCES = ['var x%d = %d;\n/* a comment\n over lines */ f(x%d);' % (i, i, i) for i in range(20)] + [
+    'function f(a, b) {\n    if (a < b) {return "a\nb";} else {return a * %d;}\n}\nf(1, 2);' % i for i in range(20)]
+
+
+def describe(tree):
+    # the tuples, and the lines of the statements, which depend on lineno
+    return myJsAst.to_tuple(tree), [node.lineno for node in tree]
+
+
+def test_reset():
+    pool = myJsPool.ParserPool(typed=True)
+    with pool.pair() as (lexer, parser):
+        parser.parse('x;\n/* left open', lexer=lexer)
+        assert (lexer.lineno, lexer.current_state()) == (2, 'comment')
+    tree = pool.parse('\n\ny;')
+    assert pool.made == 1 and tree[0].lineno == 3
+
+
+def test_size():
+    pool = myJsPool.ParserPool(size=2)
+    first = pool.acquire()
+    second = pool.acquire()
+    assert first[0] is not second[0] and first[1] is not second[1]
+    assert first[1].action is second[1].action         # the tables are shared
+    got = []
+    waiting = threading.Thread(target=lambda: got.append(pool.acquire()))
+    waiting.start()
+    waiting.join(0.1)
+    assert not got
+    pool.release(first)
+    waiting.join()
+    assert got[0] is first and pool.made == 2
+
+
+def test_threads(nthreads=16, rounds=20):
+    pool = myJsPool.ParserPool(typed=True)
+    expected = [describe(pool.parse(source)) for source in SOURCES]
+    failures = []
+
+    def work(offset):
+        for i in range(rounds * len(SOURCES)):
+            k = (i + offset) % len(SOURCES)
+            if describe(pool.parse(SOURCES[k])) != expected[k]:
+                failures.append(k)
+
+    interval = sys.getswitchinterval()
+    sys.setswitchinterval(1e-6)
+    try:
+        threads = [threading.Thread(target=work, args=(n,)) for n in range(nthreads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    assert failures == []
+    assert 1 <= pool.made <= nthreads
+
+
+def test():
+    test_reset()
+    test_size()
+    test_threads()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
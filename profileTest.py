@@ -0,0 +1,83 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+import myJsLexer
+import myJsParser
+import myJsProfile
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+SOURCE = 'x = 1 + 2 * 3;\n/* note */\nfunction f(a, b) {return a;}\n'
+
+
+def test_counts():
+    profiler = myJsProfile.Profiler(jslexer, jsparser)
+    for _ in range(2):
+        assert profiler.parse(SOURCE) == jsparser.parse(SOURCE, lexer=jslexer)
+    stats = profiler.stats()
+    assert stats['parses'] == 2 and stats['seconds'] >= stats['lexer']['seconds'] > 0
+    lexer, parser = stats['lexer'], stats['parser']
+    assert lexer['tokens']['NUMBER'] == 6 and lexer['tokens']['IDENTIFIER'] == 10
+    assert lexer['rules']['t_NUMBER']['calls'] == 6 and lexer['rules']['t_newline']['calls'] == 6
+    assert lexer['rules']['t_comment']['calls'] == 2 and 't_error' not in lexer['rules']
+    operation = parser['productions']['exp -> exp PLUS exp']
+    assert operation['function'] == 'p_exp_operation' and operation['calls'] == 2
+    assert parser['productions']['exp -> exp TIMES exp']['calls'] == 2
+    assert parser['tokens'] == sum(lexer['tokens'].values()) == 2 * 20
+    assert parser['reductions'] == sum(p['calls'] for p in parser['productions'].values())
+    assert parser['peak_depth'] == 10       # topStmtsPrefix FUNCTION ... LBRACE RETURN exp SEMICOLON
+    assert json.loads(json.dumps(stats)) == stats
+
+    # nothing changes in what the profiler was given
+    assert jslexer.token.__func__ is type(jslexer).token
+    assert all(p.callable is None or p.callable.__module__ == 'myJsParser' for p in jsparser.productions)
+
+
+def test_folded():
+    profiler = myJsProfile.Profiler()
+    profiler.parse(SOURCE * 50)
+    lines = profiler.folded().splitlines()
+    frames = {}
+    for line in lines:
+        stack, _, microseconds = line.rpartition(' ')
+        frames[stack] = int(microseconds)
+    assert all(stack == 'parse' or stack.startswith('parse;') for stack in frames)
+    assert frames['parse;lexer;t_NUMBER'] > 0
+    assert frames['parse;reduce;exp -> exp PLUS exp (p_exp_operation)'] > 0
+    total = sum(frames.values())
+    assert abs(total - profiler.parsing.seconds * 1e6) <= len(frames)
+
+
+def test_main():
+    fd, path = tempfile.mkstemp(suffix='.js')
+    with os.fdopen(fd, 'w') as f:
+        f.write(SOURCE)
+    try:
+        for args in ([], ['--json'], ['--folded']):
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                assert myJsProfile.main(args + [path]) == 0
+            if args == ['--json']:
+                assert json.loads(out.getvalue())['parser']['tokens'] == 20
+            elif args == ['--folded']:
+                assert out.getvalue().startswith('parse ')
+            else:
+                assert out.getvalue().startswith('1 files in ')
+    finally:
+        os.remove(path)
+
+
+def test():
+    test_counts()
+    test_folded()
+    test_main()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
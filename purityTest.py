@@ -0,0 +1,67 @@
+import myJsLexer
+import myJsParser
+import myJsPurity
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+SOURCE = '''function fib(n) {if (n < 2) {return n;} return fib(n - 1) + fib(n - 2);}
+function even(n) {if (n == 0) {return true;} return odd(n - 1);}
+function odd(n) {if (n == 0) {return false;} return even(n - 1);}
+var count = 0;
+function counted(n) {count = count + 1; return n;}
+function reads(n) {return n + count;}
+function logs(n) {print(n); return n;}
+function big(a, b) {return max(a, b) * 2;}
+function uses(n) {if (n) {return counted(n) + 1;} return 0;}
+function outer(x) {function inner(y) {return y * 2;} return 1;}
+function local(x) {var y = x * 2; x = y + 1; return x;}
+function apply(f, x) {return f(x);}
+function again(n) {return n;}
+function again(n) {return n + 1;}
+function later(n) {return n;}
+later = fib;
+function callsLater(n) {return later(n);}
+function named(n) {return fib;}
+function (x) {function inside(y) {return y;} return inside(x);}
+'''
+
+
+def test_analyze():
+    why = myJsPurity.analyze(jsparser.parse(SOURCE, lexer=jslexer), ('max',))
+    assert list(why) == ['fib', 'even', 'odd', 'counted', 'reads', 'logs', 'big', 'uses', 'outer',
+                         'outer.inner', 'local', 'apply', 'again', 'later', 'callsLater', 'named',
+                         '<lambda>.inside']
+    assert why['counted'] == 'assigns count'
+    assert why['reads'] == 'reads count'
+    assert why['logs'] == 'calls print'
+    assert why['uses'] == 'calls counted, which is not pure'
+    assert why['outer'] == 'defines a function'
+    assert why['apply'] == 'calls f'
+    assert why['again'] == 'declared more than once'
+    assert why['callsLater'] == 'calls later'
+    pure = set(name for name, reason in why.items() if reason is None)
+    assert pure == set(['fib', 'even', 'odd', 'big', 'outer.inner', 'local', 'later', 'named', '<lambda>.inside'])
+    assert 'big' not in myJsPurity.pure_functions(jsparser.parse(SOURCE, lexer=jslexer))
+
+
+def test_mutual():
+    # a cycle is pure only if every function in it is
+    source = '''function a(n) {if (n == 0) {return 0;} return b(n - 1);}
+                function b(n) {return c(n);}
+                function c(n) {if (n == 1) {print(n);} return a(n);}
+                function d(n) {return n;}'''
+    why = myJsPurity.analyze(jsparser.parse(source, lexer=jslexer))
+    assert why == {'a': 'calls b, which is not pure', 'b': 'calls c, which is not pure', 'c': 'calls print',
+                   'd': None}
+
+
+def test():
+    test_analyze()
+    test_mutual()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
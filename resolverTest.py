@@ -0,0 +1,64 @@
+import myJsLexer
+import myJsParser
+from myJsResolver import GLOBAL, Binding, Layout, Undeclared, resolve
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+
+def test_resolve(input_string, builtins=()):
+    return resolve(jsparser.parse(input_string, lexer=jslexer), builtins)
+
+
+def test_globals():
+    resolution = test_resolve('var x = 1; function f() {} x = y;')
+    assert resolution.globals == ['x', 'f']
+    assert resolution.ast == [('stmt', ('var', 'x', ('number', 1), GLOBAL)),
+                              ('function', 'f', [], [], GLOBAL, Layout((), 0)),
+                              ('stmt', ('assign', 'x', ('identifier', 'y', GLOBAL), GLOBAL))]
+    assert resolution.undeclared == [Undeclared('y', 'read')]
+
+
+def test_locals():
+    resolution = test_resolve('''function f(a, b) {
+                                     var c = a;
+                                     if (b) {var d = 1;} else {function g() {return c + a;}}
+                                     return g(d);
+                                 }''')
+    (_, name, params, body, binding, layout), = resolution.ast
+    assert layout == Layout(('a', 'b', 'c', 'd', 'g'), 2)
+    assert body[0] == ('stmt', ('var', 'c', ('identifier', 'a', Binding('param', 0, 1)), Binding('var', 0, 3)))
+    if_stmt = body[1][1]
+    assert if_stmt[2] == [('stmt', ('var', 'd', ('number', 1), Binding('var', 0, 4)))]
+    g = if_stmt[3][0]
+    assert g[4] == Binding('function', 0, 5)
+    assert g[3] == [('stmt', ('return', ('binop', ('identifier', 'c', Binding('var', 1, 3)), '+',
+                                                  ('identifier', 'a', Binding('param', 1, 1)))))]
+    assert body[2] == ('stmt', ('return', ('call', 'g', [('identifier', 'd', Binding('var', 0, 4))],
+                                           Binding('function', 0, 5))))
+    assert resolution.undeclared == []
+
+
+def test_lambda():
+    resolution = test_resolve('function(x, x) {return x;}')
+    assert resolution.ast == [('lambda', ['x', 'x'], [('stmt', ('return', ('identifier', 'x', Binding('param', 0, 2))))],
+                               Layout(('x', 'x'), 2))]
+
+
+def test_undeclared():
+    resolution = test_resolve('print(x); y = 1; function f() {z = w;}', builtins=['print'])
+    assert resolution.undeclared == [Undeclared('x', 'read'), Undeclared('y', 'assign'),
+                                     Undeclared('w', 'read'), Undeclared('z', 'assign')]
+
+
+def test():
+    test_globals()
+    test_locals()
+    test_lambda()
+    test_undeclared()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
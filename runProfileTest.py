@@ -0,0 +1,163 @@
+import contextlib
+import io
+import json
+import os
+import tempfile
+
+import myJsClosure
+import myJsLexer
+import myJsParser
+import myJsRunProfile
+from myJsRuntime import JsRuntimeError
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+SOURCE = '''function fib(n) {if (n < 2) {return n;} return fib(n - 1) + fib(n - 2);}
+function twice(f, x) {return f(f(x));}
+function inc(x) {return x + 1;}
+function dec(x) {return x - 1;}
+function outer(x) {
+    function inner(y) {return y * 2;}
+    return inner(x) + inner(fib(x));
+}
+function (x) {
+    return x;
+}
+return pack(fib(10), twice(inc, 1), twice(dec, 1), outer(5));
+'''
+
+
+def parse(source):
+    return jsparser.parse(source, lexer=jslexer)
+
+
+def profile(source=SOURCE):
+    profiler = myJsRunProfile.RunProfiler(parse(source), {'pack': lambda *values: list(values)}, source)
+    assert profiler.run() == [55, 3, -1, 20]
+    return profiler
+
+
+def test_functions():
+    profiler = profile()
+    assert profiler.run() == [55, 3, -1, 20]
+    stats = profiler.stats()
+    assert stats['runs'] == 2 and stats['seconds'] > 0
+    functions = stats['functions']
+    assert list(functions) == ['fib', 'twice', 'inc', 'dec', 'outer.inner', 'outer']
+    assert functions['fib']['calls'] == 2 * (177 + 15) and functions['outer.inner']['calls'] == 4
+    assert functions['twice']['calls'] == functions['inc']['calls'] == 4
+    # recursive calls are in the time of fib once, and the time of fib in the
+    # time of outer, which called it
+    for function in functions.values():
+        assert 0 <= function['self_seconds'] <= function['seconds'] <= stats['seconds']
+    assert functions['outer']['seconds'] >= functions['outer']['self_seconds'] + functions['outer.inner']['seconds']
+    assert abs(functions['fib']['self_seconds'] - functions['fib']['seconds']) < 1e-3
+    assert json.loads(json.dumps(stats)) == stats
+
+
+def test_sites():
+    profiler = profile()
+    sites = dict(((site['callee'], site['function']), site) for site in profiler.stats()['sites'])
+    assert sites['fib', 'fib']['calls'] == 95 and sites['fib', 'fib']['monomorphic']
+    assert sites['f', 'twice']['targets'] == {'inc': 1, 'dec': 1} and not sites['f', 'twice']['monomorphic']
+    assert sites['inner', 'outer']['targets'] == {'outer.inner': 1}
+    assert sites['pack', 'program']['targets'] == {'<lambda>': 1}
+
+    # the global call sites with one target, for myJsClosure to cache
+    monomorphic = profiler.monomorphic()
+    assert sorted(set(monomorphic.values())) == ['fib', 'outer', 'pack', 'twice']
+    env = {'pack': lambda *values: list(values)}
+    assert myJsClosure.compile_program(parse(SOURCE), env, monomorphic)() == [55, 3, -1, 20]
+
+
+def test_cached():
+    # a cached call site sees every store to its global
+    source = '''function one() {return 1;}
+                function two() {return 2;}
+                function swap() {get = two; return 0;}
+                var get = one;
+                function both() {return get() * 10 + swap() + get();}
+                return both();'''
+    profiler = myJsRunProfile.RunProfiler(parse(source))
+    assert profiler.run() == 12
+    cached = profiler.monomorphic()
+    assert 'get' in cached.values()
+    env = {}
+    program = myJsClosure.compile_program(parse(source), env, cached)
+    assert program() == 12 and env['get'] is not None
+    env['get'] = 'not a function'
+    assert program() == 12                 # the cells are filled when the program starts
+    try:
+        myJsClosure.compile_program(parse('return f(1);'), {'f': None}, {0: 'f'})()
+        assert False
+    except JsRuntimeError:
+        pass
+    # a global that is not defined fails as at a site that is not cached
+    for args in ('', '1', '1, 2', '1, 2, 3'):
+        source = 'function h() {return q(%s);} h();' % args
+        for cached in (None, {0: 'q'}):
+            try:
+                myJsClosure.compile_program(parse(source), {}, cached)()
+                assert False
+            except JsRuntimeError as e:
+                assert str(e) == 'q is not defined'
+
+
+def test_lambdas():
+    source = 'function (a) {return a;}\nfunction (b) {\n    return b;\n}\n(a);\n'
+    profiler = myJsRunProfile.RunProfiler(parse(source), {'a': 1}, source)
+    assert profiler.lambda_label(0) == '<lambda line 1>'
+    assert profiler.lambda_label(1) == '<lambda lines 2-4>'
+    assert myJsRunProfile.RunProfiler(parse(source), {'a': 1}).lambda_label(1) == '<lambda 2>'
+
+    # nested lambdas are numbered as they start, as they compile
+    source = ('function f() {\n    function (x) {return x;}\n    return 1;\n}\n'
+              'function (y) {\n    function (z) {return z;}\n}\n(f());\n')
+    profiler = myJsRunProfile.RunProfiler(parse(source), {}, source)
+    profiler.run()
+    assert sorted(profiler.functions) == ['<lambda line 2>', '<lambda line 6>', '<lambda lines 5-7>', 'f']
+
+
+def test_folded():
+    profiler = profile('function fib(n) {if (n < 2) {return n;} return fib(n - 1) + fib(n - 2);}\n'
+                       'return pack(fib(10), 3, -1, 20);')
+    lines = profiler.folded().splitlines()
+    stacks = [line.rsplit(' ', 1)[0] for line in lines]
+    assert all(int(line.rsplit(' ', 1)[1]) > 0 for line in lines)
+    assert set(stacks) <= set(['program'] + ['program' + ';fib' * depth for depth in range(1, 11)])
+    assert 'program;fib' in stacks
+
+
+def test_main():
+    fd, path = tempfile.mkstemp(suffix='.js')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            f.write('function f(x) {return x + 1;}\nreturn f(f(1));\n')
+        for args in ([path], ['--json', path], ['--folded', path]):
+            out = io.StringIO()
+            with contextlib.redirect_stdout(out):
+                assert myJsRunProfile.main(args) == 0
+            if args[0] == '--json':
+                assert json.loads(out.getvalue())[path]['functions']['f']['calls'] == 2
+            elif args[0] == '--folded':
+                assert out.getvalue().startswith(path + ';program')
+            else:
+                assert 'f in program' in out.getvalue() and out.getvalue().startswith(path + ': ')
+    finally:
+        os.remove(path)
+
+
+def test():
+    test_functions()
+    test_sites()
+    test_cached()
+    test_lambdas()
+    test_folded()
+    test_main()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
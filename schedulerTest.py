@@ -0,0 +1,70 @@
+import asyncio
+
+import myJsBytecode
+import myJsLexer
+import myJsParser
+import myJsScheduler
+import myJsVM
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+
+def parse(source):
+    return jsparser.parse(source, lexer=jslexer)
+
+
+FIB = parse('function fib(n) {if (n < 2) {return n;} return fib(n - 1) + fib(n - 2);} return fib(n);')
+FOREVER = parse('function f(n) {return f(n + 1);} return f(0);')
+
+
+def test_interleaved():
+    # every script gets a turn before any one gets a second
+    order = []
+    scheduler = myJsScheduler.Scheduler(turn=5)
+    source = parse('function f(n) {if (n == 0) {return 0;} log(name); return f(n - 1);} return f(3);')
+
+    async def main():
+        return await asyncio.gather(*[scheduler.run(source, {'name': name, 'log': order.append})
+                                      for name in 'abc'])
+    assert asyncio.run(main()) == [0, 0, 0]
+    assert order == list('abcabcabc')
+    stats = scheduler.stats()
+    assert stats['finished'] == 3 and stats['failed'] == 0 and stats['turns'] > 3
+    assert 0 < stats['p50_seconds'] <= stats['p99_seconds'] <= stats['max_seconds']
+
+
+def test_budgets():
+    # the runaway scripts are ended, the others finish
+    scheduler = myJsScheduler.Scheduler(turn=100, max_steps=100000)
+    code = myJsBytecode.compile_program(FIB)
+
+    async def main():
+        scripts = [scheduler.run(code, {'n': n}) for n in range(10)]
+        scripts.insert(3, scheduler.run(FOREVER))
+        return await asyncio.gather(*scripts, return_exceptions=True)
+    results = asyncio.run(main())
+    assert isinstance(results.pop(3), myJsVM.BudgetExceeded)
+    assert results == [0, 1, 1, 2, 3, 5, 8, 13, 21, 34]
+    stats = scheduler.stats()
+    assert stats['finished'] == 10 and stats['failed'] == 1 and stats['steps'] > 100000
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert myJsScheduler.percentile(values, 50) == 50
+    assert myJsScheduler.percentile(values, 99) == 99
+    assert myJsScheduler.percentile([7], 99) == 7
+    assert myJsScheduler.percentile([], 50) == 0.0
+
+
+def test():
+    test_interleaved()
+    test_budgets()
+    test_percentile()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
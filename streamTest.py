@@ -0,0 +1,100 @@
+import io
+import mmap
+import os
+import tempfile
+
+import myJsLexer
+import myJsStream
+
+
+jslexer = myJsLexer.build()
+
+SOURCE = '''function f(a, b) {
+    /* a comment
+       over "three" lines */ var s = "a string
+over two lines";
+    return a + b * 1.5; // trailing "comment
+}
+var t = "café \\" über"; /**/ f(1, 2);
+'''
+
+
+def describe(toks):
+    return [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in toks]
+
+
+def whole(source):
+    lexer = jslexer.clone()
+    lexer.lineno = 1
+    lexer.input(source)
+    return describe(iter(lexer.token, None))
+
+
+def test_stream(source, chunk_size):
+    lexer = jslexer.clone()
+    lexer.lineno = 1
+    return describe(myJsStream.tokens(source, lexer, chunk_size))
+
+
+def test_chunks():
+    expected = whole(SOURCE)
+    assert ('STRING', 'a string\nover two lines', 3, SOURCE.index('"a string')) in expected
+    assert expected[-1][2] == 7
+    for chunk_size in (1, 2, 3, 7, 16, 1000):
+        assert test_stream(SOURCE, chunk_size) == expected
+        assert test_stream(io.StringIO(SOURCE), chunk_size) == expected
+        # multi-byte characters cut between chunks
+        assert test_stream(io.BytesIO(SOURCE.encode('utf-8')), chunk_size) == expected
+
+
+def test_unterminated():
+    source = 'x;\n"never closed\ny;\n'
+    assert [tok[0] for tok in whole(source)] == ['IDENTIFIER', 'SEMICOLON', 'IDENTIFIER', 'IDENTIFIER',
+                                                   'IDENTIFIER', 'SEMICOLON']
+    assert test_stream(source, 4) == whole(source)
+
+
+def test_one_line():
+    # a source without newlines is cut before the last token of each piece
+    line = ''.join('var x%d = "s %d"; /* c%d * */ f(x%d, 1.5);' % (i, i, i, i) for i in range(300)) + ' // end'
+    expected = whole(line)
+    for chunk_size in (1, 5, 16, 64):
+        assert test_stream(line, chunk_size) == expected
+
+    class Lexer(type(jslexer)):
+        def input(self, s):
+            pieces.append(len(s))
+            type(jslexer).input(self, s)
+    pieces = []
+    lexer = jslexer.clone()
+    lexer.__class__ = Lexer
+    lexer.lineno = 1
+    assert describe(myJsStream.tokens(line, lexer, 64)) == expected
+    assert max(pieces) < 128
+
+
+def test_file():
+    fd, path = tempfile.mkstemp(suffix='.js')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(SOURCE.encode('utf-8') * 50)
+        assert describe(myJsStream.tokenize_file(path, jslexer.clone(), 64)) == whole(SOURCE * 50)
+        with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            assert describe(myJsStream.tokens(source, jslexer.clone(), 64)) == whole(SOURCE * 50)
+        with open(path, 'wb'):
+            pass
+        assert list(myJsStream.tokenize_file(path)) == []
+    finally:
+        os.remove(path)
+
+
+def test():
+    test_chunks()
+    test_unterminated()
+    test_one_line()
+    test_file()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
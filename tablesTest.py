@@ -0,0 +1,62 @@
+import os
+import shutil
+import tempfile
+
+import myJsLexer
+import myJsParser
+import myJsTables
+
+
+source = 'function f(x, y) {return x + y;} var z = f(1, 2); /* done */'
+
+
+def parse(jslexer, jsparser):
+    return jsparser.parse(source, lexer=jslexer)
+
+
+def table_files(directory):
+    return sorted(name for name in os.listdir(directory) if name.endswith('.py'))
+
+
+def test_build_writes_versioned_tables():
+    directory = tempfile.mkdtemp()
+    try:
+        expected = parse(myJsLexer.build(cache=False), myJsParser.build(cache=False))
+        assert parse(myJsLexer.build(directory), myJsParser.build(directory)) == expected
+        assert table_files(directory) == ['myJsLextab_%s.py' % myJsLexer.signature(),
+                                          'myJsParsetab_%s.py' % myJsParser.signature()]
+        # the second build loads the tables written by the first one
+        assert parse(myJsLexer.build(directory), myJsParser.build(directory)) == expected
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_stale_tables_are_replaced():
+    directory = tempfile.mkdtemp()
+    try:
+        for name in ('myJsLextab_0000000000000000', 'myJsParsetab_0000000000000000'):
+            with open(os.path.join(directory, name + '.py'), 'w') as f:
+                f.write('raise ImportError\n')
+        myJsLexer.build(directory)
+        myJsParser.build(directory)
+        assert table_files(directory) == ['myJsLextab_%s.py' % myJsLexer.signature(),
+                                          'myJsParsetab_%s.py' % myJsParser.signature()]
+    finally:
+        shutil.rmtree(directory)
+
+
+def test_signature():
+    assert myJsTables.signature(['a', 'b']) == myJsTables.signature(['a', 'b'])
+    assert myJsTables.signature(['a', 'b']) != myJsTables.signature(['ab'])
+    assert myJsLexer.signature() != myJsParser.signature()
+
+
+def test():
+    test_build_writes_versioned_tables()
+    test_stale_tables_are_replaced()
+    test_signature()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
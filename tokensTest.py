@@ -0,0 +1,64 @@
+import sys
+
+import myJsLexer
+import myJsParser
+import myJsTokens
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+SOURCE = '''function f(a, b) {
+    /* comment */ var c = a + b * 2.5; // comment
+    if (c >= 10 && !false) {return "big\\nnumber";} else {return c;}
+}
+f(1, 20);
+'''
+
+
+def lexed(input_string):
+    lexer = jslexer.clone()
+    lexer.lineno = 1
+    lexer.input(input_string)
+    return list(iter(lexer.token, None))
+
+
+def describe(toks):
+    return [(tok.type, tok.value, tok.lineno, tok.lexpos) for tok in toks]
+
+
+def test_buffer():
+    buffer = myJsTokens.tokenize_all(SOURCE)
+    expected = lexed(SOURCE)
+    assert len(buffer) == len(expected)
+    assert describe(buffer.token(i) for i in range(len(buffer))) == describe(expected)
+    assert [buffer.type(i) for i in range(3)] == ['FUNCTION', 'IDENTIFIER', 'LPAREN']
+    assert buffer.value(1) == 'f' and buffer.ends[1] == SOURCE.index('(')
+    assert buffer.nbytes() == 13 * len(buffer)
+    assert myJsTokens.tokenize_all(SOURCE, jslexer).ends == buffer.ends
+    assert len(myJsTokens.tokenize_all('')) == 0
+
+
+def test_smaller():
+    source = SOURCE * 100
+    buffer = myJsTokens.tokenize_all(source)
+    toks = lexed(source)
+    objects = sum(sys.getsizeof(tok) + sys.getsizeof(tok.__dict__) for tok in toks)
+    assert buffer.nbytes() * 5 < objects
+
+
+def test_parse():
+    buffer = myJsTokens.tokenize_all(SOURCE)
+    assert myJsTokens.parse(buffer, jsparser) == jsparser.parse(SOURCE, lexer=jslexer)
+    assert [tok.type for tok in myJsTokens.BufferLexer(buffer)][-2:] == ['RPAREN', 'SEMICOLON']
+
+
+def test():
+    test_buffer()
+    test_smaller()
+    test_parse()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()
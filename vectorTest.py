@@ -0,0 +1,105 @@
+import random
+
+import myJsLexer
+import myJsParser
+import myJsRuntime
+import myJsVector
+
+
+jslexer = myJsLexer.build()
+jsparser = myJsParser.build()
+
+
+def expression(source):
+    return jsparser.parse(source + ';', lexer=jslexer)[0][1][1]
+
+
+def same(vector, rows):
+    # equal row for row, NaN equal to NaN and booleans not equal to numbers
+    vector = vector.tolist()
+    return len(vector) == len(rows) and all(
+        (a != a and b != b) or (a == b and (type(a) is bool) == (type(b) is bool)) for a, b in zip(vector, rows))
+
+
+def make_columns(n):
+    numpy = myJsVector.numpy
+    random.seed(7)
+    return {
+        'x': numpy.array([random.choice([0, 1, 2, -3, 2.5]) for _ in range(n)]),
+        'y': [random.choice([0, 1.5, -2, 7]) for _ in range(n)],
+        'flag': numpy.array([random.random() < 0.5 for _ in range(n)]),
+        's': [random.choice(['a', '', 'b']) for _ in range(n)],
+        'mixed': [random.choice([1, 'x', None, True]) for _ in range(n)],
+        'k': 3,
+        'name': 'n',
+        'twice': lambda v: v * 2,
+    }
+
+
+def test_vector():
+    columns = make_columns(300)
+    for source in ('x + y * 2', 'x / y', 'x / 0', '0 / 0', '-x / 0', '-x', 'x - - y', '!x', 'x == y', 'x != y',
+                   'x < y && y >= k', 'x || y', 'flag || x > 1', 'flag == x', 'flag + flag', '-flag',
+                   'true && flag', 'false || x', 'k * 2'):
+        exp = expression(source)
+        result = myJsVector.compile_expression(exp)(columns)
+        assert result.dtype != object, source
+        assert same(result, myJsVector.evaluate_rows(exp, columns)), source
+
+
+def test_row_fallback():
+    columns = make_columns(300)
+    for source in ('flag && x', 's + x', 's == "a"', 'mixed + 1', 'mixed == 1', '!mixed', 'mixed && x',
+                   'name + x', 'twice(x) + 1', 'twice(s)', 'x && twice(x)', 'flag && "yes" || "no"'):
+        exp = expression(source)
+        assert same(myJsVector.compile_expression(exp)(columns), myJsVector.evaluate_rows(exp, columns)), source
+    # back to numbers after a call
+    assert myJsVector.compile_expression(expression('twice(x) + 1'))(columns).dtype == 'float64'
+
+
+def test_short_circuit():
+    columns = make_columns(100)
+    called = []
+    columns['count'] = lambda v: called.append(v) or v
+    exp = expression('x > 0 && count(x) || count(y)')
+    result = myJsVector.compile_expression(exp)(columns)
+    vector_calls = sorted(called)
+    del called[:]
+    assert same(result, myJsVector.evaluate_rows(exp, columns))
+    assert vector_calls == sorted(called)
+
+
+def test_errors():
+    rule = myJsVector.compile_expression(expression('x + z'))
+    try:
+        rule({'x': [1, 2]})
+        assert False
+    except myJsRuntime.JsRuntimeError as e:
+        assert str(e) == 'z is not defined'
+    for columns, n in (({'x': [1, 2], 'z': [1]}, None), ({'x': 1, 'z': 2}, None), ({'x': [1], 'z': 1}, 2)):
+        try:
+            rule(columns, n)
+            assert False, columns
+        except ValueError:
+            pass
+    assert rule({'x': 1, 'z': 2}, 3).tolist() == [3, 3, 3]
+    try:
+        myJsVector.compile_expression(('stmt', ('error',)))
+        assert False
+    except ValueError:
+        pass
+
+
+def test():
+    if myJsVector.numpy is None:
+        print('NumPy is not installed, tests skipped')
+        return
+    test_vector()
+    test_row_fallback()
+    test_short_circuit()
+    test_errors()
+    print('tests pass')
+
+
+if __name__ == '__main__':
+    test()